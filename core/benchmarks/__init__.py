@@ -0,0 +1,47 @@
+"""
+Benchmarks run through ``python manage.py benchmark <name>``.
+
+Every benchmark works on a throwaway database created from the migrations
+(see ``benchmark_database``), never on the configured one.
+"""
+import contextlib
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.db import connection
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    """Create a scratch database (a temporary file for SQLite) and drop it afterwards."""
+    old_name = connection.settings_dict["NAME"]
+    old_test_name = connection.settings_dict["TEST"].get("NAME")
+    tmpdir = tempfile.mkdtemp(prefix="jurnalkita-bench-")
+    if connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield connection
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        connection.settings_dict["TEST"]["NAME"] = old_test_name
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def measure(fn, repeat=5):
+    """Median wall time of ``fn()`` in seconds over ``repeat`` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:9.2f} ms"
@@ -0,0 +1,103 @@
+"""Synthetic reports for the benchmarks, inserted with bulk_create (no signals)."""
+import random
+
+from django.contrib.auth.models import User
+from core.models import (
+    FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureWIP, HppManufactureFinishedGoods
+)
+
+BATCH_SIZE = 2000
+
+
+def make_reports(count, business_type="dagang", username="benchmark"):
+    user, _created = User.objects.get_or_create(username=username)
+    return FinancialReport.objects.bulk_create([
+        FinancialReport(
+            user=user,
+            company_name=f"Benchmark {i}",
+            month="Januari",
+            year=2025,
+            business_type=business_type,
+        )
+        for i in range(count)
+    ])
+
+
+def make_products(report, count):
+    return Product.objects.bulk_create(
+        [Product(report=report, name=f"Produk {i:06d}") for i in range(count)],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def make_hpp_dagang(report, product_count, seed=1):
+    """Products with one pendapatan usaha row and AWAL/PEMBELIAN/AKHIR entries each."""
+    rng = random.Random(seed)
+    products = make_products(report, product_count)
+    revenue, entries = [], []
+    for product in products:
+        qty_awal = rng.randint(0, 500)
+        qty_beli = rng.randint(0, 500)
+        retur = rng.randint(0, qty_beli // 10)
+        qty_jual = rng.randint(0, qty_awal + qty_beli - retur)
+        revenue.append(RevenueItem(report=report, product=product, revenue_type="usaha", name=product.name,
+                                   quantity=qty_jual, selling_price=60_000, total=qty_jual * 60_000))
+        entries += [
+            HppEntry(report=report, product=product, category="AWAL",
+                     quantity=qty_awal, harga_satuan=rng.randint(1_000, 50_000)),
+            HppEntry(report=report, product=product, category="PEMBELIAN",
+                     quantity=qty_beli, harga_satuan=rng.randint(1_000, 50_000),
+                     diskon=rng.randint(0, 10_000), retur_qty=retur, ongkir=rng.randint(0, 10_000)),
+            HppEntry(report=report, product=product, category="AKHIR",
+                     quantity=qty_awal + qty_beli - retur - qty_jual),
+        ]
+    RevenueItem.objects.bulk_create(revenue, batch_size=BATCH_SIZE)
+    HppEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    return products
+
+
+def make_line_items(reports, total_rows, products_per_report=50, seed=1):
+    """
+    Spread ``total_rows`` line items evenly over revenue, expense and the
+    manufaktur material/WIP/finished goods tables of ``reports``.
+    """
+    rng = random.Random(seed)
+    products = {report.id: make_products(report, products_per_report) for report in reports}
+    per_table = total_rows // 5
+
+    def pick():
+        report = rng.choice(reports)
+        return report, rng.choice(products[report.id])
+
+    revenue, expense, material, wip, fg = [], [], [], [], []
+    for _ in range(per_table):
+        report, product = pick()
+        qty, price = rng.randint(1, 100), rng.randint(1_000, 100_000)
+        if rng.random() < 0.8:
+            revenue.append(RevenueItem(report=report, product=product, revenue_type="usaha", name=product.name,
+                                       quantity=qty, selling_price=price, total=qty * price))
+        else:
+            revenue.append(RevenueItem(report=report, revenue_type="lain", name="Lain-lain", total=price))
+
+        report, product = pick()
+        expense.append(ExpenseItem(report=report, expense_category=rng.choice(["usaha", "lain"]),
+                                   name="Beban", total=rng.randint(1_000, 1_000_000)))
+
+        report, product = pick()
+        material.append(HppManufactureMaterial(report=report, product=product,
+                                               type=rng.choice(["BB_AWAL", "BB_PEMBELIAN", "BB_AKHIR"]),
+                                               quantity=qty, harga_satuan=price, total=qty * price))
+
+        report, product = pick()
+        wip.append(HppManufactureWIP(report=report, product=product, type=rng.choice(["WIP_AWAL", "WIP_AKHIR"]),
+                                     quantity=qty, harga_satuan=price // 10, total=qty * (price // 10)))
+
+        report, product = pick()
+        fg.append(HppManufactureFinishedGoods(report=report, product=product, type=rng.choice(["FG_AWAL", "FG_AKHIR"]),
+                                              quantity=qty, harga_satuan=price // 10, total=qty * (price // 10)))
+
+    for model, rows in [(RevenueItem, revenue), (ExpenseItem, expense), (HppManufactureMaterial, material),
+                        (HppManufactureWIP, wip), (HppManufactureFinishedGoods, fg)]:
+        model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return products
@@ -0,0 +1,52 @@
+"""
+Full detail Excel benchmark: time and peak Python memory of the detail
+export for manufaktur reports of growing size. The laporan sheets list every
+beban line, so the peak is reported with and without the detail sheets; the
+difference (what streaming the line-item tables costs) should stay flat.
+"""
+import tempfile
+import tracemalloc
+
+from core.benchmarks import benchmark_database, format_ms, measure
+from core.benchmarks.data import make_line_items, make_reports
+from core.utils.excel_exporter import write_excel_file
+from core.utils.final_report import build_report_result
+
+
+def add_arguments(parser):
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 200_000],
+                        help="Line items per report, one report per value")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size; the median is reported")
+
+
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(command, rows, repeat, **options):
+    results = []
+    with benchmark_database():
+        reports = make_reports(len(rows), business_type="manufaktur")
+        for report, size in zip(reports, rows):
+            make_line_items([report], size)
+            result = build_report_result(report)
+
+            def export(detail=True):
+                with tempfile.TemporaryFile() as output:
+                    write_excel_file(report, output, result, detail=detail)
+                    return output.seek(0, 2)
+
+            seconds = measure(export, repeat)
+            file_size = export()
+            results.append((size, seconds, peak_memory(export, False), peak_memory(export, True), file_size))
+
+    for size, seconds, laporan_peak, detail_peak, file_size in results:
+        command.stdout.write(
+            f"{size:>9} rows {format_ms(seconds)}   peak {detail_peak / 2**20:6.1f} MiB"
+            f" (laporan only {laporan_peak / 2**20:6.1f} MiB)   file {file_size / 2**20:6.1f} MiB"
+        )
@@ -0,0 +1,97 @@
+"""
+Excel export benchmark: the write-only streaming exporter against the old
+in-memory Workbook + auto-fit scan + BytesIO, on a manufaktur report with
+many beban and BOP lines.
+"""
+import tempfile
+import tracemalloc
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from core.models import ExpenseItem, HppManufactureOverhead
+from core.benchmarks import benchmark_database, format_ms, measure
+from core.benchmarks.data import BATCH_SIZE, make_reports
+from core.utils.excel_exporter import _generate_excel_manufaktur, total_fill, write_excel_file
+from core.utils.excel_exporter import bold as bold_font
+from core.utils.final_report import build_report_result
+
+
+class InMemorySheet:
+    """The pre-streaming sheet: styles applied to live cells, widths fitted afterwards."""
+
+    def __init__(self, ws):
+        self.ws = ws
+
+    def append(self, values=(), bold=0, filled=0):
+        self.ws.append(values)
+        row = self.ws.max_row
+        for col in range(1, bold + 1):
+            self.ws.cell(row=row, column=col).font = bold_font
+        for col in range(1, filled + 1):
+            self.ws.cell(row=row, column=col).fill = total_fill
+
+
+class InMemoryBook:
+    def __init__(self):
+        self.wb = Workbook()
+
+    def sheet(self, title):
+        ws = self.wb.active if self.wb.active.title == "Sheet" else self.wb.create_sheet()
+        ws.title = title
+        return InMemorySheet(ws)
+
+    def save(self, output):
+        for ws in self.wb.worksheets:
+            for col in ws.columns:
+                length = max(len(str(cell.value or "")) for cell in col)
+                ws.column_dimensions[col[0].column_letter].width = length + 3
+        buffer = BytesIO()
+        self.wb.save(buffer)
+        buffer.seek(0)
+        output.write(buffer.getvalue())
+
+
+def add_arguments(parser):
+    parser.add_argument("--lines", type=int, default=20_000, help="Beban usaha rows and BOP rows each")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the median is reported")
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(command, lines, repeat, **options):
+    with benchmark_database():
+        [report] = make_reports(1, business_type="manufaktur")
+        ExpenseItem.objects.bulk_create(
+            [ExpenseItem(report=report, expense_category="usaha", scope="manufaktur", name=f"Beban {i:06d}", total=i)
+             for i in range(lines)],
+            batch_size=BATCH_SIZE,
+        )
+        HppManufactureOverhead.objects.bulk_create(
+            [HppManufactureOverhead(report=report, nama_biaya=f"BOP {i:06d}", total=i) for i in range(lines)],
+            batch_size=BATCH_SIZE,
+        )
+        result = build_report_result(report)
+
+    def in_memory():
+        book = InMemoryBook()
+        _generate_excel_manufaktur(book, report, result)
+        # The old view copied the finished bytes into an HttpResponse
+        book.save(BytesIO())
+
+    def streaming():
+        with tempfile.TemporaryFile() as output:
+            write_excel_file(report, output, result)
+
+    command.stdout.write(f"{lines} beban usaha rows + {lines} BOP rows")
+    for label, fn in (("in-memory workbook", in_memory), ("write-only streaming", streaming)):
+        seconds = measure(fn, repeat)
+        peak = peak_memory(fn)
+        command.stdout.write(f"   {label:22} {format_ms(seconds)}   peak {peak / 2**20:8.1f} MiB")
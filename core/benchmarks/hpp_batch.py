@@ -0,0 +1,50 @@
+"""
+HPP batch benchmark: calculate_hpp_for_product per product against the
+column-wise calculate_hpp_batch, on one dagang report with many products.
+"""
+from core.models import Product
+from core.benchmarks import benchmark_database, format_ms, measure
+from core.benchmarks.data import make_hpp_dagang, make_reports
+from core.utils.hpp_calculator import (
+    calculate_hpp_batch,
+    calculate_hpp_columns,
+    calculate_hpp_for_product,
+    hpp_columns,
+    load_hpp_entries,
+)
+
+
+def add_arguments(parser):
+    parser.add_argument("--products", type=int, default=10_000, help="Products in the report")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant; the median is reported")
+
+
+def run(command, products, repeat, **options):
+    with benchmark_database():
+        [report] = make_reports(1)
+        make_hpp_dagang(report, products)
+
+        def load_scalar():
+            entries = load_hpp_entries(report)
+            return [(product, entries[product.id]) for product in
+                    Product.objects.filter(report=report, revenue_entries__revenue_type="usaha").order_by("name")]
+
+        product_entries = load_scalar()
+        columns = hpp_columns(product_entries)
+
+        def scalar_loop():
+            return [calculate_hpp_for_product(product, entries) for product, entries in product_entries]
+
+        assert scalar_loop() == calculate_hpp_columns(columns)
+        timings = [
+            ("scalar, compute only", measure(scalar_loop, repeat)),
+            ("batch, compute only", measure(lambda: calculate_hpp_columns(columns), repeat)),
+            ("scalar, load + compute", measure(lambda: [
+                calculate_hpp_for_product(product, entries) for product, entries in load_scalar()
+            ], repeat)),
+            ("calculate_hpp_batch(report)", measure(lambda: calculate_hpp_batch(report), repeat)),
+        ]
+
+    command.stdout.write(f"{products} products")
+    for label, seconds in timings:
+        command.stdout.write(f"   {label:30} {format_ms(seconds)}")
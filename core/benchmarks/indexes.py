@@ -0,0 +1,98 @@
+"""
+Composite index benchmark: query plans and timings of the report-scoped
+filters with and without the (report, discriminator, product) indexes.
+"""
+import textwrap
+
+from django.db import connection
+from django.db.models import Sum
+from core.models import (
+    RevenueItem, ExpenseItem,
+    HppManufactureMaterial, HppManufactureWIP, HppManufactureFinishedGoods
+)
+from core.benchmarks import benchmark_database, format_ms, measure
+from core.benchmarks.data import make_line_items, make_reports
+from core.utils.final_report import load_report_totals
+
+INDEXED_MODELS = (RevenueItem, ExpenseItem, HppManufactureMaterial, HppManufactureWIP, HppManufactureFinishedGoods)
+
+
+def add_arguments(parser):
+    parser.add_argument("--rows", type=int, default=100_000, help="Total line items to generate")
+    parser.add_argument("--reports", type=int, default=5, help="Reports to spread the rows over")
+    parser.add_argument("--products", dest="products_per_report", type=int, default=20,
+                        help="Products per report")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query; the median is reported")
+
+
+def scenarios(report, product):
+    """
+    (label, queryset, runner) triples mirroring the filters used by the views
+    and laporan. The queryset is what gets EXPLAINed, the runner what is timed.
+    """
+    def fetch(queryset):
+        return lambda: list(queryset.values_list("pk", "total"))
+
+    revenue_usaha = RevenueItem.objects.filter(report=report, revenue_type="usaha")
+    revenue_product = revenue_usaha.filter(product=product)
+    material = HppManufactureMaterial.objects.filter(report=report, type="BB_PEMBELIAN", product=product)
+    wip = HppManufactureWIP.objects.filter(report=report, type="WIP_AKHIR").values("product").annotate(s=Sum("total"))
+    fg = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AKHIR", product=product)
+    beban = ExpenseItem.objects.filter(report=report, expense_category="usaha").order_by("name")
+    return [
+        ("pendapatan usaha total", revenue_usaha, lambda: revenue_usaha.aggregate(s=Sum("total"))),
+        ("pendapatan per produk", revenue_product, fetch(revenue_product)),
+        ("bahan baku pembelian per produk", material, fetch(material)),
+        ("bdp akhir per produk", wip, lambda: list(wip.all())),
+        ("barang jadi akhir per produk", fg, fetch(fg)),
+        ("beban usaha", beban, fetch(beban)),
+        ("load_report_totals", revenue_usaha, lambda: load_report_totals(
+            report,
+            pendapatan_usaha=RevenueItem.objects.filter(revenue_type="usaha"),
+            bb_pembelian=HppManufactureMaterial.objects.filter(type="BB_PEMBELIAN"),
+            bdp_akhir=HppManufactureWIP.objects.filter(type="WIP_AKHIR"),
+            bj_akhir=HppManufactureFinishedGoods.objects.filter(type="FG_AKHIR"),
+            beban_usaha=ExpenseItem.objects.filter(expense_category="usaha"),
+        )),
+    ]
+
+
+def _set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _measure_all(report, product, repeat):
+    return {
+        label: (measure(runner, repeat=repeat), queryset.explain())
+        for label, queryset, runner in scenarios(report, product)
+    }
+
+
+def run(command, rows, reports, products_per_report, repeat, **options):
+    with benchmark_database():
+        command.stdout.write(f"Generating {rows} line items over {reports} reports...")
+        report_list = make_reports(reports, business_type="manufaktur")
+        products = make_line_items(report_list, rows, products_per_report=products_per_report)
+        report = report_list[0]
+        product = products[report.id][0]
+
+        _set_indexes(False)
+        before = _measure_all(report, product, repeat)
+        _set_indexes(True)
+        after = _measure_all(report, product, repeat)
+
+    for label, (before_time, before_plan) in before.items():
+        after_time, after_plan = after[label]
+        speedup = before_time / after_time if after_time else float("inf")
+        command.stdout.write(f"\n== {label}")
+        command.stdout.write(f"   before {format_ms(before_time)}   after {format_ms(after_time)}   x{speedup:.1f}")
+        command.stdout.write("   plan before:\n" + textwrap.indent(before_plan, "     "))
+        command.stdout.write("   plan after:\n" + textwrap.indent(after_plan, "     "))
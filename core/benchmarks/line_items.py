@@ -0,0 +1,49 @@
+"""
+Streaming line-item export benchmark: time to first byte, total time and
+peak Python memory of the CSV / NDJSON pendapatan export for reports of
+growing size. The peak should stay flat as the row count grows.
+"""
+import time
+import tracemalloc
+
+from core.benchmarks import benchmark_database, format_ms
+from core.benchmarks.data import make_line_items, make_reports
+from core.utils.line_item_export import iter_line_items
+
+
+def add_arguments(parser):
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000],
+                        help="Pendapatan rows per report, one report per value")
+
+
+def consume(report, fmt):
+    """(seconds to first chunk, total seconds, bytes, peak traced memory) of one export."""
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        first = None
+        size = 0
+        for chunk in iter_line_items(report, "pendapatan", fmt):
+            if first is None:
+                first = time.perf_counter() - start
+            size += len(chunk)
+        return first, time.perf_counter() - start, size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(command, rows, **options):
+    results = []
+    with benchmark_database():
+        reports = make_reports(len(rows))
+        for report, size in zip(reports, rows):
+            # make_line_items spreads rows over five tables
+            make_line_items([report], size * 5)
+            for fmt in ("csv", "ndjson"):
+                results.append((size, fmt, *consume(report, fmt)))
+
+    for size, fmt, first, seconds, file_size, peak in results:
+        command.stdout.write(
+            f"{size:>9} rows {fmt:<6} first byte {format_ms(first)}   total {format_ms(seconds)}"
+            f"   peak {peak / 2**20:6.2f} MiB   output {file_size / 2**20:7.1f} MiB"
+        )
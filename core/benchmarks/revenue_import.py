@@ -0,0 +1,67 @@
+"""
+Pendapatan import benchmark: importing N CSV rows through the bulk importer,
+against the per-row path of the pendapatan form (Product get_or_create plus
+RevenueItem.objects.create, with its signals) timed on a sample and scaled up.
+"""
+import csv
+import io
+import random
+import time
+
+from core.benchmarks import benchmark_database
+from core.benchmarks.data import make_reports
+from core.models import Product, RevenueItem
+from core.utils.revenue_import import import_revenue_file
+
+
+def add_arguments(parser):
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="CSV rows per import")
+    parser.add_argument("--products", type=int, default=500, help="Distinct product names in the file")
+    parser.add_argument("--baseline-rows", type=int, default=1_000,
+                        help="Rows inserted one by one to estimate the per-row path")
+
+
+def make_csv(rows, products, seed=1):
+    rng = random.Random(seed)
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(["jenis", "produk", "nama", "qty", "harga", "total"])
+    for _ in range(rows):
+        if rng.random() < 0.95:
+            writer.writerow(["usaha", f"Produk {rng.randrange(products):05d}", "", rng.randint(1, 100),
+                             rng.randint(1_000, 100_000), ""])
+        else:
+            writer.writerow(["lain", "", "Pendapatan bunga", "", "", rng.randint(1_000, 100_000)])
+    return text.getvalue().encode("utf-8")
+
+
+def per_row(report, rows, products, seed=1):
+    rng = random.Random(seed)
+    for _ in range(rows):
+        product, _created = Product.objects.get_or_create(report=report, name=f"Produk {rng.randrange(products):05d}")
+        RevenueItem.objects.create(report=report, revenue_type="usaha", product=product,
+                                   quantity=rng.randint(1, 100), selling_price=rng.randint(1_000, 100_000))
+
+
+def run(command, rows, products, baseline_rows, **options):
+    results = []
+    with benchmark_database():
+        reports = make_reports(len(rows) + 1)
+        start = time.perf_counter()
+        per_row(reports[0], baseline_rows, products)
+        per_row_seconds = (time.perf_counter() - start) / baseline_rows
+
+        for report, size in zip(reports[1:], rows):
+            content = make_csv(size, products)
+            start = time.perf_counter()
+            result = import_revenue_file(report, io.BytesIO(content), "pendapatan.csv")
+            seconds = time.perf_counter() - start
+            assert result.created == size and not result.errors
+            results.append((size, seconds))
+
+    for size, seconds in results:
+        estimate = per_row_seconds * size
+        command.stdout.write(
+            f"{size:>9} rows   bulk import {seconds:8.2f} s ({size / seconds:9.0f} rows/s)"
+            f"   per-row estimate {estimate:8.1f} s   x{estimate / seconds:5.1f}"
+        )
@@ -0,0 +1,35 @@
+"""
+Roll-forward benchmark: cloning a dagang report with N products and their
+FIFO persediaan akhir into the next period, timed with its query count.
+"""
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.benchmarks import benchmark_database
+from core.benchmarks.data import make_hpp_dagang, make_reports
+from core.models import HppEntry
+from core.utils.roll_forward import roll_forward_report
+
+
+def add_arguments(parser):
+    parser.add_argument("--products", type=int, nargs="+", default=[1_000, 10_000], help="Products per report")
+
+
+def run(command, products, **options):
+    results = []
+    with benchmark_database():
+        reports = make_reports(len(products))
+        for report, size in zip(reports, products):
+            make_hpp_dagang(report, size)
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                new_report = roll_forward_report(report)
+            seconds = time.perf_counter() - start
+            awal = HppEntry.objects.filter(report=new_report, category="AWAL").count()
+            results.append((size, awal, seconds, len(queries)))
+
+    for size, awal, seconds, query_count in results:
+        command.stdout.write(
+            f"{size:>9} products   {awal:>9} AWAL rows   {seconds * 1000:9.1f} ms   {query_count:4} queries"
+        )
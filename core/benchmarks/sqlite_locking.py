@@ -0,0 +1,102 @@
+"""
+SQLite concurrency benchmark: parallel reader and writer threads against one
+database file, with the plain defaults and with the SQLITE_PRAGMAS settings.
+"""
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections
+from core.models import RevenueItem
+from core.benchmarks import benchmark_database, format_ms
+from core.benchmarks.data import make_line_items, make_reports
+from core.utils.final_report import generate_final_report_data
+
+# journal_mode is stored in the database file, so the baseline has to reset it
+PLAIN_OPTIONS = {"init_command": "PRAGMA journal_mode=delete"}
+
+
+def add_arguments(parser):
+    parser.add_argument("--readers", type=int, default=8, help="Reader threads")
+    parser.add_argument("--writers", type=int, default=4, help="Writer threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--rows", type=int, default=20_000, help="Line items in the database")
+
+
+def _worker(action, stop, stats):
+    latencies, errors = [], 0
+    try:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                action()
+            except OperationalError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+        stats.append((latencies, errors))
+
+
+def _run_threads(reports, readers, writers, seconds):
+    def read():
+        generate_final_report_data(reports[0])
+
+    def write():
+        # Goes through RevenueItem.save and the summary signals, like the pendapatan form
+        RevenueItem.objects.create(report=reports[0], revenue_type="lain", name="Bench", total=1000)
+
+    stop = threading.Event()
+    read_stats, write_stats = [], []
+    threads = [threading.Thread(target=_worker, args=(read, stop, read_stats)) for _ in range(readers)]
+    threads += [threading.Thread(target=_worker, args=(write, stop, write_stats)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return read_stats, write_stats
+
+
+def _summarize(stats):
+    latencies = sorted(t for thread_latencies, _errors in stats for t in thread_latencies)
+    errors = sum(errors for _latencies, errors in stats)
+    if not latencies:
+        return 0, errors, 0, 0
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    return len(latencies), errors, statistics.median(latencies), p95
+
+
+def run(command, readers, writers, seconds, rows, **options):
+    if connection.vendor != "sqlite":
+        raise CommandError("sqlite-locking only applies to the SQLite backend.")
+    runs = [
+        ("plain sqlite3", PLAIN_OPTIONS),
+        ("tuned pragmas", settings.DATABASES["default"].get("OPTIONS", {})),
+    ]
+    with benchmark_database():
+        reports = make_reports(2)
+        make_line_items(reports, rows)
+        results = []
+        for label, options_dict in runs:
+            connections.close_all()
+            connection.settings_dict["OPTIONS"] = dict(options_dict)
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal_mode = cursor.fetchone()[0]
+            connections.close_all()
+            results.append((label, journal_mode, _run_threads(reports, readers, writers, seconds)))
+        connection.settings_dict["OPTIONS"] = dict(runs[1][1])
+
+    command.stdout.write(f"{readers} readers, {writers} writers, {seconds:g}s per run")
+    for label, journal_mode, (read_stats, write_stats) in results:
+        command.stdout.write(f"\n== {label} (journal_mode={journal_mode})")
+        for kind, stats in (("reads", read_stats), ("writes", write_stats)):
+            count, errors, median, p95 = _summarize(stats)
+            command.stdout.write(
+                f"   {kind:6} {count / seconds:8.1f}/s  locked errors {errors:5}  "
+                f"median {format_ms(median)}  p95 {format_ms(p95)}"
+            )
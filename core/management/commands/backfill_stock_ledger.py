@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import FinancialReport
+from core.utils.stock_ledger import rebuild_stock_ledger, verify_stock_ledger
+
+
+class Command(BaseCommand):
+    help = "Build (or with --verify, check) the stock ledger of reports from their HppEntry/RevenueItem rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("report_ids", nargs="*", type=int, help="Only these reports (default: all)")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare stored balances against a fresh computation without writing; exits 1 on drift.",
+        )
+
+    def handle(self, *args, report_ids=None, verify=False, **options):
+        reports = FinancialReport.objects.order_by("id")
+        if report_ids:
+            reports = reports.filter(id__in=report_ids)
+
+        drifted = products = 0
+        for report in reports.iterator():
+            if verify:
+                diff = verify_stock_ledger(report)
+                if diff:
+                    drifted += 1
+                    for product_id, (stored, expected) in diff.items():
+                        self.stdout.write(f"report {report.id}: product {product_id} stored={stored} expected={expected}")
+            else:
+                products += len(rebuild_stock_ledger(report))
+
+        if verify:
+            if drifted:
+                raise CommandError(f"{drifted} report stock ledgers are out of date.")
+            self.stdout.write(self.style.SUCCESS("All stock ledgers are up to date."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the stock ledger of {products} products in {reports.count()} reports."))
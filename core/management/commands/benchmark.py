@@ -0,0 +1,32 @@
+import importlib
+
+from django.core.management.base import BaseCommand
+
+# name -> module in core.benchmarks exposing add_arguments(parser) and run(command, **options)
+BENCHMARKS = {
+    "excel-detail": "core.benchmarks.excel_detail",
+    "excel-export": "core.benchmarks.excel_export",
+    "hpp-batch": "core.benchmarks.hpp_batch",
+    "indexes": "core.benchmarks.indexes",
+    "line-items": "core.benchmarks.line_items",
+    "revenue-import": "core.benchmarks.revenue_import",
+    "roll-forward": "core.benchmarks.roll_forward",
+    "sqlite-locking": "core.benchmarks.sqlite_locking",
+}
+
+
+class Command(BaseCommand):
+    help = "Run a performance benchmark against a throwaway database."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="benchmark", required=True)
+        for name, module_path in BENCHMARKS.items():
+            module = importlib.import_module(module_path)
+            subparser = subparsers.add_parser(name, help=(module.__doc__ or "").strip().splitlines()[0])
+            module.add_arguments(subparser)
+
+    def handle(self, *args, benchmark=None, **options):
+        module = importlib.import_module(BENCHMARKS[benchmark])
+        for key in ("verbosity", "settings", "pythonpath", "traceback", "no_color", "force_color", "skip_checks"):
+            options.pop(key, None)
+        module.run(self, **options)
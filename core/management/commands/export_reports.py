@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import FinancialReport
+from core.utils.bulk_export import bulk_export_tasks, iter_rendered, iter_zip
+
+
+class Command(BaseCommand):
+    help = "Write the Excel (and with --pdf also PDF) exports of several reports into one ZIP archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("report_ids", nargs="*", type=int, help="Only these reports")
+        parser.add_argument("--year", type=int, help="Only reports of this year")
+        parser.add_argument("--user", help="Only reports of this username")
+        parser.add_argument("--pdf", action="store_true", help="Also include the PDF of every report.")
+        parser.add_argument("--workers", type=int, help="Render processes (default: BULK_EXPORT_WORKERS).")
+        parser.add_argument("-o", "--output", required=True, help="Path of the ZIP archive to write.")
+
+    def handle(self, *args, report_ids=None, year=None, user=None, pdf=False, workers=None, output=None, **options):
+        if not report_ids and year is None and user is None:
+            raise CommandError("Give report ids, --year or --user.")
+
+        reports = FinancialReport.objects.order_by("year", "month", "id")
+        if report_ids:
+            reports = reports.filter(id__in=report_ids)
+        if year is not None:
+            reports = reports.filter(year=year)
+        if user is not None:
+            reports = reports.filter(user__username=user)
+        reports = list(reports)
+        if not reports:
+            raise CommandError("No reports match.")
+
+        kinds = ["excel", "pdf"] if pdf else ["excel"]
+        failed = 0
+
+        def progress(entries):
+            nonlocal failed
+            for report_id, kind, filename, path, error in entries:
+                if error is None:
+                    self.stdout.write(f"report {report_id}: {kind} -> {filename}")
+                else:
+                    failed += 1
+                    self.stderr.write(f"report {report_id}: {kind} failed: {error}")
+                yield report_id, kind, filename, path, error
+
+        with open(output, "wb") as f:
+            for chunk in iter_zip(progress(iter_rendered(bulk_export_tasks(reports, kinds), workers))):
+                f.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(reports)} reports to {output}" + (f" ({failed} exports failed, see ERRORS.txt)." if failed else ".")
+        ))
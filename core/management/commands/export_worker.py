@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from core.utils.export_jobs import process_next_job, purge_finished_jobs, requeue_stale_jobs
+
+# Seconds between stale-job / expired-file sweeps
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = "Process queued PDF/Excel export jobs. Runs until stopped unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=2.0, help="Seconds to sleep while the queue is empty."
+        )
+        parser.add_argument("--max-jobs", type=int, help="Exit after processing this many jobs.")
+
+    def handle(self, *args, once=False, poll_interval=2.0, max_jobs=None, **options):
+        processed = 0
+        next_housekeeping = 0
+        while max_jobs is None or processed < max_jobs:
+            # Long-running process: drop connections past CONN_MAX_AGE or broken ones between jobs
+            if not connection.in_atomic_block:
+                close_old_connections()
+            if time.monotonic() >= next_housekeeping:
+                requeued = requeue_stale_jobs()
+                purged = purge_finished_jobs()
+                if requeued or purged:
+                    self.stdout.write(f"Requeued {requeued} stale jobs, purged {purged} expired jobs.")
+                next_housekeeping = time.monotonic() + HOUSEKEEPING_INTERVAL
+
+            job = process_next_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            processed += 1
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(f"Job {job.id}: {job.kind} of report {job.report_id} -> {job.file.name}")
+            else:
+                self.stderr.write(f"Job {job.id}: {job.kind} of report {job.report_id} failed: {job.error}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} export jobs."))
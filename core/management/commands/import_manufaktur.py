@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import FinancialReport
+from core.utils.manufaktur_import import ManufakturImportError, import_manufaktur_workbook
+
+
+class Command(BaseCommand):
+    help = "Import the manufaktur HPP sections (Bahan Baku, BDP, BTKL, BOP, Barang Jadi) from an XLSX workbook."
+
+    def add_arguments(self, parser):
+        parser.add_argument("report_id", type=int)
+        parser.add_argument("path", help="XLSX workbook with one sheet per section")
+        parser.add_argument(
+            "--skip-invalid",
+            action="store_true",
+            help="Import the valid rows even when some rows are invalid (default: import nothing).",
+        )
+
+    def handle(self, *args, report_id=None, path=None, skip_invalid=False, **options):
+        try:
+            report = FinancialReport.objects.get(pk=report_id)
+        except FinancialReport.DoesNotExist:
+            raise CommandError(f"Report {report_id} does not exist.")
+        if report.business_type != "manufaktur":
+            raise CommandError(f"Report {report_id} is not a manufaktur report.")
+
+        try:
+            with open(path, "rb") as f:
+                result = import_manufaktur_workbook(report, f, skip_invalid=skip_invalid)
+        except (OSError, ManufakturImportError) as e:
+            raise CommandError(str(e))
+
+        for sheet, row_number, error in result.errors:
+            self.stderr.write(f"{sheet} row {row_number}: {error}")
+        if result.errors and not skip_invalid:
+            raise CommandError(f"{len(result.errors)} invalid rows, nothing imported.")
+
+        counts = ", ".join(f"{sheet} {count}" for sheet, count in result.created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {sum(result.created.values())} rows ({counts or 'none'})."
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import FinancialReport
+from core.utils.revenue_import import RevenueImportError, import_revenue_file
+
+
+class Command(BaseCommand):
+    help = "Import pendapatan rows from a CSV or XLSX file into a report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("report_id", type=int)
+        parser.add_argument("path", help="CSV or XLSX file with a header row")
+        parser.add_argument(
+            "--skip-invalid",
+            action="store_true",
+            help="Import the valid rows even when some rows are invalid (default: import nothing).",
+        )
+
+    def handle(self, *args, report_id=None, path=None, skip_invalid=False, **options):
+        try:
+            report = FinancialReport.objects.get(pk=report_id)
+        except FinancialReport.DoesNotExist:
+            raise CommandError(f"Report {report_id} does not exist.")
+
+        try:
+            with open(path, "rb") as f:
+                result = import_revenue_file(report, f, path, skip_invalid=skip_invalid)
+        except (OSError, RevenueImportError) as e:
+            raise CommandError(str(e))
+
+        for row_number, error in result.errors:
+            self.stderr.write(f"row {row_number}: {error}")
+        if result.errors and not skip_invalid:
+            raise CommandError(f"{len(result.errors)} invalid rows, nothing imported.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} revenue items ({result.products_created} new products)."
+        ))
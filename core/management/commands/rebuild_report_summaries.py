@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import FinancialReport
+from core.utils.report_summary import rebuild_report_summary, verify_report_summary
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or with --verify, check) the ReportSummary rows from the raw line items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("report_ids", nargs="*", type=int, help="Only these reports (default: all)")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare stored summaries against a fresh computation without writing; exits 1 on drift.",
+        )
+
+    def handle(self, *args, report_ids=None, verify=False, **options):
+        reports = FinancialReport.objects.order_by("id")
+        if report_ids:
+            reports = reports.filter(id__in=report_ids)
+
+        drifted = 0
+        for report in reports.iterator():
+            if verify:
+                diff = verify_report_summary(report)
+                if diff:
+                    drifted += 1
+                    for field, (stored, expected) in diff.items():
+                        self.stdout.write(f"report {report.id}: {field} stored={stored} expected={expected}")
+            else:
+                rebuild_report_summary(report)
+
+        if verify:
+            if drifted:
+                raise CommandError(f"{drifted} report summaries are out of date.")
+            self.stdout.write(self.style.SUCCESS("All report summaries are up to date."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {reports.count()} report summaries."))
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+# Flag bits mirror core.utils.completion; copied so the migration stays frozen
+SECTIONS = [
+    (1 << 0, 'RevenueItem', {'revenue_type': 'usaha'}),
+    (1 << 1, 'HppEntry', {}),
+    (1 << 2, 'HppManufactureMaterial', {}),
+    (1 << 3, 'HppManufactureWIP', {}),
+    (1 << 4, 'HppManufactureLabor', {}),
+    (1 << 5, 'HppManufactureOverhead', {}),
+    (1 << 6, 'HppManufactureFinishedGoods', {}),
+    (1 << 7, 'HppManufactureProduction', {}),
+    (1 << 8, 'ExpenseItem', {'expense_category': 'usaha'}),
+]
+
+
+def backfill_completion_flags(apps, schema_editor):
+    FinancialReport = apps.get_model('core', 'FinancialReport')
+    flags_by_report = {}
+    for flag, model_name, filters in SECTIONS:
+        model = apps.get_model('core', model_name)
+        report_ids = model.objects.filter(**filters).values_list('report_id', flat=True).distinct()
+        for report_id in report_ids:
+            flags_by_report[report_id] = flags_by_report.get(report_id, 0) | flag
+
+    for report_id, flags in flags_by_report.items():
+        FinancialReport.objects.filter(pk=report_id).update(completion_flags=flags)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_hppmanufacturefinishedgoods_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialreport',
+            name='completion_flags',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_completion_flags, migrations.RunPython.noop),
+    ]
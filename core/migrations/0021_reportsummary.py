@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_financialreport_completion_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pendapatan_usaha', models.BigIntegerField(default=0)),
+                ('pendapatan_lain', models.BigIntegerField(default=0)),
+                ('beban_usaha', models.BigIntegerField(default=0)),
+                ('beban_lain', models.BigIntegerField(default=0)),
+                ('persediaan_awal', models.BigIntegerField(default=0)),
+                ('pembelian_neto', models.BigIntegerField(default=0)),
+                ('persediaan_akhir', models.BigIntegerField(default=0)),
+                ('hpp_dagang', models.BigIntegerField(default=0)),
+                ('bb_awal', models.BigIntegerField(default=0)),
+                ('bb_pembelian', models.BigIntegerField(default=0)),
+                ('bb_akhir', models.BigIntegerField(default=0)),
+                ('btkl', models.BigIntegerField(default=0)),
+                ('bop', models.BigIntegerField(default=0)),
+                ('bdp_awal', models.BigIntegerField(default=0)),
+                ('bdp_akhir', models.BigIntegerField(default=0)),
+                ('bj_awal', models.BigIntegerField(default=0)),
+                ('bj_akhir', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='core.financialreport')),
+            ],
+        ),
+    ]
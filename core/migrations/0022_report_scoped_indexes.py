@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_reportsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenseitem',
+            index=models.Index(fields=['report', 'expense_category', 'total'], name='expense_report_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hppmanufacturefinishedgoods',
+            index=models.Index(fields=['report', 'type', 'product', 'total'], name='fg_report_type_prod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hppmanufacturematerial',
+            index=models.Index(fields=['report', 'type', 'product', 'total'], name='material_report_type_prod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hppmanufacturewip',
+            index=models.Index(fields=['report', 'type', 'product', 'total'], name='wip_report_type_prod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revenueitem',
+            index=models.Index(fields=['report', 'revenue_type', 'product', 'total'], name='revenue_report_type_prod_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_report_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialreport',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity_awal', models.IntegerField(default=0)),
+                ('quantity_in', models.IntegerField(default=0)),
+                ('quantity_out', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('movement_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balance', to='core.product')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balances', to='core.financialreport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['report', 'product', 'quantity'], name='stockbalance_report_prod_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('AWAL', 'Persediaan Awal'), ('PEMBELIAN', 'Pembelian'), ('RETUR', 'Retur Pembelian'), ('PRODUKSI', 'Produksi'), ('PENJUALAN', 'Penjualan')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('balance', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='core.product')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='core.financialreport')),
+            ],
+            options={
+                'ordering': ['product_id', 'sequence'],
+                'constraints': [models.UniqueConstraint(fields=('report', 'product', 'sequence'), name='stockmovement_seq_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:30
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def split_retur_from_out(apps, schema_editor):
+    # quantity_out used to include the retur pembelian movements
+    StockBalance = apps.get_model('core', 'StockBalance')
+    StockMovement = apps.get_model('core', 'StockMovement')
+    returs = (
+        StockMovement.objects.filter(kind='RETUR')
+        .values('product_id')
+        .annotate(qty=Sum('quantity'))
+        .values_list('product_id', 'qty')
+    )
+    for product_id, qty in returs:
+        StockBalance.objects.filter(product_id=product_id).update(
+            quantity_retur=-qty, quantity_out=models.F('quantity_out') + qty
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockbalance',
+            name='quantity_retur',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(split_retur_from_out, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_stockbalance_quantity_retur'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsummary',
+            name='hpp_dagang_products',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
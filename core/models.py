@@ -18,9 +18,25 @@ class FinancialReport(models.Model):
 
     ptkp_status = models.CharField(max_length=10, blank=True, null=True)
 
+    # Bitmask of which wizard sections have data, see core.utils.completion
+    completion_flags = models.PositiveIntegerField(default=0)
+    # Bumped on every change to the report or its line items, see core.utils.report_cache
+    version = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        # Increment in SQL so a save from a stale instance cannot roll the version back
+        self.version = models.F("version") + 1
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["version"])
+
     def __str__(self):
         return f"{self.company_name} - {self.month} {self.year} ({self.user.username})"
 
@@ -50,6 +66,11 @@ class RevenueItem(models.Model):
     selling_price = models.BigIntegerField(default=0) 
     total = models.BigIntegerField(default=0) 
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'revenue_type', 'product', 'total'], name='revenue_report_type_prod_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.revenue_type == 'usaha':
             if not self.product:
@@ -113,6 +134,9 @@ class HppManufactureMaterial(models.Model):
 
     class Meta:
         ordering = ['product__name', 'type']
+        indexes = [
+            models.Index(fields=['report', 'type', 'product', 'total'], name='material_report_type_prod_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.get_type_display()}"
@@ -134,6 +158,9 @@ class HppManufactureWIP(models.Model):  # Barang Dalam Proses
 
     class Meta:
         ordering = ['product__name', 'type']
+        indexes = [
+            models.Index(fields=['report', 'type', 'product', 'total'], name='wip_report_type_prod_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.get_type_display()} (Rp {self.total})"
@@ -201,6 +228,9 @@ class HppManufactureFinishedGoods(models.Model):  # Barang Jadi
 
     class Meta:
         ordering = ['product__name', 'type']
+        indexes = [
+            models.Index(fields=['report', 'type', 'product', 'total'], name='fg_report_type_prod_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.get_type_display()} (Rp {self.total})"
@@ -225,6 +255,185 @@ class ExpenseItem(models.Model):
     name = models.CharField(max_length=255)
     total = models.BigIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'expense_category', 'total'], name='expense_report_category_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_expense_category_display()} - {self.name}"
 
+
+# ReportSummary
+class ReportSummary(models.Model):
+    """
+    Materialized totals of one FinancialReport, kept up to date by the
+    line-item signals (see core.utils.report_summary). Laba/pajak are derived.
+    """
+    report = models.OneToOneField(FinancialReport, on_delete=models.CASCADE, related_name="summary")
+
+    pendapatan_usaha = models.BigIntegerField(default=0)
+    pendapatan_lain = models.BigIntegerField(default=0)
+    beban_usaha = models.BigIntegerField(default=0)
+    beban_lain = models.BigIntegerField(default=0)
+
+    # Dagang (FIFO per produk, recomputed when HppEntry/pendapatan usaha change)
+    persediaan_awal = models.BigIntegerField(default=0)
+    pembelian_neto = models.BigIntegerField(default=0)
+    persediaan_akhir = models.BigIntegerField(default=0)
+    hpp_dagang = models.BigIntegerField(default=0)
+    # {product id: [persediaan_awal, pembelian_neto, persediaan_akhir, hpp_dagang]}, what each
+    # product adds to the four columns above, so a change to one product applies a difference.
+    # NULL on summaries built before it: the next refresh recomputes the whole report.
+    hpp_dagang_products = models.JSONField(null=True, blank=True)
+
+    # Manufaktur
+    bb_awal = models.BigIntegerField(default=0)
+    bb_pembelian = models.BigIntegerField(default=0)
+    bb_akhir = models.BigIntegerField(default=0)
+    btkl = models.BigIntegerField(default=0)
+    bop = models.BigIntegerField(default=0)
+    bdp_awal = models.BigIntegerField(default=0)
+    bdp_akhir = models.BigIntegerField(default=0)
+    bj_awal = models.BigIntegerField(default=0)
+    bj_akhir = models.BigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ringkasan {self.report}"
+
+    @property
+    def jumlah_pendapatan(self):
+        return self.pendapatan_usaha + self.pendapatan_lain
+
+    @property
+    def cogm(self):
+        total_bbb = self.bb_awal + self.bb_pembelian - self.bb_akhir
+        return total_bbb + self.btkl + self.bop + self.bdp_awal - self.bdp_akhir
+
+    @property
+    def hpp_total(self):
+        if self.report.business_type == "manufaktur":
+            return self.cogm + self.bj_awal - self.bj_akhir
+        return self.hpp_dagang
+
+    @property
+    def jumlah_beban(self):
+        return self.hpp_total + self.beban_usaha + self.beban_lain
+
+    @property
+    def laba_sebelum_pajak(self):
+        return self.jumlah_pendapatan - self.jumlah_beban
+
+    @property
+    def pajak_penghasilan(self):
+        if self.report.omzet_status == "iya" and self.jumlah_pendapatan > 500_000_000:
+            return self.jumlah_pendapatan * 0.005
+        return 0
+
+    @property
+    def laba_setelah_pajak(self):
+        return self.laba_sebelum_pajak - self.pajak_penghasilan
+
+
+# ExportJob
+class ExportJob(models.Model):
+    """
+    A PDF or Excel export rendered by ``manage.py export_worker`` outside the
+    request, then downloaded from the stored file (see core.utils.export_jobs).
+    """
+    KIND_CHOICES = [
+        ('pdf', 'PDF'),
+        ('excel', 'Excel'),
+        ('excel_detail', 'Excel (Detail)'),
+    ]
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Menunggu'),
+        (STATUS_RUNNING, 'Diproses'),
+        (STATUS_DONE, 'Selesai'),
+        (STATUS_FAILED, 'Gagal'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="export_jobs")
+    report = models.ForeignKey(FinancialReport, on_delete=models.CASCADE, related_name="export_jobs")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # FinancialReport.version the file was rendered from
+    report_version = models.PositiveIntegerField(default=0)
+
+    file = models.FileField(upload_to='exports/%Y/%m/%d/', blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.report_id} ({self.get_status_display()})"
+
+
+# Stock ledger
+class StockMovement(models.Model):
+    """
+    One change to a product's quantity on hand, with the running balance
+    after it. Appended as HppEntry/RevenueItem (dagang) or Barang Jadi/Produksi
+    (manufaktur) rows are created and rebuilt from them when one is edited or
+    deleted, see core.utils.stock_ledger.
+    """
+    KIND_CHOICES = [
+        ('AWAL', 'Persediaan Awal'),
+        ('PEMBELIAN', 'Pembelian'),
+        ('RETUR', 'Retur Pembelian'),
+        ('PRODUKSI', 'Produksi'),
+        ('PENJUALAN', 'Penjualan'),
+    ]
+    report = models.ForeignKey(FinancialReport, on_delete=models.CASCADE, related_name="stock_movements")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_movements")
+
+    sequence = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quantity = models.IntegerField()  # signed: incoming > 0, outgoing < 0
+    balance = models.IntegerField()   # quantity on hand after this movement
+
+    class Meta:
+        ordering = ['product_id', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['report', 'product', 'sequence'], name='stockmovement_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} #{self.sequence} {self.kind} {self.quantity:+d} -> {self.balance}"
+
+
+class StockBalance(models.Model):
+    """Running-balance snapshot of one product at the end of its report's period."""
+    report = models.ForeignKey(FinancialReport, on_delete=models.CASCADE, related_name="stock_balances")
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="stock_balance")
+
+    quantity_awal = models.IntegerField(default=0)
+    quantity_in = models.IntegerField(default=0)     # pembelian / produksi
+    quantity_retur = models.IntegerField(default=0)  # retur pembelian, as a positive number
+    quantity_out = models.IntegerField(default=0)    # penjualan, as a positive number
+    quantity = models.IntegerField(default=0)        # on hand: awal + in - retur - out
+    movement_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'product', 'quantity'], name='stockbalance_report_prod_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stok {self.product_id}: {self.quantity}"
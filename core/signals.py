@@ -0,0 +1,192 @@
+from collections import defaultdict
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from core.models import ExportJob, FinancialReport, Product, RevenueItem
+from core.utils.completion import (
+    TRACKED_MODELS,
+    refresh_completion_flags,
+    row_counts_for_flag,
+    set_completion_flags,
+)
+from core.utils.report_cache import REPORT_CHILD_MODELS, bump_report_version
+from core.utils.report_summary import (
+    HPP_DAGANG_MODELS,
+    LINEAR_BUCKETS,
+    apply_summary_deltas,
+    rebuild_report_summary,
+    schedule_hpp_dagang_refresh,
+    summary_state,
+)
+from core.utils.stock_ledger import (
+    STOCK_SOURCE_MODELS,
+    affects_stock,
+    rebuild_stock_ledger,
+    record_stock_movements,
+)
+
+
+def _sync_cached_report(instance, flags=None):
+    """Keep an already-loaded instance.report in step with the stored flags."""
+    field = type(instance).report.field
+    if field.is_cached(instance):
+        report = instance.report
+        if flags is None:
+            report.refresh_from_db(fields=["completion_flags"])
+        else:
+            report.completion_flags |= flags
+
+
+def _bump_report_version(instance):
+    bump_report_version(instance.report_id)
+    if type(instance).report.field.is_cached(instance):
+        instance.report.refresh_from_db(fields=["version"])
+
+
+def _deleting_whole_report(origin):
+    return isinstance(origin, FinancialReport) or getattr(origin, "model", None) is FinancialReport
+
+
+def _deleting_product(origin):
+    return isinstance(origin, Product) or getattr(origin, "model", None) is Product
+
+
+def _refresh_stock_ledger(instance):
+    # The product a loaded row had before an edit moved it, if any
+    product_ids = {instance.product_id, getattr(instance, "_stock_product_id", None)}
+    rebuild_stock_ledger(instance.report, product_ids)
+
+
+def refresh_after_bulk(report, models, product_ids=None):
+    """
+    Do once for a bulk write of ``models`` rows what the receivers below do
+    per row (bulk_create/bulk_update skip them): completion flags, the stock
+    ledger of ``product_ids`` (default: every product), the summary and the
+    cache version. Returns the rebuilt ReportSummary.
+    """
+    refresh_completion_flags(report.id, models)
+    rebuild_stock_ledger(report, product_ids)
+    summary = rebuild_report_summary(report)
+    bump_report_version(report.id)
+    return summary
+
+
+def _affects_hpp_dagang(sender, instance, old_state=None):
+    """HppEntry changes, and pendapatan usaha changes (which decide the product set)."""
+    if sender not in HPP_DAGANG_MODELS:
+        return False
+    if sender is RevenueItem:
+        return instance.revenue_type == "usaha" or bool(old_state and old_state[1] == "pendapatan_usaha")
+    return True
+
+
+def _hpp_dagang_products(instance):
+    # A pendapatan row moved to another product changes the FIFO HPP of both
+    return {instance.product_id, getattr(instance, "_stock_product_id", None)}
+
+
+def line_item_loaded(sender, instance, **kwargs):
+    # Remember what a loaded row contributed so a later save can apply a delta
+    field, _buckets = LINEAR_BUCKETS[sender]
+    needed = {"report_id", "total", field}
+    deferred = instance.get_deferred_fields()
+    if instance.pk is None or needed & deferred:
+        instance._summary_state = None
+    else:
+        instance._summary_state = summary_state(instance)
+
+    if sender in STOCK_SOURCE_MODELS:
+        # The product whose stock ledger the row counts in, for an edit that moves it elsewhere
+        counted = instance.pk is not None and not deferred and affects_stock(instance)
+        instance._stock_product_id = instance.product_id if counted else None
+
+
+# post_init fires for every row fetched, so only listen on the summed models (which include
+# the stock ledger's RevenueItem and Barang Jadi sources)
+for _model in LINEAR_BUCKETS:
+    post_init.connect(line_item_loaded, sender=_model, dispatch_uid=f"summary_state_{_model.__name__}")
+
+
+def line_item_saved(sender, instance, created, **kwargs):
+    if kwargs.get("raw"):
+        return
+
+    if sender in TRACKED_MODELS:
+        flag, _filters = TRACKED_MODELS[sender]
+        if row_counts_for_flag(instance):
+            set_completion_flags(instance.report_id, flag)
+            _sync_cached_report(instance, flag)
+        elif not created:
+            # An edit may have moved the last matching row out of its section
+            refresh_completion_flags(instance.report_id, [sender])
+            _sync_cached_report(instance)
+
+    if sender in LINEAR_BUCKETS:
+        old = None if created else instance._summary_state
+        new = summary_state(instance)
+        if not created and old is None:
+            rebuild_report_summary(FinancialReport.objects.get(pk=instance.report_id))
+        else:
+            deltas = defaultdict(lambda: defaultdict(int))
+            if old:
+                deltas[old[0]][old[1]] -= old[2]
+            deltas[new[0]][new[1]] += new[2]
+            for report_id, report_deltas in deltas.items():
+                apply_summary_deltas(report_id, report_deltas)
+        instance._summary_state = new
+    else:
+        old = None
+
+    if _affects_hpp_dagang(sender, instance, old):
+        schedule_hpp_dagang_refresh(instance.report_id, _hpp_dagang_products(instance))
+
+    if sender in STOCK_SOURCE_MODELS:
+        if created:
+            record_stock_movements(instance)
+        elif affects_stock(instance) or getattr(instance, "_stock_product_id", None):
+            # An edit rewrites the product's history, so rebuild it
+            _refresh_stock_ledger(instance)
+        instance._stock_product_id = instance.product_id if affects_stock(instance) else None
+
+    if sender in REPORT_CHILD_MODELS:
+        _bump_report_version(instance)
+
+
+def line_item_deleted(sender, instance, origin=None, **kwargs):
+    # Whole report is being deleted, nothing left to keep in sync
+    if _deleting_whole_report(origin):
+        return
+
+    if sender in TRACKED_MODELS and row_counts_for_flag(instance):
+        refresh_completion_flags(instance.report_id, [sender])
+        _sync_cached_report(instance)
+
+    if sender in LINEAR_BUCKETS:
+        report_id, bucket, total = summary_state(instance)
+        apply_summary_deltas(report_id, {bucket: -total})
+
+    if _affects_hpp_dagang(sender, instance):
+        schedule_hpp_dagang_refresh(instance.report_id, [instance.product_id])
+
+    # A deleted product takes its ledger with it
+    if sender in STOCK_SOURCE_MODELS and affects_stock(instance) and not _deleting_product(origin):
+        _refresh_stock_ledger(instance)
+
+    if sender in REPORT_CHILD_MODELS:
+        _bump_report_version(instance)
+
+
+# Only listen on the models something is derived from, so deletes of everything else
+# (the stock ledger, the summary, cascades from a report) keep Django's fast path
+LINE_ITEM_MODELS = {
+    *TRACKED_MODELS, *LINEAR_BUCKETS, *HPP_DAGANG_MODELS, *STOCK_SOURCE_MODELS, *REPORT_CHILD_MODELS,
+}
+for _model in LINE_ITEM_MODELS:
+    post_save.connect(line_item_saved, sender=_model, dispatch_uid=f"line_item_saved_{_model.__name__}")
+    post_delete.connect(line_item_deleted, sender=_model, dispatch_uid=f"line_item_deleted_{_model.__name__}")
+
+
+@receiver(post_delete, sender=ExportJob)
+def export_job_deleted(sender, instance, **kwargs):
+    # The stored artifact goes with its job
+    if instance.file:
+        instance.file.delete(save=False)
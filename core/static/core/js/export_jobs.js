@@ -0,0 +1,58 @@
+// Export menu: queue the export as a background job and download it once the worker is done.
+// Falls back to the direct (synchronous) export link when no worker picks the job up.
+document.addEventListener("DOMContentLoaded", function () {
+  const menu = document.getElementById("export-menu");
+  const statusText = document.getElementById("export-status");
+  if (!menu || !menu.dataset.exportUrl) return;
+
+  const POLL_INTERVAL_MS = 1500;
+  const QUEUED_FALLBACK_MS = 20000;
+  const csrfInput = menu.querySelector("input[name=csrfmiddlewaretoken]");
+
+  const showStatus = (text) => {
+    if (!statusText) return;
+    statusText.textContent = text;
+    statusText.classList.toggle("hidden", !text);
+  };
+
+  const poll = (job, link, queuedSince) => {
+    fetch(job.status_url, { headers: { Accept: "application/json" } })
+      .then((response) => response.json())
+      .then((job) => {
+        if (job.status === "done") {
+          showStatus("");
+          window.location = job.download_url;
+        } else if (job.status === "failed") {
+          showStatus(`Gagal membuat export: ${job.error || "kesalahan tidak diketahui"}`);
+        } else if (job.status === "queued" && Date.now() - queuedSince > QUEUED_FALLBACK_MS) {
+          window.location = link.href;
+        } else {
+          showStatus(job.status === "running" ? "Sedang membuat file..." : "Menunggu antrean export...");
+          setTimeout(() => poll(job, link, queuedSince), POLL_INTERVAL_MS);
+        }
+      })
+      .catch(() => (window.location = link.href));
+  };
+
+  menu.querySelectorAll("[data-export-kind]").forEach((link) => {
+    link.addEventListener("click", function (e) {
+      e.preventDefault();
+      menu.classList.add("hidden");
+      showStatus("Menyiapkan export...");
+
+      const body = new FormData();
+      body.append("kind", link.dataset.exportKind);
+      fetch(menu.dataset.exportUrl, {
+        method: "POST",
+        body: body,
+        headers: { "X-CSRFToken": csrfInput ? csrfInput.value : "" },
+      })
+        .then((response) => {
+          if (!response.ok) throw new Error(response.statusText);
+          return response.json();
+        })
+        .then((job) => poll(job, link, Date.now()))
+        .catch(() => (window.location = link.href));
+    });
+  });
+});
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.models import FinancialReport, ExpenseItem
+from core.utils.artifact_store import artifact_key, evict_artifacts, get_or_render_artifact
+from core.utils.excel_exporter import write_excel_file
+from core.utils.report_cache import get_report_result
+
+
+class ArtifactStoreTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        artifacts = override_settings(ARTIFACT_ROOT=self.root)
+        artifacts.enable()
+        self.addCleanup(artifacts.disable)
+
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        ExpenseItem.objects.create(report=self.report, name="Sewa", total=100)
+        self.report.refresh_from_db()
+        self.client.login(username="tester", password="test123")
+
+    def key(self, kind="excel"):
+        return artifact_key(self.report, get_report_result(self.report), kind)
+
+    def test_key_follows_the_report_data(self):
+        key = self.key()
+        self.assertEqual(self.key(), key)
+        self.assertNotEqual(self.key("excel_detail"), key)
+
+        ExpenseItem.objects.create(report=self.report, name="Listrik", total=50)
+        self.report.refresh_from_db()
+        self.assertNotEqual(self.key(), key)
+
+    def test_detail_key_follows_the_version(self):
+        key = self.key("excel_detail")
+        # Same totals, different line items
+        ExpenseItem.objects.filter(report=self.report).update(name="Sewa gudang")
+        FinancialReport.objects.filter(pk=self.report.pk).update(version=self.report.version + 1)
+        self.report.refresh_from_db()
+
+        self.assertNotEqual(self.key("excel_detail"), key)
+
+    def test_second_export_is_served_from_the_store(self):
+        url = reverse("core:export_excel", args=[self.report.id])
+
+        with mock.patch("core.utils.artifact_store.write_excel_file", wraps=write_excel_file) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first["ETag"], f'"{self.key()}"')
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(b"".join(second.streaming_content), b"".join(first.streaming_content))
+
+    def test_matching_etag_is_not_modified(self):
+        url = reverse("core:export_excel", args=[self.report.id])
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        ExpenseItem.objects.create(report=self.report, name="Listrik", total=50)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_eviction_drops_least_recently_used(self):
+        paths = []
+        for i, kind in enumerate(("excel", "excel_detail")):
+            path = get_or_render_artifact(self.report, get_report_result(self.report), kind)
+            os.utime(path, (1000 + i, 1000 + i))
+            paths.append(path)
+        older, newer = paths
+
+        self.assertEqual(evict_artifacts(max_bytes=newer.stat().st_size), 1)
+        self.assertFalse(older.exists())
+        self.assertTrue(newer.exists())
+
+    def test_failed_render_leaves_no_file(self):
+        with mock.patch("core.utils.artifact_store.write_excel_file", side_effect=ValueError("rusak")):
+            with self.assertRaises(ValueError):
+                get_or_render_artifact(self.report, get_report_result(self.report), "excel")
+
+        self.assertEqual([p for p in Path(self.root).rglob("*") if p.is_file()], [])
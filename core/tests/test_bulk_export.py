@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+from core.models import FinancialReport, ExpenseItem
+from core.utils.bulk_export import bulk_export_tasks, iter_rendered, iter_zip, stream_bulk_export
+
+
+@override_settings(BULK_EXPORT_WORKERS=1)
+class BulkExportTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        artifacts = override_settings(ARTIFACT_ROOT=self.root)
+        artifacts.enable()
+        self.addCleanup(artifacts.disable)
+
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.reports = [
+            FinancialReport.objects.create(
+                user=self.user, company_name="Dummy Co", month=month, year=2025, business_type="dagang"
+            )
+            for month in ("01", "02")
+        ]
+        for report in self.reports:
+            ExpenseItem.objects.create(report=report, name="Sewa", total=100)
+        FinancialReport.objects.create(user=self.user, company_name="Dummy Co", month="12", year=2024)
+        other = User.objects.create_user(username="other", password="test123")
+        FinancialReport.objects.create(user=other, company_name="Lain", month="01", year=2025)
+        self.client.login(username="tester", password="test123")
+
+    def download(self, **params):
+        response = self.client.get(reverse("core:export_bulk"), params)
+        self.assertTrue(response.streaming)
+        return zipfile.ZipFile(BytesIO(b"".join(response.streaming_content)))
+
+    def test_year_selects_the_users_reports(self):
+        archive = self.download(year=2025)
+
+        self.assertEqual(archive.namelist(), [
+            "Laporan_Dagang_Dummy Co_01_2025.xlsx",
+            "Laporan_Dagang_Dummy Co_02_2025.xlsx",
+        ])
+        ws = load_workbook(BytesIO(archive.read(archive.namelist()[0]))).active
+        self.assertEqual(ws.title, "Laporan Laba Rugi")
+
+    def test_ids_and_pdf(self):
+        ids = ",".join(str(report.id) for report in self.reports)
+
+        with mock.patch("core.utils.artifact_store.generate_pdf_file", return_value=b"%PDF-1.4"):
+            archive = self.download(ids=ids, pdf=1)
+
+        # Both PDFs share a name (the PDF filename has no month)
+        self.assertEqual(sorted(archive.namelist()), [
+            "Laporan_Dagang_Dummy Co_01_2025.xlsx",
+            "Laporan_Dagang_Dummy Co_02_2025.xlsx",
+            "Laporan_Dagang_Dummy Co_2025 (2).pdf",
+            "Laporan_Dagang_Dummy Co_2025.pdf",
+        ])
+        self.assertEqual(archive.read("Laporan_Dagang_Dummy Co_2025.pdf"), b"%PDF-1.4")
+
+    def test_failed_exports_are_listed(self):
+        with mock.patch("core.utils.artifact_store.generate_pdf_file", side_effect=IOError("wkhtmltopdf hilang")):
+            archive = self.download(ids=self.reports[0].id, pdf=1)
+
+        self.assertEqual(archive.namelist(), ["Laporan_Dagang_Dummy Co_01_2025.xlsx", "ERRORS.txt"])
+        self.assertIn(b"wkhtmltopdf hilang", archive.read("ERRORS.txt"))
+
+    def test_requires_a_selection(self):
+        for params in ({}, {"ids": "x"}, {"year": 1999}):
+            response = self.client.get(reverse("core:export_bulk"), params)
+            self.assertRedirects(response, reverse("core:report_list"), fetch_redirect_response=False)
+
+    @override_settings(BULK_EXPORT_MAX_REPORTS=1)
+    def test_too_many_reports(self):
+        response = self.client.get(reverse("core:export_bulk"), {"year": 2025})
+
+        self.assertRedirects(response, reverse("core:report_list"), fetch_redirect_response=False)
+
+    def test_zip_is_streamed_in_chunks(self):
+        path = os.path.join(self.root, "big.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(300_000))
+
+        with mock.patch("core.utils.bulk_export.ZIP_CHUNK_SIZE", 64 * 1024):
+            chunks = list(iter_zip([(1, "excel", "big.bin", path, None)]))
+
+        self.assertGreater(len(chunks), 4)
+        self.assertLess(max(map(len, chunks)), 100_000)
+        with open(path, "rb") as f:
+            self.assertEqual(zipfile.ZipFile(BytesIO(b"".join(chunks))).read("big.bin"), f.read())
+
+    def test_command_writes_the_archive(self):
+        output = os.path.join(self.root, "laporan.zip")
+        out = StringIO()
+
+        call_command("export_reports", year=2025, user="tester", output=output, stdout=out)
+
+        self.assertIn("Wrote 2 reports", out.getvalue())
+        self.assertEqual(len(zipfile.ZipFile(output).namelist()), 2)
+
+
+class ParallelBulkExportTest(TransactionTestCase):
+    """The process pool path: spawned workers render against the (file-backed) test database."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        artifacts = override_settings(ARTIFACT_ROOT=self.root)
+        artifacts.enable()
+        self.addCleanup(artifacts.disable)
+
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("Spawned workers cannot open an in-memory test database")
+        user = User.objects.create_user(username="tester", password="test123")
+        self.reports = [
+            FinancialReport.objects.create(
+                user=user, company_name="Dummy Co", month=month, year=2025, business_type="dagang"
+            )
+            for month in ("01", "02", "03")
+        ]
+
+    def test_workers_render_every_report(self):
+        tasks = bulk_export_tasks(self.reports, ["excel"])
+
+        results = list(iter_rendered(tasks, workers=2))
+
+        self.assertEqual(sorted(result[0] for result in results), [report.id for report in self.reports])
+        for _report_id, _kind, filename, path, error in results:
+            self.assertIsNone(error)
+            self.assertTrue(path.startswith(self.root))
+            self.assertEqual(load_workbook(path).active.title, "Laporan Laba Rugi")
+
+        archive = zipfile.ZipFile(BytesIO(b"".join(stream_bulk_export(self.reports, ["excel"], workers=2))))
+        self.assertEqual(len(archive.namelist()), 3)
@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from core.models import FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem
+from core.models import (
+    HppManufactureMaterial,
+    HppManufactureLabor,
+    HppManufactureOverhead,
+    HppManufactureWIP,
+    HppManufactureProduction,
+    HppManufactureFinishedGoods,
+)
+from core.utils.completion import (
+    FLAG_PENDAPATAN_USAHA,
+    FLAG_HPP_DAGANG,
+    FLAG_BEBAN_USAHA,
+    get_completion_status,
+    refresh_completion_flags,
+)
+
+
+class CompletionFlagsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.product = Product.objects.create(report=self.report, name="a")
+
+    def flags(self):
+        self.report.refresh_from_db()
+        return self.report.completion_flags
+
+    def test_flags_follow_creates_and_deletes(self):
+        lain = RevenueItem.objects.create(report=self.report, revenue_type="lain", name="Bunga", total=10)
+        self.assertEqual(self.flags(), 0)
+
+        usaha = RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+        self.assertEqual(self.flags(), FLAG_PENDAPATAN_USAHA)
+
+        lain.delete()
+        self.assertEqual(self.flags(), FLAG_PENDAPATAN_USAHA)
+        usaha.delete()
+        self.assertEqual(self.flags(), 0)
+
+    def test_edit_out_of_section_clears_flag(self):
+        item = ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Sewa", total=10)
+        self.assertEqual(self.flags(), FLAG_BEBAN_USAHA)
+
+        item.expense_category = "lain"
+        item.save()
+        self.assertEqual(self.flags(), 0)
+
+    def test_cached_report_is_updated(self):
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+        self.assertEqual(self.report.completion_flags, FLAG_PENDAPATAN_USAHA)
+
+    def test_status_reads_without_queries(self):
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+        HppEntry.objects.create(report=self.report, product=self.product, category="AWAL")
+        ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Sewa", total=10)
+        report = FinancialReport.objects.get(pk=self.report.pk)
+
+        with self.assertNumQueries(0):
+            status = get_completion_status(report)
+        self.assertEqual(status, {"profile": True, "pendapatan": True, "hpp": True, "beban_usaha": True})
+
+    def test_manufaktur_needs_every_section(self):
+        self.report.business_type = "manufaktur"
+        self.report.save()
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+        HppManufactureMaterial.objects.create(report=self.report, product=self.product, type="BB_AWAL")
+        HppManufactureWIP.objects.create(report=self.report, product=self.product, type="WIP_AWAL")
+        HppManufactureLabor.objects.create(report=self.report, product=self.product)
+        HppManufactureOverhead.objects.create(report=self.report)
+        HppManufactureFinishedGoods.objects.create(report=self.report, product=self.product, type="FG_AWAL")
+        self.assertFalse(get_completion_status(self.report)["hpp"])
+
+        HppManufactureProduction.objects.create(report=self.report, product=self.product)
+        self.assertTrue(get_completion_status(self.report)["hpp"])
+
+    def test_refresh_after_bulk_operations(self):
+        HppEntry.objects.bulk_create([HppEntry(report=self.report, product=self.product, category="AWAL")])
+        self.assertEqual(self.flags(), 0)
+
+        self.assertEqual(refresh_completion_flags(self.report.id), FLAG_HPP_DAGANG)
+        self.assertEqual(self.flags(), FLAG_HPP_DAGANG)
+
+    def test_report_delete(self):
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+        self.report.delete()
+        self.assertFalse(FinancialReport.objects.exists())
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+
+class SqlitePragmaTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_init_command_applies_configured_pragmas(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+
+        self.assertEqual(self.pragma("busy_timeout"), int(settings.SQLITE_PRAGMAS["busy_timeout"]))
+        self.assertEqual(self.pragma("cache_size"), int(settings.SQLITE_PRAGMAS["cache_size"]))
+        # synchronous/temp_store read back as their numeric codes
+        self.assertEqual(self.pragma("synchronous"), {"off": 0, "normal": 1, "full": 2, "extra": 3}[
+            settings.SQLITE_PRAGMAS["synchronous"].lower()
+        ])
+        self.assertEqual(self.pragma("temp_store"), {"default": 0, "file": 1, "memory": 2}[
+            settings.SQLITE_PRAGMAS["temp_store"].lower()
+        ])
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+
+        expected = settings.DATABASES["default"]["OPTIONS"]["transaction_mode"]
+        self.assertEqual(connection.transaction_mode, expected.upper())
@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+from core.models import FinancialReport, Product, RevenueItem, ExpenseItem, HppEntry, HppManufactureOverhead
+from core.utils.excel_exporter import _ExcelBook, generate_excel_file
+
+
+class ExcelExporterTest(TestCase):
+    def setUp(self):
+        artifact_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, artifact_root, ignore_errors=True)
+        artifacts = override_settings(ARTIFACT_ROOT=artifact_root)
+        artifacts.enable()
+        self.addCleanup(artifacts.disable)
+
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="manufaktur"
+        )
+        product = Product.objects.create(report=self.report, name="kursi")
+        RevenueItem.objects.create(report=self.report, product=product, quantity=2, selling_price=500)
+        ExpenseItem.objects.create(report=self.report, scope="manufaktur", name="Sewa gudang bulanan", total=100)
+        HppManufactureOverhead.objects.create(report=self.report, nama_biaya="Listrik", total=700)
+
+    def load(self, content):
+        return load_workbook(BytesIO(content))
+
+    def test_manufaktur_workbook(self):
+        content, filename = generate_excel_file(self.report)
+        wb = self.load(content)
+
+        self.assertEqual(filename, "Laporan_Manufaktur_Dummy Co_01_2025.xlsx")
+        self.assertEqual(wb.sheetnames, ["Lap. HPP", "Lap. Laba Rugi"])
+
+        rows = {row[0]: row for row in wb["Lap. HPP"].iter_rows(values_only=True) if row and row[0]}
+        self.assertEqual(rows["Listrik"][1], 700)
+        self.assertEqual(rows["Total Biaya Overhead Pabrik"][1], 700)
+
+        lr = {row[0]: row for row in wb["Lap. Laba Rugi"].iter_rows(values_only=True) if row and row[0]}
+        self.assertEqual(lr["Sewa gudang bulanan"][1], 100)
+
+    def test_styles_and_widths_survive_write_only_mode(self):
+        wb = self.load(generate_excel_file(self.report)[0])
+        ws = wb["Lap. HPP"]
+        cogm = next(row for row in ws.iter_rows() if row[0].value == "Cost of Goods Manufactured (COGM)")
+
+        self.assertTrue(cogm[0].font.b)
+        self.assertFalse(cogm[1].font.b)
+        self.assertEqual(cogm[1].fill.start_color.rgb, "00F3F4F6")
+        self.assertEqual(ws.column_dimensions["A"].width, len("Cost of Goods Manufactured (COGM)") + 3)
+
+    def test_laporan_rows_are_not_buffered(self):
+        book = _ExcelBook({"Laporan": {1: 13}})
+        writer = book.sheet("Laporan")
+
+        with mock.patch.object(writer.ws, "append", wraps=writer.ws.append) as append:
+            writer.append(["Pendapatan", 100])
+            writer.append(["Jumlah", 100], bold=1, filled=2)
+            # Each row reaches the worksheet as soon as it is appended
+            self.assertEqual(append.call_count, 2)
+        book.save(BytesIO())
+
+    def test_dagang_workbook(self):
+        self.report.business_type = "dagang"
+        self.report.save()
+
+        content, filename = generate_excel_file(self.report)
+        ws = self.load(content).active
+
+        self.assertEqual(filename, "Laporan_Dagang_Dummy Co_01_2025.xlsx")
+        self.assertEqual(ws.title, "Laporan Laba Rugi")
+        self.assertTrue(ws["A6"].font.b)
+        self.assertEqual(ws["A12"].value, "Jenis")
+        self.assertTrue(ws["B12"].font.b)
+
+    def test_export_view_streams_the_file(self):
+        self.client.login(username="tester", password="test123")
+
+        response = self.client.get(reverse("core:export_excel", args=[self.report.id]))
+
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        content = b"".join(response.streaming_content)
+        self.assertEqual(int(response["Content-Length"]), len(content))
+        self.assertEqual(self.load(content).sheetnames, ["Lap. HPP", "Lap. Laba Rugi"])
+
+    def test_detail_workbook_has_a_sheet_per_table(self):
+        content, filename = generate_excel_file(self.report, detail=True)
+        wb = self.load(content)
+
+        self.assertEqual(filename, "Laporan_Manufaktur_Dummy Co_01_2025_Detail.xlsx")
+        self.assertEqual(wb.sheetnames, [
+            "Lap. HPP", "Lap. Laba Rugi", "Pendapatan", "Bahan Baku", "BTKL", "BOP",
+            "BDP", "Barang Diproduksi", "Barang Jadi", "Beban",
+        ])
+        self.assertEqual(list(wb["BOP"].values), [
+            ("Produk", "Nama Biaya", "Qty", "Harga Satuan", "Total", "Keterangan"),
+            (None, "Listrik", 0, 0, 700, None),
+        ])
+        self.assertTrue(wb["Beban"]["A1"].font.b)
+
+    def test_detail_rows_are_read_in_chunks(self):
+        self.report.business_type = "dagang"
+        self.report.save()
+        product = Product.objects.get(report=self.report)
+        for category in ("AWAL", "PEMBELIAN", "AKHIR"):
+            HppEntry.objects.create(report=self.report, product=product, category=category, quantity=1)
+        for total in range(5):
+            ExpenseItem.objects.create(report=self.report, name=f"Beban {total}", total=total)
+
+        with mock.patch("core.utils.excel_exporter.DETAIL_CHUNK_SIZE", 2):
+            wb = self.load(generate_excel_file(self.report, detail=True)[0])
+
+        self.assertEqual(wb.sheetnames[1:], ["Pendapatan", "HPP", "Beban"])
+        self.assertEqual([row[0] for row in wb["HPP"].iter_rows(min_row=2, values_only=True)], ["AWAL", "PEMBELIAN", "AKHIR"])
+        self.assertEqual([row[4] for row in wb["Beban"].iter_rows(min_row=2, values_only=True)], [100, 0, 1, 2, 3, 4])
+
+    def test_export_view_detail_mode(self):
+        self.client.login(username="tester", password="test123")
+
+        response = self.client.get(reverse("core:export_excel", args=[self.report.id]), {"mode": "detail"})
+
+        self.assertIn("_Detail.xlsx", response["Content-Disposition"])
+        self.assertIn("Beban", self.load(b"".join(response.streaming_content)).sheetnames)
@@ -0,0 +1,150 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from core.models import FinancialReport, ExpenseItem, ExportJob
+from core.utils.export_jobs import (
+    claim_next_job,
+    enqueue_export,
+    process_next_job,
+    purge_finished_jobs,
+    requeue_stale_jobs,
+)
+
+
+class ExportJobTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, ARTIFACT_ROOT=f"{media_root}/artifacts")
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        ExpenseItem.objects.create(report=self.report, name="Sewa", total=100)
+        self.report.refresh_from_db()
+
+
+class ExportJobQueueTest(ExportJobTestCase):
+    def test_enqueue_reuses_the_job_for_the_same_version(self):
+        job = enqueue_export(self.report, self.user, "excel")
+
+        self.assertEqual(enqueue_export(self.report, self.user, "excel"), job)
+        self.assertNotEqual(enqueue_export(self.report, self.user, "pdf"), job)
+
+        ExpenseItem.objects.create(report=self.report, name="Listrik", total=50)
+        self.report.refresh_from_db()
+        self.assertNotEqual(enqueue_export(self.report, self.user, "excel"), job)
+
+    def test_a_job_is_claimed_once(self):
+        job = enqueue_export(self.report, self.user, "excel")
+
+        self.assertEqual(claim_next_job(), job)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_RUNNING)
+
+    def test_process_stores_the_file(self):
+        enqueue_export(self.report, self.user, "excel_detail")
+
+        job = process_next_job()
+
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual(job.filename, "Laporan_Dagang_Dummy Co_01_2025_Detail.xlsx")
+        with job.file.open("rb") as f:
+            self.assertIn("Beban", load_workbook(BytesIO(f.read())).sheetnames)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_is_recorded(self):
+        enqueue_export(self.report, self.user, "pdf")
+
+        with mock.patch("core.utils.artifact_store.generate_pdf_file", side_effect=IOError("wkhtmltopdf hilang")):
+            job = process_next_job()
+
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertEqual(job.error, "wkhtmltopdf hilang")
+        # A failed job is not reused
+        self.assertNotEqual(enqueue_export(self.report, self.user, "pdf"), job)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue_export(self.report, self.user, "excel")
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_RUNNING, started_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(requeue_stale_jobs(stale_after=600), 1)
+        self.assertEqual(claim_next_job(), job)
+
+    def test_purge_deletes_expired_jobs_and_files(self):
+        enqueue_export(self.report, self.user, "excel")
+        job = process_next_job()
+        storage, name = job.file.storage, job.file.name
+        ExportJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(purge_finished_jobs(ttl=86400), 1)
+        self.assertFalse(ExportJob.objects.filter(pk=job.pk).exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_worker_command_drains_the_queue(self):
+        enqueue_export(self.report, self.user, "excel")
+        enqueue_export(self.report, self.user, "excel_detail")
+        out = StringIO()
+
+        call_command("export_worker", once=True, stdout=out)
+
+        self.assertIn("Processed 2 export jobs.", out.getvalue())
+        self.assertEqual(ExportJob.objects.filter(status=ExportJob.STATUS_DONE).count(), 2)
+
+
+class ExportJobViewTest(ExportJobTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="tester", password="test123")
+
+    def test_enqueue_poll_download(self):
+        response = self.client.post(reverse("core:export_job_create", args=[self.report.id]), {"kind": "excel"})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()["status_url"]
+        self.assertEqual(self.client.get(status_url).json()["status"], "queued")
+
+        process_next_job()
+        payload = self.client.get(status_url).json()
+
+        self.assertEqual(payload["status"], "done")
+        download = self.client.get(payload["download_url"])
+        self.assertIn("Laporan_Dagang_Dummy", download["Content-Disposition"])
+        self.assertEqual(load_workbook(BytesIO(b"".join(download.streaming_content))).sheetnames, ["Laporan Laba Rugi"])
+
+    def test_rejects_unknown_kind_and_get(self):
+        url = reverse("core:export_job_create", args=[self.report.id])
+
+        self.assertEqual(self.client.post(url, {"kind": "docx"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_jobs_of_other_users_are_hidden(self):
+        User.objects.create_user(username="other", password="test123")
+        job = enqueue_export(self.report, self.user, "excel")
+        process_next_job()
+        self.client.login(username="other", password="test123")
+
+        self.assertEqual(self.client.get(reverse("core:export_job_status", args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("core:export_job_download", args=[job.id])).status_code, 404)
+        self.assertEqual(
+            self.client.post(reverse("core:export_job_create", args=[self.report.id]), {"kind": "pdf"}).status_code,
+            404,
+        )
+
+    def test_download_waits_for_the_job(self):
+        job = enqueue_export(self.report, self.user, "excel")
+
+        self.assertEqual(self.client.get(reverse("core:export_job_download", args=[job.id])).status_code, 404)
@@ -0,0 +1,169 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from core.models import FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem, ReportSummary
+from core.models import (
+    HppManufactureMaterial,
+    HppManufactureLabor,
+    HppManufactureOverhead,
+    HppManufactureWIP,
+    HppManufactureFinishedGoods,
+)
+from core.utils.final_report import (
+    generate_final_report_data,
+    get_manufaktur_report_context,
+    load_manufaktur_totals,
+    ManufakturTotals,
+)
+from core.utils.report_summary import get_report_summary
+
+
+class FinalReportDagangTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user,
+            company_name="Dummy Dagang",
+            month="January",
+            year=2025,
+            business_type="dagang",
+        )
+
+        self.product_b = Product.objects.create(report=self.report, name="b")
+        self.product_c = Product.objects.create(report=self.report, name="c")
+        # Produk tanpa pendapatan usaha tidak ikut dalam HPP per produk
+        Product.objects.create(report=self.report, name="tanpa-penjualan")
+
+        RevenueItem.objects.create(report=self.report, product=self.product_b, revenue_type="usaha", quantity=10, selling_price=10000)
+        RevenueItem.objects.create(report=self.report, product=self.product_c, revenue_type="usaha", quantity=5, selling_price=2000)
+        RevenueItem.objects.create(report=self.report, revenue_type="lain", name="Bunga", total=25000)
+
+        HppEntry.objects.create(report=self.report, product=self.product_b, category="AWAL", quantity=300, harga_satuan=7000)
+        HppEntry.objects.create(
+            report=self.report, product=self.product_b, category="PEMBELIAN",
+            quantity=700, harga_satuan=8500, diskon=400000, retur_qty=50, ongkir=400000
+        )
+        HppEntry.objects.create(report=self.report, product=self.product_b, category="AKHIR", quantity=1000)
+
+        ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Sewa", total=150000)
+        ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Listrik", total=50000)
+        ExpenseItem.objects.create(report=self.report, expense_category="lain", name="Admin Bank", total=5000)
+
+    def test_totals(self):
+        data = generate_final_report_data(self.report)
+
+        self.assertEqual(data["total_pendapatan_usaha"], 110000)
+        self.assertEqual(data["total_pendapatan_lain"], 25000)
+        self.assertEqual(data["jumlah_pendapatan"], 135000)
+        self.assertEqual(data["total_beban_usaha"], 200000)
+        self.assertEqual(data["total_beban_lain"], 5000)
+        self.assertEqual(data["total_persediaan_awal"], 2100000)
+        self.assertEqual(data["total_pembelian_neto"], 5525000)
+        self.assertEqual(data["total_persediaan_akhir"], 7625000)
+        self.assertEqual(data["hpp_total"], 0)
+        self.assertEqual(data["laba_sebelum_pajak"], 135000 - 205000)
+
+    def test_hpp_per_product(self):
+        data = generate_final_report_data(self.report)
+
+        names = [p["product_name"] for p in data["hpp_per_product"]]
+        self.assertEqual(names, ["b", "c"])
+        self.assertEqual(data["hpp_per_product"][1]["hpp"], 0)
+        self.assertEqual(data["hpp_per_product"][1]["detail_awal"], {"qty": 0})
+
+    def test_empty_report(self):
+        empty = FinancialReport.objects.create(user=self.user, company_name="Kosong")
+        data = generate_final_report_data(empty)
+
+        self.assertEqual(data["jumlah_pendapatan"], 0)
+        self.assertEqual(data["jumlah_beban"], 0)
+        self.assertEqual(data["hpp_per_product"], [])
+
+    def test_query_count(self):
+        # summary totals, products + HPP entries, beban items
+        with self.assertNumQueries(3):
+            generate_final_report_data(self.report)
+
+    def test_beban_items_are_plain_data(self):
+        data = generate_final_report_data(self.report)
+
+        self.assertEqual(data["beban_usaha_items"], [
+            {"name": "Sewa", "total": 150000},
+            {"name": "Listrik", "total": 50000},
+        ])
+        self.assertEqual(data["beban_lain_items"], [{"name": "Admin Bank", "total": 5000}])
+
+
+class FinalReportManufakturTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user,
+            company_name="Dummy Manufaktur",
+            month="January",
+            year=2025,
+            business_type="manufaktur",
+        )
+        self.product = Product.objects.create(report=self.report, name="kursi")
+
+        def material(tipe, total):
+            HppManufactureMaterial.objects.create(report=self.report, product=self.product, type=tipe, total=total)
+
+        material("BB_AWAL", 1000)
+        material("BB_PEMBELIAN", 5000)
+        material("BB_PEMBELIAN", 2000)
+        material("BB_AKHIR", 500)
+        HppManufactureWIP.objects.create(report=self.report, product=self.product, type="WIP_AWAL", total=300)
+        HppManufactureWIP.objects.create(report=self.report, product=self.product, type="WIP_AKHIR", total=200)
+        HppManufactureLabor.objects.create(report=self.report, product=self.product, total=1500)
+        HppManufactureOverhead.objects.create(report=self.report, nama_biaya="Listrik", total=700)
+        HppManufactureFinishedGoods.objects.create(report=self.report, product=self.product, type="FG_AWAL", total=400)
+        HppManufactureFinishedGoods.objects.create(report=self.report, product=self.product, type="FG_AKHIR", total=600)
+
+        RevenueItem.objects.create(report=self.report, product=self.product, revenue_type="usaha", quantity=10, selling_price=2000)
+        RevenueItem.objects.create(report=self.report, revenue_type="lain", name="Bunga", total=100)
+        ExpenseItem.objects.create(report=self.report, expense_category="usaha", scope="manufaktur", name="Gaji", total=900)
+
+    def test_load_manufaktur_totals(self):
+        # All component totals come from a single query
+        with self.assertNumQueries(1):
+            totals = load_manufaktur_totals(self.report)
+
+        self.assertEqual(totals, ManufakturTotals(
+            bb_awal=1000, bb_pembelian=7000, bb_akhir=500,
+            btkl=1500, bop=700, bdp_awal=300, bdp_akhir=200,
+            bj_awal=400, bj_akhir=600,
+            pendapatan_usaha=20000, pendapatan_lain=100,
+            beban_usaha=900, beban_lain=0,
+        ))
+
+    def test_summary_matches_line_items(self):
+        summary = get_report_summary(self.report)
+
+        self.assertEqual(ManufakturTotals.from_summary(summary), load_manufaktur_totals(self.report))
+
+    def test_context(self):
+        context = get_manufaktur_report_context(self.report)
+
+        self.assertEqual(context["total_bbb"], 7500)
+        self.assertEqual(context["total_biaya_produksi"], 9700)
+        self.assertEqual(context["cogm"], 9800)
+        self.assertEqual(context["barang_siap_dijual"], 10200)
+        self.assertEqual(context["total_hpp"], 9600)
+        self.assertEqual(context["jumlah_beban"], 10500)
+        self.assertEqual(context["laba_sebelum_pajak"], 20100 - 10500)
+
+    def test_query_count(self):
+        # One query for every total (the summary row), plus the BOP, barang diproduksi and beban item lists
+        with self.assertNumQueries(4):
+            get_manufaktur_report_context(self.report)
+
+    def test_context_without_a_summary_row(self):
+        expected = get_manufaktur_report_context(self.report)
+        ReportSummary.objects.filter(report=self.report).delete()
+
+        # The totals come from the line items in one query instead, nothing is written on read
+        with self.assertNumQueries(5):
+            context = get_manufaktur_report_context(self.report)
+
+        self.assertEqual(context, expected)
+        self.assertFalse(ReportSummary.objects.filter(report=self.report).exists())
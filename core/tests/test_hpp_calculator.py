@@ -1,8 +1,17 @@
+import random
 from django.contrib.auth.models import User
 from django.test import TestCase
 from types import SimpleNamespace
-from core.models import FinancialReport, Product, HppEntry
-from core.utils.hpp_calculator import calculate_hpp_for_product
+from core.models import FinancialReport, Product, HppEntry, RevenueItem, HppManufactureProduction
+from core.utils.hpp_calculator import (
+    calculate_hpp_batch,
+    calculate_hpp_columns,
+    calculate_hpp_for_product,
+    hpp_columns,
+    load_hpp_entries,
+    save_barang_diproduksi,
+    sync_hpp_entries,
+)
 
 
 class HppCalculatorTest(TestCase):
@@ -192,3 +201,142 @@ class HppCalculatorDetailedTest(TestCase):
             "total_akhir": 7625000,
             "hpp": 0,
         })
+
+
+class SyncHppEntriesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.product_a = Product.objects.create(report=self.report, name="a")
+        self.product_b = Product.objects.create(report=self.report, name="b")
+        RevenueItem.objects.create(report=self.report, product=self.product_a, quantity=30, selling_price=1000)
+        RevenueItem.objects.create(report=self.report, product=self.product_a, quantity=20, selling_price=1000)
+        RevenueItem.objects.create(report=self.report, product=self.product_b, quantity=5, selling_price=1000)
+
+    def test_seeds_missing_rows(self):
+        products, data = sync_hpp_entries(self.report)
+
+        self.assertEqual([p.name for p in products], ["a", "b"])
+        self.assertEqual(HppEntry.objects.filter(report=self.report).count(), 6)
+        self.assertEqual(data[products[0]]["AKHIR"].quantity, -50)
+
+    def test_akhir_quantity(self):
+        HppEntry.objects.create(report=self.report, product=self.product_a, category="AWAL", quantity=100, keterangan="gudang")
+        HppEntry.objects.create(report=self.report, product=self.product_a, category="PEMBELIAN", quantity=40, retur_qty=10)
+
+        sync_hpp_entries(self.report)
+
+        akhir = HppEntry.objects.get(product=self.product_a, category="AKHIR")
+        self.assertEqual(akhir.quantity, 100 + 30 - 50)
+        self.assertEqual(akhir.keterangan, "gudang")
+
+    def test_repeat_sync_is_read_only(self):
+        sync_hpp_entries(self.report)
+
+        # products + entries only, no INSERT/UPDATE once rows are in sync
+        with self.assertNumQueries(2):
+            sync_hpp_entries(self.report)
+
+
+class SaveBarangDiproduksiTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="manufaktur"
+        )
+        self.products = [Product.objects.create(report=self.report, name=name) for name in ("a", "b", "c")]
+
+    def rows(self, qty):
+        return [
+            {"product": p, "qty_diproduksi": qty, "total_produksi": qty * 100, "hpp_per_unit": 100}
+            for p in self.products
+        ]
+
+    def test_creates_then_updates_in_bulk(self):
+        items = save_barang_diproduksi(self.report, self.rows(5))
+        self.assertEqual([i.product.name for i in items], ["a", "b", "c"])
+        self.assertEqual(HppManufactureProduction.objects.filter(report=self.report, qty_diproduksi=5).count(), 3)
+
+        save_barang_diproduksi(self.report, self.rows(7))
+        self.assertEqual(HppManufactureProduction.objects.filter(report=self.report, total_produksi=700).count(), 3)
+
+    def test_unchanged_rows_are_not_written(self):
+        save_barang_diproduksi(self.report, self.rows(5))
+
+        with self.assertNumQueries(1):
+            save_barang_diproduksi(self.report, self.rows(5))
+
+
+def random_entries(rng):
+    """Random AWAL/PEMBELIAN/AKHIR entries, including missing rows, over-returns and over-stated akhir."""
+    def entry(**kwargs):
+        values = {"quantity": 0, "harga_satuan": 0, "diskon": 0, "retur_qty": 0, "ongkir": 0}
+        values.update(kwargs)
+        return SimpleNamespace(**values)
+
+    awal = entry(quantity=rng.randint(0, 1000), harga_satuan=rng.randint(0, 100_000)) if rng.random() < 0.8 else None
+    pembelian = []
+    if rng.random() < 0.8:
+        qty = rng.randint(0, 1000)
+        pembelian.append(entry(
+            quantity=qty,
+            harga_satuan=rng.randint(0, 100_000),
+            diskon=rng.choice([0, rng.randint(0, 10_000_000)]),
+            retur_qty=rng.choice([0, rng.randint(0, qty + 5)]),
+            ongkir=rng.choice([0, rng.randint(0, 1_000_000)]),
+        ))
+    akhir = entry(quantity=rng.randint(-100, 2500)) if rng.random() < 0.9 else None
+    return {"AWAL": awal, "PEMBELIAN": pembelian, "AKHIR": akhir}
+
+
+class CalculateHppBatchTest(TestCase):
+    def test_matches_scalar_on_random_inputs(self):
+        rng = random.Random(2025)
+        product_entries = [(SimpleNamespace(id=i, name=str(i)), random_entries(rng)) for i in range(5000)]
+
+        results = calculate_hpp_columns(hpp_columns(product_entries))
+
+        for (product, entries), result in zip(product_entries, results):
+            expected = calculate_hpp_for_product(product, entries)
+            self.assertEqual(result, expected, msg=f"product {product.id}: {entries}")
+            self.assertEqual(repr(result["hpp_per_unit"]), repr(expected["hpp_per_unit"]))
+
+    def test_fractional_purchase_price_keeps_decimal_rounding(self):
+        # 100000 / 3 per unit; selling all 3 truncates to 99999 like the scalar path
+        entries = {
+            "AWAL": None,
+            "PEMBELIAN": [SimpleNamespace(quantity=3, harga_satuan=0, diskon=-100000, retur_qty=0, ongkir=0)],
+            "AKHIR": SimpleNamespace(quantity=0),
+        }
+        [result] = calculate_hpp_columns(hpp_columns([(None, entries)]))
+
+        self.assertEqual(result, calculate_hpp_for_product(None, entries))
+        self.assertEqual(result["hpp"], 99999)
+
+    def test_batch_from_database(self):
+        user = User.objects.create_user(username="tester", password="test123")
+        report = FinancialReport.objects.create(user=user, company_name="Batch", business_type="dagang")
+        rng = random.Random(7)
+        for i in range(20):
+            product = Product.objects.create(report=report, name=f"p{i:02d}")
+            RevenueItem.objects.create(report=report, product=product, quantity=1, selling_price=1000)
+            entries = random_entries(rng)
+            for category in ("AWAL", "AKHIR"):
+                if entries[category]:
+                    HppEntry.objects.create(report=report, product=product, category=category,
+                                            **vars(entries[category]))
+            for p in entries["PEMBELIAN"]:
+                HppEntry.objects.create(report=report, product=product, category="PEMBELIAN", **vars(p))
+        # A product without pendapatan usaha is left out
+        Product.objects.create(report=report, name="tanpa-penjualan")
+
+        with self.assertNumQueries(1):
+            batch = calculate_hpp_batch(report)
+
+        self.assertEqual([p.name for p, _result in batch], [f"p{i:02d}" for i in range(20)])
+        stored = load_hpp_entries(report)
+        empty = {"AWAL": None, "PEMBELIAN": [], "AKHIR": None}
+        for product, result in batch:
+            self.assertEqual(result, calculate_hpp_for_product(product, stored.get(product.id, empty)))
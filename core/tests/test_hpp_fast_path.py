@@ -0,0 +1,163 @@
+import os
+import random
+import timeit
+import unittest
+from decimal import Decimal
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from core.tests.test_hpp_calculator import random_entries
+from core.utils.hpp_calculator import calculate_hpp_for_product
+
+
+def decimal_calculate_hpp(product, entries):
+    """calculate_hpp_for_product as it was before the integer fast path, kept as the reference."""
+    awal = entries.get('AWAL')
+    pembelian_list = entries.get('PEMBELIAN')
+    akhir = entries.get('AKHIR')
+
+    # 1. Hitung Data Awal
+    qty_awal = Decimal(awal.quantity if awal else 0)
+    harga_awal = Decimal(awal.harga_satuan if awal else 0)
+    total_awal = qty_awal * harga_awal
+
+    # 2. Hitung Data Pembelian (Neto)
+    total_pembelian_neto = Decimal(0)
+    total_pembelian_qty_net = Decimal(0) 
+
+    for p in pembelian_list:
+        qty_beli = Decimal(p.quantity)
+        harga_beli = Decimal(p.harga_satuan)
+        retur_qty = Decimal(p.retur_qty)
+        diskon = Decimal(p.diskon)
+        ongkir = Decimal(p.ongkir)
+        
+        # Hitung retur dalam rupiah
+        nilai_retur_rp = retur_qty * harga_beli
+        
+        pembelian_bruto = qty_beli * harga_beli
+        total_pembelian_item = pembelian_bruto - diskon - nilai_retur_rp + ongkir
+
+        total_pembelian_neto += total_pembelian_item
+        total_pembelian_qty_net += (qty_beli - retur_qty)
+
+    # 3. Variabel Dasar (A)
+    total_nilai_tersedia = total_awal + total_pembelian_neto
+    total_qty_tersedia = qty_awal + total_pembelian_qty_net
+
+    # Hitung Harga Beli Baru per Unit (untuk perhitungan C - FIFO)
+    if total_pembelian_qty_net > 0:
+        harga_beli_baru_per_unit = total_pembelian_neto / total_pembelian_qty_net
+    else:
+        harga_beli_baru_per_unit = Decimal(0)
+
+    # 4. Tentukan Jumlah Terjual & Validasi Stok Akhir
+    qty_akhir = Decimal(akhir.quantity if akhir else 0)
+    
+    if qty_akhir > total_qty_tersedia:
+        qty_akhir = total_qty_tersedia # Cap agar tidak minus
+        validation_error_akhir = "Periksa Kembali Catatan Penjualan/Persediaan Akhir."
+    else:
+        validation_error_akhir = None
+
+    qty_terjual = total_qty_tersedia - qty_akhir
+
+    # 5. Hitung HPP menggunakan Logika FIFO (First-In, First-Out)
+    hpp_total = Decimal(0)
+
+    if qty_terjual > qty_awal:
+        # KASUS 1: Penjualan menghabiskan stok awal & mengambil stok baru
+        # B = Stok Awal terjual semua
+        biaya_stok_awal = total_awal 
+        
+        # C = Sisa penjualan diambil dari harga pembelian baru
+        qty_sisa_jual = qty_terjual - qty_awal
+        biaya_stok_baru = qty_sisa_jual * harga_beli_baru_per_unit
+        
+        hpp_total = biaya_stok_awal + biaya_stok_baru
+    else:
+        # KASUS 2: Penjualan sedikit, hanya mengambil dari stok awal
+        hpp_total = qty_terjual * harga_awal
+
+    # 6. Hitung Nilai Akhir (A - HPP)
+    total_akhir = total_nilai_tersedia - hpp_total
+
+    # HPP per unit (Statistik)
+    if qty_terjual > 0:
+        hpp_per_unit = hpp_total / qty_terjual
+    else:
+        hpp_per_unit = 0
+
+    return {
+        "total_awal": int(total_awal),
+        "total_pembelian_neto": int(total_pembelian_neto),
+        "barang_tersedia": int(total_nilai_tersedia),
+        "total_akhir": int(total_akhir),
+        "hpp": int(hpp_total),
+        "hpp_per_unit": float(hpp_per_unit),
+
+        "detail_awal": {
+            "qty": int(qty_awal),
+            "harga_satuan": int(harga_awal)
+        } if awal else None,
+
+        "detail_pembelian": {
+            "qty": int(total_pembelian_qty_net),
+        } if pembelian_list else None,
+
+        "detail_akhir": {
+            "qty": int(qty_akhir),
+        } if akhir else None,
+
+        "qty_terjual": int(qty_terjual),
+        "validation_error_akhir": validation_error_akhir,
+    }
+
+
+class IntegerFastPathTest(SimpleTestCase):
+    def test_matches_decimal_path_on_random_inputs(self):
+        rng = random.Random(11)
+        for i in range(5000):
+            entries = random_entries(rng)
+            expected = decimal_calculate_hpp(None, entries)
+            result = calculate_hpp_for_product(None, entries)
+
+            self.assertEqual(result, expected, msg=f"case {i}: {entries}")
+            self.assertEqual(repr(result["hpp_per_unit"]), repr(expected["hpp_per_unit"]))
+
+    def test_returns_plain_ints(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            result = calculate_hpp_for_product(None, random_entries(rng))
+            for key in ("total_awal", "total_pembelian_neto", "barang_tersedia", "total_akhir", "hpp", "qty_terjual"):
+                self.assertIs(type(result[key]), int)
+
+    def test_fractional_purchase_price(self):
+        # 100000 / 3 per unit: the division keeps Decimal's rounding, so 3 units sold is 99999
+        entries = {
+            "AWAL": None,
+            "PEMBELIAN": [SimpleNamespace(quantity=3, harga_satuan=0, diskon=-100000, retur_qty=0, ongkir=0)],
+            "AKHIR": SimpleNamespace(quantity=0),
+        }
+        result = calculate_hpp_for_product(None, entries)
+
+        self.assertEqual(result["hpp"], 99999)
+        self.assertEqual(result, decimal_calculate_hpp(None, entries))
+
+
+@unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run")
+class IntegerFastPathBenchmark(SimpleTestCase):
+    def test_speedup(self):
+        rng = random.Random(1)
+        cases = [random_entries(rng) for _ in range(2000)]
+
+        def run(fn):
+            return min(timeit.repeat(lambda: [fn(None, entries) for entries in cases], number=5, repeat=5))
+
+        decimal_time = run(decimal_calculate_hpp)
+        integer_time = run(calculate_hpp_for_product)
+        print(
+            f"\ncalculate_hpp_for_product x{len(cases) * 5}: "
+            f"Decimal {decimal_time * 1000:.1f} ms, integer {integer_time * 1000:.1f} ms, "
+            f"speedup x{decimal_time / integer_time:.2f}"
+        )
+        self.assertLess(integer_time, decimal_time)
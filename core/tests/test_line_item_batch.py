@@ -0,0 +1,146 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.models import (
+    FinancialReport, Product, RevenueItem, ExpenseItem, HppEntry,
+    HppManufactureProduction, HppManufactureFinishedGoods,
+)
+from core.utils.completion import FLAG_BEBAN_USAHA, FLAG_PENDAPATAN_USAHA
+from core.utils.line_item_batch import LineItemBatchError, apply_line_item_batch
+from core.utils.report_summary import verify_report_summary
+
+
+class LineItemBatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.kursi = Product.objects.create(report=self.report, name="Kursi")
+        self.sale = RevenueItem.objects.create(report=self.report, product=self.kursi, quantity=2, selling_price=500)
+        self.listrik = ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Listrik", total=300)
+
+    def test_create_update_delete_in_one_batch(self):
+        version = FinancialReport.objects.get(pk=self.report.pk).version
+
+        result = apply_line_item_batch(self.report, [
+            {"op": "create", "table": "pendapatan", "values": {"product": "meja", "quantity": 3, "selling_price": 1000}},
+            {"op": "update", "table": "pendapatan", "id": self.sale.id, "values": {"quantity": 5}},
+            {"op": "create", "table": "pendapatan", "values": {"revenue_type": "lain", "name": "Bunga", "total": 70}},
+            {"op": "delete", "table": "beban", "id": self.listrik.id},
+            {"op": "create", "table": "beban", "values": {"expense_category": "lain", "name": "Denda", "total": "1.500"}},
+        ])
+
+        meja = Product.objects.get(report=self.report, name="meja")
+        self.assertEqual((result.created, result.updated, result.deleted), (3, 1, 1))
+        self.assertEqual(result.ids[1], self.sale.id)
+        self.assertEqual(result.ids[3], self.listrik.id)
+        self.sale.refresh_from_db()
+        self.assertEqual((self.sale.quantity, self.sale.total), (5, 2500))
+        self.assertEqual(RevenueItem.objects.get(pk=result.ids[0]).product_id, meja.id)
+        self.assertEqual(RevenueItem.objects.get(pk=result.ids[2]).total, 70)
+        self.assertFalse(ExpenseItem.objects.filter(pk=self.listrik.id).exists())
+        self.assertEqual(ExpenseItem.objects.get(pk=result.ids[4]).total, 1500)
+
+        # What the per-row signals and the pendapatan page would have done
+        self.report.refresh_from_db()
+        self.assertGreater(self.report.version, version)
+        self.assertTrue(self.report.completion_flags & FLAG_PENDAPATAN_USAHA)
+        self.assertFalse(self.report.completion_flags & FLAG_BEBAN_USAHA)
+        self.assertEqual(verify_report_summary(self.report), {})
+        self.assertEqual(HppEntry.objects.filter(product=meja).count(), 3)
+        self.assertEqual(
+            (result.summary.pendapatan_usaha, result.summary.pendapatan_lain, result.summary.beban_lain),
+            (5500, 70, 1500),
+        )
+
+    def test_invalid_operations_reject_the_whole_batch(self):
+        other = FinancialReport.objects.create(user=self.user, company_name="Lain", month="02", year=2025)
+        foreign = ExpenseItem.objects.create(report=other, name="Sewa", total=1)
+
+        with self.assertRaises(LineItemBatchError) as ctx:
+            apply_line_item_batch(self.report, [
+                {"op": "update", "table": "pendapatan", "id": self.sale.id, "values": {"quantity": 7}},
+                {"op": "update", "table": "pendapatan", "id": self.sale.id, "values": {"quantity": 8}},
+                {"op": "delete", "table": "beban", "id": foreign.id},
+                {"op": "create", "table": "bdp", "values": {}},
+                {"op": "create", "table": "beban", "values": {"expense_category": "usaha", "name": "Air", "total": -1}},
+                {"op": "move", "table": "beban"},
+            ])
+
+        self.assertEqual([index for index, _error in ctx.exception.errors], [1, 2, 3, 4, 5])
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.quantity, 2)
+        self.assertTrue(ExpenseItem.objects.filter(pk=foreign.id).exists())
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def run(size):
+            rows = list(ExpenseItem.objects.bulk_create(
+                [ExpenseItem(report=self.report, name=f"Beban {i}", total=i) for i in range(size)]
+            ))
+            operations = [
+                {"op": "update", "table": "beban", "id": row.id, "values": {"total": row.total + 1}}
+                for row in rows
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                apply_line_item_batch(self.report, operations)
+            return len(queries)
+
+        self.assertEqual(run(5), run(50))
+
+    def test_manufaktur_derived_rows(self):
+        report = FinancialReport.objects.create(
+            user=self.user, company_name="Pabrik", month="01", year=2025, business_type="manufaktur"
+        )
+        roti = Product.objects.create(report=report, name="Roti")
+        RevenueItem.objects.create(report=report, product=roti, quantity=6, selling_price=10000)
+
+        result = apply_line_item_batch(report, [
+            {"op": "create", "table": "bdp", "values": {"type": "WIP_AWAL", "product_id": roti.id, "quantity": 5}},
+            {"op": "create", "table": "bdp", "values": {"type": "WIP_AKHIR", "product": "roti", "quantity": 25}},
+            {"op": "create", "table": "bop", "values": {"nama_biaya": "Listrik", "quantity": 1, "harga_satuan": 40000}},
+            {"op": "create", "table": "barang-jadi", "values": {"type": "FG_AKHIR", "product": "Roti", "quantity": 10}},
+            {"op": "create", "table": "barang-jadi",
+             "values": {"type": "FG_AWAL", "product": "Roti", "quantity": 4, "harga_satuan": 1500}},
+        ])
+
+        production = HppManufactureProduction.objects.get(report=report)
+        self.assertEqual((production.qty_diproduksi, production.total_produksi), (20, 40000))
+        akhir = HppManufactureFinishedGoods.objects.get(pk=result.ids[3])
+        self.assertEqual((akhir.total, akhir.status), (36000, "OK"))
+        self.assertEqual(verify_report_summary(report), {})
+
+        with self.assertRaisesMessage(LineItemBatchError, "1 operasi tidak valid"):
+            apply_line_item_batch(self.report, [{"op": "create", "table": "bop", "values": {}}])
+
+    def test_endpoint(self):
+        self.client.login(username="tester", password="test123")
+        url = reverse("core:line_items_batch", args=[self.report.id])
+        operations = [{"op": "update", "table": "pendapatan", "id": self.sale.id, "values": {"selling_price": 600}}]
+
+        response = self.client.post(url, json.dumps({"operations": operations}), content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["ids"], data["updated"]), ([self.sale.id], 1))
+        self.assertEqual(data["totals"]["pendapatan_usaha"], 1200)
+        self.assertEqual(data["totals"]["jumlah_beban"], data["totals"]["hpp_total"] + 300)
+        self.assertEqual(data["version"], FinancialReport.objects.get(pk=self.report.pk).version)
+
+        response = self.client.post(
+            url, json.dumps({"operations": [{"op": "delete", "table": "beban", "id": 0}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [{"index": 0, "error": "Baris 0 tidak ditemukan."}])
+
+        self.assertEqual(self.client.post(url, "[", content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        with override_settings(LINE_ITEM_BATCH_MAX_OPERATIONS=1):
+            response = self.client.post(
+                url, json.dumps({"operations": operations * 2}), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from core.models import FinancialReport, Product, RevenueItem, ExpenseItem, HppManufactureProduction
+from core.utils.line_item_export import LINE_ITEM_TABLES, iter_csv
+
+
+class LineItemExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="manufaktur"
+        )
+        self.product = Product.objects.create(report=self.report, name="kursi")
+        RevenueItem.objects.create(report=self.report, product=self.product, name="kursi", quantity=2, selling_price=500)
+        RevenueItem.objects.create(report=self.report, revenue_type="lain", name="Bunga, bank", total=70)
+        self.client.login(username="tester", password="test123")
+
+    def get(self, table, fmt):
+        return self.client.get(reverse("core:export_line_items", args=[self.report.id, table, fmt]))
+
+    def test_csv(self):
+        response = self.get("pendapatan", "csv")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("pendapatan_Dummy Co_01_2025.csv", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], [
+            "id", "revenue_type", "product_id", "product_name", "name", "quantity", "selling_price", "total",
+        ])
+        self.assertEqual(rows[1][1:], ["usaha", str(self.product.id), "kursi", "kursi", "2", "500", "1000"])
+        self.assertEqual(rows[2][1:], ["lain", "", "", "Bunga, bank", "1", "0", "70"])
+
+    def test_ndjson(self):
+        HppManufactureProduction.objects.create(
+            report=self.report, product=self.product, qty_diproduksi=3, total_produksi=1000, hpp_per_unit="333.33"
+        )
+
+        response = self.get("barang-diproduksi", "ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        [line] = b"".join(response.streaming_content).decode().splitlines()
+        row = json.loads(line)
+        self.assertEqual(row["product_name"], "kursi")
+        self.assertEqual((row["qty_diproduksi"], row["hpp_per_unit"]), (3, "333.33"))
+
+    def test_every_table_streams(self):
+        for table in LINE_ITEM_TABLES:
+            for fmt in ("csv", "ndjson"):
+                self.assertEqual(self.get(table, fmt).status_code, 200, (table, fmt))
+
+    def test_first_chunk_is_sent_before_the_rest_is_read(self):
+        for i in range(50):
+            ExpenseItem.objects.create(report=self.report, scope="manufaktur", name=f"Beban {i}", total=i)
+
+        with mock.patch("core.utils.line_item_export.STREAM_CHUNK_CHARS", 200):
+            chunks = iter_csv(self.report, "beban")
+            header = next(chunks)
+            with self.assertNumQueries(1):
+                first_row = next(chunks)
+            rest = list(chunks)
+
+        self.assertTrue(header.startswith(b"id,expense_category"))
+        self.assertEqual(first_row.count(b"\n"), 1)
+        self.assertGreater(len(rest), 5)
+        self.assertEqual(sum(chunk.count(b"\n") for chunk in rest), 49)
+
+    def test_unknown_table_or_format_and_other_users(self):
+        self.assertEqual(self.get("gaji", "csv").status_code, 404)
+        self.assertEqual(self.get("pendapatan", "xml").status_code, 404)
+
+        User.objects.create_user(username="other", password="test123")
+        self.client.login(username="other", password="test123")
+        self.assertEqual(self.get("pendapatan", "csv").status_code, 404)
@@ -0,0 +1,176 @@
+import os
+import tempfile
+from io import BytesIO, StringIO
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from openpyxl import Workbook
+from core.models import (
+    FinancialReport, Product, RevenueItem, ReportSummary,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods,
+)
+from core.utils.completion import FLAG_HPP_MANUFAKTUR
+from core.utils.excel_exporter import generate_excel_file
+from core.utils.manufaktur_import import ManufakturImportError, import_manufaktur_workbook
+from core.utils.report_summary import verify_report_summary
+
+
+def workbook_bytes(sheets):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for title, rows in sheets.items():
+        ws = wb.create_sheet(title)
+        for row in rows:
+            ws.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+SHEETS = {
+    "Bahan Baku": [
+        ["Jenis", "Produk", "Bahan Baku", "Qty", "Harga Satuan", "Diskon", "Retur Qty", "Ongkir"],
+        ["BB_AWAL", "Roti", "Tepung", 10, 1000, 0, 0, 0],
+        ["Pembelian Bahan Baku", "roti", "Tepung", 20, 1000, 500, 2, 300],
+    ],
+    "BDP": [
+        ["Jenis", "Produk", "Qty", "Harga Satuan"],
+        ["WIP_AWAL", "Roti", 5, 2000],
+        ["WIP_AKHIR", "Roti", 25, 2000],
+    ],
+    "BTKL": [
+        ["Produk", "Tenaga Kerja", "Qty", "Harga Satuan"],
+        ["Roti", "Pembuat adonan", 2, 50000],
+    ],
+    "BOP": [
+        ["Produk", "Nama Biaya", "Qty", "Harga Satuan"],
+        [None, "Listrik", 1, 40000],
+    ],
+    "Barang Jadi": [
+        ["Jenis", "Produk", "Qty", "Harga Satuan"],
+        ["FG_AWAL", "Roti", 4, 1500],
+        ["FG_AKHIR", "Roti", 10, None],
+    ],
+}
+
+
+class ManufakturImportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Pabrik Co", month="01", year=2025, business_type="manufaktur"
+        )
+        self.roti = Product.objects.create(report=self.report, name="Roti")
+        RevenueItem.objects.create(report=self.report, product=self.roti, quantity=6, selling_price=10000)
+
+    def import_sheets(self, sheets, **kwargs):
+        return import_manufaktur_workbook(self.report, BytesIO(workbook_bytes(sheets)), **kwargs)
+
+    def test_all_sections_are_imported(self):
+        result = self.import_sheets(SHEETS)
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(
+            result.created, {"Bahan Baku": 2, "BDP": 2, "BTKL": 1, "BOP": 1, "Barang Jadi": 2}
+        )
+        self.assertEqual(
+            list(HppManufactureMaterial.objects.order_by("id").values_list("type", "product_id", "retur_amount", "total")),
+            [("BB_AWAL", self.roti.id, 0, 10000), ("BB_PEMBELIAN", self.roti.id, 2000, 20000 - 500 - 2000 + 300)],
+        )
+        self.assertEqual(HppManufactureWIP.objects.get(type="WIP_AKHIR").total, 50000)
+        self.assertEqual(HppManufactureLabor.objects.get().total, 100000)
+        self.assertIsNone(HppManufactureOverhead.objects.get().product_id)
+
+    def test_derived_rows_are_computed_once_after_the_inserts(self):
+        self.import_sheets(SHEETS)
+
+        production = HppManufactureProduction.objects.get(report=self.report)
+        self.assertEqual((production.qty_diproduksi, production.total_produksi), (20, 40000))
+
+        # 4 awal @1500 sold first, then 2 of the 20 produced @2000
+        akhir = HppManufactureFinishedGoods.objects.get(type="FG_AKHIR")
+        self.assertEqual((akhir.total, akhir.harga_satuan, akhir.status), (36000, 3600, "OK"))
+
+    def test_bookkeeping_the_signals_would_do(self):
+        version = self.report.version
+
+        self.import_sheets(SHEETS)
+
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.completion_flags & FLAG_HPP_MANUFAKTUR, FLAG_HPP_MANUFAKTUR)
+        self.assertGreater(self.report.version, version)
+        self.assertEqual(verify_report_summary(self.report), {})
+        self.assertTrue(ReportSummary.objects.filter(report=self.report).exists())
+
+    def test_invalid_rows_block_the_import(self):
+        sheets = dict(SHEETS)
+        sheets["BTKL"] = SHEETS["BTKL"] + [["Kue", "Pengemas", 1, 100], ["Roti", "Pengemas", -1, 100]]
+        sheets["BDP"] = SHEETS["BDP"] + [["WIP_TENGAH", "Roti", 1, 1]]
+
+        result = self.import_sheets(sheets)
+
+        self.assertEqual([(sheet, row) for sheet, row, _error in result.errors], [("BDP", 4), ("BTKL", 3), ("BTKL", 4)])
+        self.assertIn("'Kue' tidak ada", result.errors[1][2])
+        self.assertEqual(result.created, {})
+        self.assertFalse(HppManufactureMaterial.objects.exists())
+        self.assertFalse(HppManufactureProduction.objects.exists())
+
+        result = self.import_sheets(sheets, skip_invalid=True)
+        self.assertEqual((result.created["BTKL"], result.created["BDP"], len(result.errors)), (1, 2, 3))
+
+    def test_detail_export_round_trips(self):
+        self.import_sheets(SHEETS)
+        content, _filename = generate_excel_file(self.report, detail=True)
+
+        other = FinancialReport.objects.create(
+            user=self.user, company_name="Pabrik Co", month="02", year=2025, business_type="manufaktur"
+        )
+        Product.objects.create(report=other, name="Roti")
+        result = import_manufaktur_workbook(other, BytesIO(content))
+
+        self.assertEqual(result.errors, [])
+        for model in (HppManufactureMaterial, HppManufactureWIP, HppManufactureLabor, HppManufactureOverhead):
+            fields = ("type",) if hasattr(model, "TYPE_CHOICES") else ()
+            self.assertEqual(
+                sorted(model.objects.filter(report=other).values_list(*fields, "quantity", "total")),
+                sorted(model.objects.filter(report=self.report).values_list(*fields, "quantity", "total")),
+            )
+
+    def test_unreadable_files(self):
+        with self.assertRaises(ManufakturImportError):
+            import_manufaktur_workbook(self.report, BytesIO(b"jenis,produk\n"))
+        with self.assertRaises(ManufakturImportError):
+            self.import_sheets({"Sheet1": [["Produk", "Qty"]]})
+
+    def test_upload_from_the_hpp_page(self):
+        self.client.login(username="tester", password="test123")
+        sheets = {"BTKL": SHEETS["BTKL"] + [["Roti", "Pengemas", "dua", 100]]}
+        upload = SimpleUploadedFile("manufaktur.xlsx", workbook_bytes(sheets))
+
+        response = self.client.post(
+            reverse("core:hpp_manufaktur", args=[self.report.id]), {"action": "import", "import_file": upload}
+        )
+
+        self.assertRedirects(
+            response, reverse("core:hpp_manufaktur", args=[self.report.id]), fetch_redirect_response=False
+        )
+        texts = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertIn("BTKL baris 3: Qty dan nilai rupiah harus bilangan bulat.", texts)
+        self.assertFalse(HppManufactureLabor.objects.exists())
+
+    def test_command(self):
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        with os.fdopen(fd, "wb") as f:
+            f.write(workbook_bytes({"BOP": SHEETS["BOP"] + [["Roti", "Air", "x", 1]]}))
+        self.addCleanup(os.remove, path)
+
+        with self.assertRaisesMessage(CommandError, "1 invalid rows"):
+            call_command("import_manufaktur", self.report.id, path, stdout=StringIO(), stderr=StringIO())
+
+        out = StringIO()
+        call_command("import_manufaktur", self.report.id, path, skip_invalid=True, stdout=out, stderr=StringIO())
+        self.assertIn("Imported 1 rows (BOP 1).", out.getvalue())
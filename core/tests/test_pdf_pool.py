@@ -0,0 +1,140 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from unittest import mock, skipUnless
+import pdfkit
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from core.models import FinancialReport
+from core.utils.pdf_pool import (
+    PdfQueueFull,
+    PdfRenderPool,
+    PdfRenderTimeout,
+    run_wkhtmltopdf,
+)
+
+
+class BlockingRenderer:
+    """Fake wkhtmltopdf that holds every render until ``release`` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+    def __call__(self, html, options, configuration, timeout=None):
+        self.started.release()
+        self.release.wait(5)
+        if html == "rusak":
+            raise IOError("wkhtmltopdf exited with non-zero code 1")
+        return f"%PDF {html}".encode()
+
+
+class PdfRenderPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.renderer = BlockingRenderer()
+        self.pool = PdfRenderPool(workers=1, queue_size=1, renderer=self.renderer)
+        self.addCleanup(self.renderer.release.set)
+
+    def test_render_returns_pdf_and_records_latency(self):
+        self.renderer.release.set()
+
+        self.assertEqual(self.pool.render("a", wait_timeout=5), b"%PDF a")
+
+        metrics = self.pool.metrics()
+        self.assertEqual(metrics["completed"], 1)
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertIsNotNone(metrics["render_ms"]["p95"])
+
+    def test_full_queue_rejects(self):
+        running = self.pool.submit("a")
+        self.assertTrue(self.renderer.started.acquire(timeout=5))
+        queued = self.pool.submit("b")
+
+        with self.assertRaises(PdfQueueFull):
+            self.pool.submit("c")
+
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics["in_flight"], metrics["queue_depth"], metrics["rejected"]), (1, 1, 1))
+
+        self.renderer.release.set()
+        self.assertEqual(running.result(5), b"%PDF a")
+        self.assertEqual(queued.result(5), b"%PDF b")
+
+    def test_wait_timeout_drops_the_queued_job(self):
+        running = self.pool.submit("a")
+        self.assertTrue(self.renderer.started.acquire(timeout=5))
+
+        with self.assertRaises(PdfRenderTimeout):
+            self.pool.render("b", wait_timeout=0.05)
+
+        self.renderer.release.set()
+        running.result(5)
+        self.pool._queue.join()
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics["completed"], metrics["timed_out"]), (1, 1))
+
+    def test_render_errors_reach_the_caller(self):
+        self.renderer.release.set()
+
+        with self.assertRaises(IOError):
+            self.pool.render("rusak", wait_timeout=5)
+        self.assertEqual(self.pool.metrics()["failed"], 1)
+
+
+@skipUnless(os.name == "posix", "uses a shell script in place of wkhtmltopdf")
+class RunWkhtmltopdfTest(SimpleTestCase):
+    def fake_binary(self, body):
+        fd, path = tempfile.mkstemp(suffix=".sh")
+        with os.fdopen(fd, "w") as f:
+            f.write(f"#!/bin/sh\n{body}\n")
+        os.chmod(path, stat.S_IRWXU)
+        self.addCleanup(os.remove, path)
+        return pdfkit.configuration(wkhtmltopdf=path)
+
+    def test_pipes_html_through_the_binary(self):
+        self.assertEqual(run_wkhtmltopdf("<p>x</p>", configuration=self.fake_binary("cat"), timeout=5), b"<p>x</p>")
+
+    def test_slow_render_is_killed(self):
+        with self.assertRaises(PdfRenderTimeout):
+            run_wkhtmltopdf("<p>x</p>", configuration=self.fake_binary("sleep 5"), timeout=0.2)
+
+
+class ExportPdfFallbackTest(TestCase):
+    def setUp(self):
+        artifact_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, artifact_root, ignore_errors=True)
+        artifacts = override_settings(ARTIFACT_ROOT=artifact_root)
+        artifacts.enable()
+        self.addCleanup(artifacts.disable)
+
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(user=self.user, company_name="Dummy Co", business_type="dagang")
+        self.client.login(username="tester", password="test123")
+
+    def test_busy_pool_redirects_with_a_warning(self):
+        pool = mock.Mock()
+        pool.render.side_effect = PdfQueueFull("Antrean PDF penuh")
+
+        with mock.patch("core.utils.pdf_exporter.get_pdf_pool", return_value=pool), \
+                mock.patch("core.utils.pdf_exporter.pdfkit.configuration"):
+            response = self.client.get(reverse("core:export_pdf", args=[self.report.id]))
+
+        self.assertRedirects(response, reverse("core:laporan", args=[self.report.id]), fetch_redirect_response=False)
+        [message] = get_messages(response.wsgi_request)
+        self.assertIn("sibuk", str(message))
+
+    def test_metrics_are_staff_only(self):
+        url = reverse("core:pdf_metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        with mock.patch("core.views.get_pdf_pool") as get_pool:
+            get_pool.return_value.metrics.return_value = {"queue_depth": 0}
+            response = self.client.get(url)
+
+        self.assertEqual(response.json(), {"queue_depth": 0})
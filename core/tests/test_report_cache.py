@@ -0,0 +1,127 @@
+import pickle
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.test import TestCase
+from core.models import FinancialReport, Product, RevenueItem, ExpenseItem, HppManufactureOverhead
+from core.utils.excel_exporter import generate_excel_file
+from core.utils.final_report import (
+    BopLine,
+    DagangReportResult,
+    ExpenseLine,
+    ManufakturReportResult,
+    build_report_result,
+)
+from core.utils.hpp_calculator import sync_hpp_entries
+from core.utils.report_cache import REPORT_CACHE_ALIAS, get_report_result
+
+
+class ReportCacheTest(TestCase):
+    def setUp(self):
+        caches[REPORT_CACHE_ALIAS].clear()
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.product = Product.objects.create(report=self.report, name="a")
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=2, selling_price=500)
+        ExpenseItem.objects.create(report=self.report, name="Sewa", total=100)
+
+    def fresh_report(self):
+        return FinancialReport.objects.get(pk=self.report.pk)
+
+    def test_second_read_is_served_from_cache(self):
+        report = self.fresh_report()
+        first = get_report_result(report)
+
+        with self.assertNumQueries(0):
+            second = get_report_result(report)
+        self.assertEqual(first, second)
+
+    def test_line_item_change_invalidates(self):
+        self.assertEqual(get_report_result(self.fresh_report()).total_beban_usaha, 100)
+
+        ExpenseItem.objects.create(report=self.report, name="Listrik", total=50)
+        result = get_report_result(self.fresh_report())
+
+        self.assertEqual(result.total_beban_usaha, 150)
+        self.assertEqual([item.name for item in result.beban_usaha_items], ["Sewa", "Listrik"])
+
+    def test_delete_invalidates(self):
+        item = ExpenseItem.objects.create(report=self.report, name="Listrik", total=50)
+        get_report_result(self.fresh_report())
+
+        ExpenseItem.objects.get(pk=item.pk).delete()
+
+        self.assertEqual(get_report_result(self.fresh_report()).total_beban_usaha, 100)
+
+    def test_report_save_bumps_version_even_from_a_stale_instance(self):
+        stale = self.fresh_report()
+        ExpenseItem.objects.create(report=self.report, name="Listrik", total=50)
+        current = self.fresh_report().version
+
+        stale.omzet_status = "iya"
+        stale.save()
+
+        self.assertEqual(stale.version, current + 1)
+        self.assertEqual(self.fresh_report().version, current + 1)
+
+    def test_bulk_hpp_sync_bumps_version(self):
+        version = self.fresh_report().version
+
+        sync_hpp_entries(self.report)  # seeds the AWAL/PEMBELIAN/AKHIR rows with bulk_create
+
+        self.assertGreater(self.fresh_report().version, version)
+
+    def test_cached_result_survives_pickling(self):
+        self.report.business_type = "manufaktur"
+        self.report.save()
+        HppManufactureOverhead.objects.create(report=self.report, nama_biaya="Listrik", total=700)
+
+        result = get_report_result(self.fresh_report())
+
+        self.assertEqual([(line.nama_biaya, line.total) for line in result.bop_items], [("Listrik", 700)])
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+
+
+class ReportResultRenderingTest(TestCase):
+    def setUp(self):
+        caches[REPORT_CACHE_ALIAS].clear()
+        self.user = User.objects.create_user(username="tester", password="test123")
+
+    def make_report(self, business_type):
+        report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type=business_type
+        )
+        product = Product.objects.create(report=report, name="a")
+        RevenueItem.objects.create(report=report, product=product, quantity=2, selling_price=500)
+        ExpenseItem.objects.create(report=report, name="Sewa", total=100)
+        HppManufactureOverhead.objects.create(report=report, nama_biaya="Listrik", total=700)
+        return FinancialReport.objects.get(pk=report.pk)
+
+    def test_dagang_result(self):
+        result = build_report_result(self.make_report("dagang"))
+
+        self.assertIsInstance(result, DagangReportResult)
+        self.assertEqual(result.beban_usaha_items, (ExpenseLine("Sewa", 100),))
+        self.assertEqual(result.as_context()["total_beban_usaha"], 100)
+
+    def test_manufaktur_result(self):
+        result = build_report_result(self.make_report("manufaktur"))
+
+        self.assertIsInstance(result, ManufakturReportResult)
+        self.assertEqual(result.bop_items, (BopLine("Listrik", 700),))
+        self.assertEqual(result.as_context()["hpp_total"], result.total_hpp)
+
+    def test_renderers_do_not_query(self):
+        for business_type, template in (
+            ("dagang", "core/pdf/laporan_pdf.html"),
+            ("manufaktur", "core/pdf/laporan_manufaktur_pdf.html"),
+        ):
+            with self.subTest(business_type):
+                report = self.make_report(business_type)
+                result = build_report_result(report)
+
+                with self.assertNumQueries(0):
+                    render_to_string(template, {**result.as_context(), "report": report})
+                    generate_excel_file(report, result)
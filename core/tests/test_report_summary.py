@@ -0,0 +1,163 @@
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from core.models import FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem, ReportSummary
+from core.models import HppManufactureMaterial, HppManufactureOverhead
+from core.utils.hpp_calculator import calculate_hpp_batch
+from core.utils.report_summary import compute_report_summary, rebuild_report_summary, verify_report_summary
+
+
+class ReportSummaryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.product = Product.objects.create(report=self.report, name="a")
+
+    def summary(self):
+        return ReportSummary.objects.get(report=self.report)
+
+    def assertInSync(self):
+        self.assertEqual(verify_report_summary(self.report), {})
+
+    def test_deltas_on_create_edit_delete(self):
+        usaha = RevenueItem.objects.create(report=self.report, product=self.product, quantity=2, selling_price=500)
+        lain = RevenueItem.objects.create(report=self.report, revenue_type="lain", name="Bunga", total=300)
+        self.assertEqual(self.summary().pendapatan_usaha, 1000)
+        self.assertEqual(self.summary().pendapatan_lain, 300)
+
+        usaha = RevenueItem.objects.get(pk=usaha.pk)
+        usaha.quantity = 3
+        usaha.save()
+        self.assertEqual(self.summary().pendapatan_usaha, 1500)
+
+        lain.delete()
+        self.assertEqual(self.summary().pendapatan_lain, 0)
+        self.assertInSync()
+
+    def test_moving_between_buckets(self):
+        item = ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Sewa", total=700)
+        item.expense_category = "lain"
+        item.save(update_fields=["expense_category"])
+
+        summary = self.summary()
+        self.assertEqual((summary.beban_usaha, summary.beban_lain), (0, 700))
+        self.assertInSync()
+
+    def test_queryset_delete(self):
+        HppManufactureMaterial.objects.create(report=self.report, product=self.product, type="BB_AWAL", total=100)
+        HppManufactureOverhead.objects.create(report=self.report, total=50)
+        HppManufactureMaterial.objects.filter(report=self.report).delete()
+
+        summary = self.summary()
+        self.assertEqual((summary.bb_awal, summary.bop), (0, 50))
+        self.assertInSync()
+
+    def test_hpp_dagang_and_laba(self):
+        # FIFO HPP is refreshed once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            RevenueItem.objects.create(report=self.report, product=self.product, quantity=10, selling_price=1000)
+            HppEntry.objects.create(report=self.report, product=self.product, category="AWAL", quantity=20,
+                                    harga_satuan=300)
+            HppEntry.objects.create(report=self.report, product=self.product, category="AKHIR", quantity=10)
+            ExpenseItem.objects.create(report=self.report, expense_category="usaha", name="Sewa", total=1000)
+
+        summary = self.summary()
+        self.assertEqual(summary.hpp_dagang, 3000)
+        self.assertEqual(summary.jumlah_beban, 4000)
+        self.assertEqual(summary.laba_setelah_pajak, 6000)
+        self.assertInSync()
+
+    def test_hpp_dagang_refresh_runs_once_per_transaction(self):
+        rebuild_report_summary(self.report)
+        product_id = self.product.id
+        with patch("core.utils.report_summary.calculate_hpp_batch", wraps=calculate_hpp_batch) as calculate:
+            with self.captureOnCommitCallbacks(execute=True):
+                RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+                HppEntry.objects.create(report=self.report, product=self.product, category="AWAL", quantity=5)
+                HppEntry.objects.create(report=self.report, product=self.product, category="AKHIR", quantity=4)
+                self.product.delete()
+
+        calculate.assert_called_once_with(self.report, {product_id})
+        self.assertEqual(self.summary().hpp_dagang_products, {})
+        self.assertInSync()
+
+    def test_hpp_dagang_refresh_only_recomputes_touched_products(self):
+        other = Product.objects.create(report=self.report, name="b")
+        with self.captureOnCommitCallbacks(execute=True):
+            for product, harga in ((self.product, 300), (other, 700)):
+                RevenueItem.objects.create(report=self.report, product=product, quantity=2, selling_price=1000)
+                HppEntry.objects.create(report=self.report, product=product, category="AWAL", quantity=5,
+                                        harga_satuan=harga)
+        self.assertEqual(self.summary().hpp_dagang, 5000)
+
+        sale = RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=1000)
+        with patch("core.utils.report_summary.calculate_hpp_batch", wraps=calculate_hpp_batch) as calculate:
+            with self.captureOnCommitCallbacks(execute=True):
+                HppEntry.objects.filter(product=self.product, category="AWAL").update(harga_satuan=400)
+                sale.product = other
+                sale.save()
+
+        calculate.assert_called_once_with(self.report, {self.product.id, other.id})
+        self.assertEqual(self.summary().hpp_dagang, 5500)
+        self.assertInSync()
+
+    def test_summary_without_per_product_values_is_refreshed_whole(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RevenueItem.objects.create(report=self.report, product=self.product, quantity=2, selling_price=1000)
+            HppEntry.objects.create(report=self.report, product=self.product, category="AWAL", quantity=5,
+                                    harga_satuan=300)
+        ReportSummary.objects.filter(report=self.report).update(hpp_dagang_products=None)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            HppEntry.objects.create(report=self.report, product=self.product, category="AKHIR", quantity=3)
+
+        self.assertEqual(self.summary().hpp_dagang, 600)
+        self.assertInSync()
+
+    def test_manufaktur_skips_hpp_dagang(self):
+        self.report.business_type = "manufaktur"
+        self.report.save()
+
+        with patch("core.utils.report_summary.calculate_hpp_batch") as calculate:
+            with self.captureOnCommitCallbacks(execute=True):
+                RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=10)
+
+        calculate.assert_not_called()
+        self.assertEqual(self.summary().hpp_dagang, 0)
+        self.assertInSync()
+
+    def test_report_without_a_type_counts_as_dagang(self):
+        FinancialReport.objects.filter(pk=self.report.pk).update(business_type=None)
+        self.report.refresh_from_db()
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=2, selling_price=1000)
+        HppEntry.objects.create(report=self.report, product=self.product, category="AWAL", quantity=5,
+                                harga_satuan=300)
+
+        summary = rebuild_report_summary(self.report)
+        self.assertEqual(summary.hpp_dagang, 1500)
+        self.assertEqual(summary.hpp_total, summary.hpp_dagang)
+
+    def test_rebuild_and_verify_command(self):
+        RevenueItem.objects.create(report=self.report, product=self.product, quantity=1, selling_price=900)
+        ReportSummary.objects.filter(report=self.report).update(pendapatan_usaha=1)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_report_summaries", "--verify", stdout=StringIO())
+
+        call_command("rebuild_report_summaries", stdout=StringIO())
+        self.assertEqual(self.summary().pendapatan_usaha, 900)
+        call_command("rebuild_report_summaries", "--verify", stdout=StringIO())
+
+    def test_missing_row_is_built_from_scratch(self):
+        RevenueItem.objects.create(report=self.report, revenue_type="lain", name="Bunga", total=300)
+        ReportSummary.objects.filter(report=self.report).delete()
+
+        ExpenseItem.objects.create(report=self.report, expense_category="lain", name="Admin", total=5)
+        self.assertEqual(self.summary().pendapatan_lain, 300)
+        self.assertEqual(compute_report_summary(self.report)["beban_lain"], 5)
+        self.assertInSync()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook
+from core.models import FinancialReport, Product, RevenueItem, HppEntry, ReportSummary
+from core.utils.completion import FLAG_PENDAPATAN_USAHA
+from core.utils.revenue_import import RevenueImportError, import_revenue_file, import_revenue_rows, parse_int_cell
+from core.utils.report_summary import verify_report_summary
+
+
+class RevenueImportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.kursi = Product.objects.create(report=self.report, name="kursi")
+
+    def import_csv(self, text, **kwargs):
+        return import_revenue_file(self.report, BytesIO(text.encode("utf-8")), "pendapatan.csv", **kwargs)
+
+    def test_csv_rows_become_revenue_items(self):
+        result = self.import_csv(
+            "jenis,produk,nama,qty,harga,total\n"
+            "usaha,kursi,,2,500,\n"
+            "usaha,meja,,1,\"1.500\",\n"
+            ",meja,,3,1500,\n"
+            "lain,,Bunga bank,,,70\n"
+        )
+
+        self.assertEqual((result.created, result.products_created, result.errors), (4, 1, []))
+        meja = Product.objects.get(report=self.report, name="meja")
+        rows = RevenueItem.objects.filter(report=self.report).order_by("id")
+        self.assertEqual(
+            [(r.revenue_type, r.product_id, r.name, r.quantity, r.selling_price, r.total) for r in rows],
+            [
+                ("usaha", self.kursi.id, "kursi", 2, 500, 1000),
+                ("usaha", meja.id, "meja", 1, 1500, 1500),
+                ("usaha", meja.id, "meja", 3, 1500, 4500),
+                ("lain", None, "Bunga bank", 1, 0, 70),
+            ],
+        )
+
+    def test_parse_int_cell(self):
+        for value, expected in [
+            (1500, 1500), (1500.0, 1500), ("1500", 1500), ("1.500", 1500), ("1,500", 1500),
+            ("Rp 1.500", 1500), ("1500.0", 1500), ("1500,00", 1500), ("-7", -7), (" ", None),
+            ("12345678901234567", 12345678901234567), ("12.345.678.901.234.567", 12345678901234567),
+        ]:
+            self.assertEqual(parse_int_cell(value), expected, value)
+        for value in ("1e3", "inf", "nan", "1.5", "1,5", "12a", True):
+            with self.assertRaises(ValueError, msg=value):
+                parse_int_cell(value)
+
+    def test_bookkeeping_the_signals_would_do(self):
+        version = self.report.version
+
+        self.import_csv("produk;qty;harga\nkursi;2;500\n")
+
+        self.report.refresh_from_db()
+        self.assertTrue(self.report.completion_flags & FLAG_PENDAPATAN_USAHA)
+        self.assertGreater(self.report.version, version)
+        self.assertEqual(verify_report_summary(self.report), {})
+        self.assertEqual(ReportSummary.objects.get(report=self.report).pendapatan_usaha, 1000)
+        self.assertEqual(
+            sorted(HppEntry.objects.filter(product=self.kursi).values_list("category", flat=True)),
+            ["AKHIR", "AWAL", "PEMBELIAN"],
+        )
+
+    def test_invalid_rows_block_the_import(self):
+        text = "produk,qty,harga\nkursi,2,500\nmeja,0,500\n,1,1\nlemari,1.5,100\n"
+
+        result = self.import_csv(text)
+
+        self.assertEqual(result.created, 0)
+        self.assertEqual([row for row, _error in result.errors], [3, 4, 5])
+        self.assertIn("bilangan bulat", result.errors[2][1])
+        self.assertFalse(RevenueItem.objects.exists())
+
+        result = self.import_csv(text, skip_invalid=True)
+        self.assertEqual((result.created, len(result.errors)), (1, 3))
+
+    def test_xlsx_and_chunked_inserts(self):
+        wb = Workbook()
+        wb.active.append(["Produk", "Qty", "Harga Jual"])
+        for i in range(5):
+            wb.active.append([f"produk {i}", i + 1, 100.0])
+        buffer = BytesIO()
+        wb.save(buffer)
+        buffer.seek(0)
+
+        with mock.patch("core.utils.revenue_import.IMPORT_BATCH_SIZE", 2), \
+                CaptureQueriesContext(connection) as queries:
+            result = import_revenue_file(self.report, buffer, "pendapatan.xlsx")
+
+        inserts = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "core_revenueitem"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(result.created, 5)
+        self.assertEqual(
+            list(RevenueItem.objects.order_by("quantity").values_list("quantity", "total")),
+            [(1, 100), (2, 200), (3, 300), (4, 400), (5, 500)],
+        )
+
+    def test_unreadable_files(self):
+        with self.assertRaises(RevenueImportError):
+            import_revenue_file(self.report, BytesIO(b""), "pendapatan.pdf")
+        with self.assertRaises(RevenueImportError):
+            import_revenue_rows(self.report, [["tanggal", "jumlah"], ["1", "2"]])
+
+    def test_upload_from_the_pendapatan_page(self):
+        self.client.login(username="tester", password="test123")
+        upload = SimpleUploadedFile("pendapatan.csv", b"produk,qty,harga\nkursi,2,500\nmeja,x,1\n")
+
+        response = self.client.post(
+            reverse("core:pendapatan", args=[self.report.id]), {"action": "import", "import_file": upload}
+        )
+
+        self.assertRedirects(response, reverse("core:pendapatan", args=[self.report.id]), fetch_redirect_response=False)
+        texts = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertIn("Baris 3: Qty, harga dan total harus bilangan bulat.", texts)
+        self.assertFalse(RevenueItem.objects.exists())
+
+    def test_command(self):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w") as f:
+            f.write("produk,qty,harga\nkursi,2,500\nmeja,0,1\n")
+        self.addCleanup(os.remove, path)
+
+        with self.assertRaisesMessage(CommandError, "1 invalid rows"):
+            call_command("import_revenue", self.report.id, path, stdout=StringIO(), stderr=StringIO())
+
+        out = StringIO()
+        call_command("import_revenue", self.report.id, path, skip_invalid=True, stdout=out, stderr=StringIO())
+        self.assertIn("Imported 1 revenue items (0 new products).", out.getvalue())
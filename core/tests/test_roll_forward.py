@@ -0,0 +1,136 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.models import (
+    FinancialReport, Product, RevenueItem, HppEntry, ReportSummary,
+    HppManufactureMaterial, HppManufactureWIP, HppManufactureFinishedGoods,
+)
+from core.utils.completion import FLAG_BB, FLAG_BDP, FLAG_BJ
+from core.utils.hpp_calculator import calculate_hpp_batch
+from core.utils.report_summary import verify_report_summary
+from core.utils.roll_forward import next_period, roll_forward_report
+
+
+class RollForwardTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="Desember", year=2024, business_type="dagang",
+            business_status="umkm", omzet_status="tidak",
+        )
+
+    def add_product(self, name, awal, pembelian, akhir, sold):
+        product = Product.objects.create(report=self.report, name=name)
+        RevenueItem.objects.create(report=self.report, product=product, quantity=sold, selling_price=10000)
+        HppEntry.objects.create(report=self.report, product=product, category="AWAL", quantity=awal[0],
+                                harga_satuan=awal[1])
+        HppEntry.objects.create(report=self.report, product=product, category="PEMBELIAN", quantity=pembelian[0],
+                                harga_satuan=pembelian[1])
+        HppEntry.objects.create(report=self.report, product=product, category="AKHIR", quantity=akhir)
+        return product
+
+    def test_next_period(self):
+        self.assertEqual(next_period("Januari", 2025), ("Februari", 2025))
+        self.assertEqual(next_period("Desember", 2024), ("Januari", 2025))
+        self.assertEqual(next_period(None, 2025), (None, 2025))
+
+    def test_dagang_akhir_becomes_awal(self):
+        self.add_product("Kursi", awal=(10, 1000), pembelian=(10, 2000), akhir=5, sold=15)
+        self.add_product("Meja", awal=(4, 500), pembelian=(0, 0), akhir=0, sold=4)
+        Product.objects.create(report=self.report, name="Lemari")
+        [(_kursi, kursi_result), _meja] = calculate_hpp_batch(self.report)
+
+        new_report = roll_forward_report(self.report)
+
+        self.assertEqual((new_report.month, new_report.year), ("Januari", 2025))
+        self.assertEqual(
+            (new_report.user_id, new_report.company_name, new_report.business_status, new_report.omzet_status),
+            (self.user.id, "Dummy Co", "umkm", "tidak"),
+        )
+        self.assertEqual(
+            list(new_report.products.values_list("name", flat=True)), ["Kursi", "Lemari", "Meja"]
+        )
+        [awal] = HppEntry.objects.filter(report=new_report)
+        self.assertEqual((awal.product.name, awal.category, awal.quantity), ("Kursi", "AWAL", 5))
+        self.assertEqual(awal.quantity * awal.harga_satuan, kursi_result["total_akhir"])
+        self.assertFalse(RevenueItem.objects.filter(report=new_report).exists())
+        self.assertEqual(verify_report_summary(new_report), {})
+        # Cached results of the new report start from a fresh version
+        new_report.refresh_from_db(fields=["version"])
+        self.assertEqual(new_report.version, 1)
+
+    def test_dagang_opening_value_rounding(self):
+        # FIFO akhir: 3 units at 1001 + 1 unit at 1000 = 4003, not a multiple of 4
+        self.add_product("Kursi", awal=(3, 1000), pembelian=(3, 1001), akhir=4, sold=2)
+        [(_kursi, result)] = calculate_hpp_batch(self.report)
+        self.assertEqual(result["total_akhir"], 4003)
+
+        new_report = roll_forward_report(self.report)
+
+        awal = HppEntry.objects.get(report=new_report, category="AWAL")
+        self.assertEqual((awal.quantity, awal.harga_satuan), (4, 1001))
+        self.assertLessEqual(abs(awal.quantity * awal.harga_satuan - result["total_akhir"]), awal.quantity / 2)
+
+    def test_query_count_does_not_grow_with_products(self):
+        def run(count):
+            for i in range(count):
+                self.add_product(f"Produk {count}-{i}", awal=(5, 100), pembelian=(5, 100), akhir=2, sold=8)
+            with CaptureQueriesContext(connection) as queries:
+                roll_forward_report(self.report)
+            return len(queries)
+
+        self.assertEqual(run(2), run(20))
+
+    def test_manufaktur_akhir_rows_become_awal(self):
+        report = FinancialReport.objects.create(
+            user=self.user, company_name="Pabrik", month="Maret", year=2025, business_type="manufaktur"
+        )
+        roti = Product.objects.create(report=report, name="Roti")
+        HppManufactureMaterial.objects.create(report=report, product=roti, type="BB_AKHIR",
+                                              nama_bahan_baku="Tepung", quantity=3, harga_satuan=1000, total=3000)
+        HppManufactureMaterial.objects.create(report=report, product=roti, type="BB_PEMBELIAN",
+                                              nama_bahan_baku="Tepung", quantity=9, harga_satuan=1000, total=9000)
+        HppManufactureWIP.objects.create(report=report, product=roti, type="WIP_AKHIR", quantity=2,
+                                         harga_satuan=500, total=1000)
+        HppManufactureFinishedGoods.objects.create(report=report, product=roti, type="FG_AKHIR", quantity=4,
+                                                   harga_satuan=2500, total=10001)
+
+        new_report = roll_forward_report(report)
+
+        new_roti = new_report.products.get()
+        self.assertEqual(
+            list(HppManufactureMaterial.objects.filter(report=new_report).values_list(
+                "product_id", "type", "nama_bahan_baku", "quantity", "total")),
+            [(new_roti.id, "BB_AWAL", "Tepung", 3, 3000)],
+        )
+        self.assertEqual(
+            list(HppManufactureWIP.objects.filter(report=new_report).values_list("type", "quantity", "total")),
+            [("WIP_AWAL", 2, 1000)],
+        )
+        self.assertEqual(
+            list(HppManufactureFinishedGoods.objects.filter(report=new_report).values_list(
+                "type", "harga_satuan", "total")),
+            [("FG_AWAL", 2500, 10001)],
+        )
+        new_report.refresh_from_db()
+        flags = FLAG_BB | FLAG_BDP | FLAG_BJ
+        self.assertEqual(new_report.completion_flags & flags, flags)
+        summary = ReportSummary.objects.get(report=new_report)
+        self.assertEqual((summary.bb_awal, summary.bdp_awal, summary.bj_awal), (3000, 1000, 10001))
+
+    def test_view(self):
+        self.add_product("Kursi", awal=(10, 1000), pembelian=(10, 2000), akhir=5, sold=15)
+        self.client.login(username="tester", password="test123")
+        url = reverse("core:roll_forward", args=[self.report.id])
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url)
+
+        new_report = FinancialReport.objects.exclude(pk=self.report.pk).get()
+        self.assertRedirects(response, reverse("core:profile", args=[new_report.id]), fetch_redirect_response=False)
+
+        other = User.objects.create_user(username="other", password="test123")
+        self.client.force_login(other)
+        self.assertEqual(self.client.post(url).status_code, 404)
@@ -0,0 +1,159 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models.deletion import Collector
+from django.test import TestCase
+from django.urls import reverse
+from core.models import (
+    FinancialReport, Product, RevenueItem, HppEntry,
+    HppManufactureProduction, HppManufactureFinishedGoods, StockMovement, StockBalance, ReportSummary,
+)
+from core.utils.hpp_calculator import sync_hpp_entries
+from core.utils.stock_ledger import rebuild_stock_ledger, stock_balances, stock_on_hand, verify_stock_ledger
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="test123")
+        self.report = FinancialReport.objects.create(
+            user=self.user, company_name="Dummy Co", month="01", year=2025, business_type="dagang"
+        )
+        self.kursi = Product.objects.create(report=self.report, name="Kursi")
+        HppEntry.objects.create(report=self.report, product=self.kursi, category="AWAL", quantity=10, harga_satuan=1000)
+        HppEntry.objects.create(report=self.report, product=self.kursi, category="PEMBELIAN", quantity=20,
+                                harga_satuan=1200, retur_qty=3)
+        self.sale = RevenueItem.objects.create(report=self.report, product=self.kursi, quantity=12, selling_price=5000)
+
+    def test_dagang_running_balance(self):
+        movements = list(StockMovement.objects.filter(product=self.kursi).values_list("kind", "quantity", "balance"))
+
+        self.assertEqual(movements, [
+            ("AWAL", 10, 10), ("PEMBELIAN", 20, 30), ("RETUR", -3, 27), ("PENJUALAN", -12, 15),
+        ])
+        balance = StockBalance.objects.get(product=self.kursi)
+        self.assertEqual(
+            (balance.quantity_awal, balance.quantity_in, balance.quantity_retur, balance.quantity_out,
+             balance.quantity, balance.movement_count),
+            (10, 20, 3, 12, 15, 4),
+        )
+
+    def test_new_rows_are_appended_to_the_ledger(self):
+        meja = Product.objects.create(report=self.report, name="Meja")
+        RevenueItem.objects.create(report=self.report, product=meja, quantity=2, selling_price=100)
+        history = list(StockMovement.objects.filter(product=meja).values_list("id", flat=True))
+
+        with self.assertNumQueries(9):
+            HppEntry.objects.create(report=self.report, product=meja, category="AWAL", quantity=5)
+
+        # Recording order: the awal lands after the penjualan, the earlier rows stay put
+        movements = list(StockMovement.objects.filter(product=meja).values_list("id", "kind", "balance"))
+        self.assertEqual([row[0] for row in movements[:1]], history)
+        self.assertEqual([row[1:] for row in movements], [("PENJUALAN", -2), ("AWAL", 3)])
+        balance = StockBalance.objects.get(product=meja)
+        self.assertEqual((balance.quantity_awal, balance.quantity_out, balance.quantity, balance.movement_count),
+                         (5, 2, 3, 2))
+        self.assertEqual(verify_stock_ledger(self.report), {})
+
+        # A rebuild lays it out in ledger order with the same balance
+        rebuild_stock_ledger(self.report, [meja.id])
+        self.assertEqual(
+            list(StockMovement.objects.filter(product=meja).values_list("kind", "balance")),
+            [("AWAL", 5), ("PENJUALAN", 3)],
+        )
+
+    def test_signals_follow_edits(self):
+        self.sale.quantity = 5
+        self.sale.save()
+        self.assertEqual(stock_on_hand(self.report), {self.kursi.id: 22})
+
+        # Moving the sale to another product rebuilds both ledgers
+        meja = Product.objects.create(report=self.report, name="Meja")
+        self.sale.product = meja
+        self.sale.save()
+        self.assertEqual(stock_on_hand(self.report), {self.kursi.id: 27, meja.id: -5})
+
+        self.sale.delete()
+        self.assertEqual(stock_on_hand(self.report), {self.kursi.id: 27, meja.id: 0})
+
+        self.kursi.delete()
+        self.assertFalse(StockMovement.objects.filter(report=self.report, product_id=self.kursi.id).exists())
+        self.assertEqual(verify_stock_ledger(self.report), {})
+
+    def test_derived_tables_keep_the_fast_delete_path(self):
+        collector = Collector("default")
+        for model in (StockMovement, StockBalance, ReportSummary):
+            self.assertTrue(collector.can_fast_delete(model), model.__name__)
+
+        with self.assertNumQueries(29):
+            self.report.delete()
+        self.assertFalse(StockMovement.objects.filter(report_id=self.report.id).exists())
+
+    def test_manufaktur_finished_goods(self):
+        report = FinancialReport.objects.create(
+            user=self.user, company_name="Pabrik", month="01", year=2025, business_type="manufaktur"
+        )
+        roti = Product.objects.create(report=report, name="Roti")
+        HppManufactureFinishedGoods.objects.create(report=report, product=roti, type="FG_AWAL", quantity=4)
+        HppManufactureProduction.objects.create(report=report, product=roti, qty_diproduksi=20)
+        RevenueItem.objects.create(report=report, product=roti, quantity=18, selling_price=10000)
+
+        self.assertEqual(
+            list(StockMovement.objects.filter(product=roti).values_list("kind", "balance")),
+            [("AWAL", 4), ("PRODUKSI", 24), ("PENJUALAN", 6)],
+        )
+        self.assertEqual(stock_on_hand(report, [roti.id]), {roti.id: 6})
+
+    def test_barang_jadi_akhir_rejects_a_product_of_another_report(self):
+        report = FinancialReport.objects.create(
+            user=self.user, company_name="Pabrik", month="01", year=2025, business_type="manufaktur"
+        )
+        self.client.login(username="tester", password="test123")
+        url = reverse("core:hpp_manufaktur", args=[report.id])
+
+        response = self.client.post(url, {
+            "action": "add_fg", "tipe_data": "AKHIR_BJ", "product_id": self.kursi.id, "kuantitas": 1,
+        })
+
+        self.assertRedirects(response, f"{url}#bj-anchor", fetch_redirect_response=False)
+        self.assertFalse(HppManufactureFinishedGoods.objects.filter(report=report).exists())
+
+    def test_switching_business_type_rebuilds_the_ledger(self):
+        roti = Product.objects.create(report=self.report, name="Roti")
+        HppManufactureFinishedGoods.objects.create(report=self.report, product=roti, type="FG_AWAL", quantity=4)
+        RevenueItem.objects.create(report=self.report, product=roti, quantity=1, selling_price=100)
+        self.assertEqual(stock_on_hand(self.report, [roti.id]), {roti.id: -1})
+
+        self.client.login(username="tester", password="test123")
+        self.client.post(reverse("core:profile", args=[self.report.id]), {
+            "company_name": "Dummy Co", "month": "01", "year": 2025, "business_type": "manufaktur",
+        })
+
+        self.report.refresh_from_db()
+        self.assertEqual(verify_stock_ledger(self.report), {})
+        self.assertEqual(stock_on_hand(self.report), {self.kursi.id: -12, roti.id: 3})
+
+    def test_missing_balances_are_built_on_read(self):
+        StockMovement.objects.all().delete()
+        StockBalance.objects.all().delete()
+
+        self.assertEqual(stock_balances(self.report, [self.kursi.id])[self.kursi.id].quantity, 15)
+        self.assertEqual(StockMovement.objects.filter(product=self.kursi).count(), 4)
+
+    def test_sync_hpp_entries_reads_the_ledger(self):
+        sync_hpp_entries(self.report)
+
+        self.assertEqual(HppEntry.objects.get(product=self.kursi, category="AKHIR").quantity, 15)
+
+    def test_backfill_command(self):
+        StockBalance.objects.filter(product=self.kursi).update(quantity=99)
+
+        with self.assertRaises(CommandError):
+            call_command("backfill_stock_ledger", "--verify", stdout=StringIO())
+
+        out = StringIO()
+        call_command("backfill_stock_ledger", str(self.report.id), stdout=out)
+        self.assertIn("1 products in 1 reports", out.getvalue())
+        self.assertEqual(verify_stock_ledger(self.report), {})
+        self.assertEqual(rebuild_stock_ledger(self.report)[self.kursi.id].quantity, 15)
@@ -12,9 +12,12 @@ urlpatterns = [
 
     path('reports/', views.report_list, name='report_list'),
     path('reports/new/', views.create_report, name='create_report'),
+    path('reports/<int:report_id>/roll-forward/', views.roll_forward, name='roll_forward'),
+    path('reports/export/zip/', views.export_bulk, name='export_bulk'),
 
     path('reports/<int:report_id>/profile/', views.profile_view, name='profile'),
     path('reports/<int:report_id>/pendapatan/', views.pendapatan_view, name='pendapatan'),
+    path('reports/<int:report_id>/items/batch/', views.line_items_batch, name='line_items_batch'),
     
     path('reports/<int:report_id>/hpp/', views.hpp_view, name='hpp'),
     path('reports/<int:report_id>/hpp/dagang/', views.hpp_dagang_view, name='hpp_dagang'),
@@ -30,4 +33,10 @@ urlpatterns = [
 
     path('reports/<int:report_id>/export/pdf/', views.export_pdf, name='export_pdf'),
     path('reports/<int:report_id>/export/excel/', views.export_excel, name='export_excel'),
+    path('reports/<int:report_id>/export/jobs/', views.export_job_create, name='export_job_create'),
+    path('reports/<int:report_id>/export/items/<slug:table>.<slug:fmt>', views.export_line_items, name='export_line_items'),
+    path('export/jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+
+    path('metrics/pdf/', views.pdf_metrics, name='pdf_metrics'),
 ]
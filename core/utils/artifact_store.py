@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+from core.utils.excel_exporter import EXPORTER_VERSION, excel_filename, write_excel_file
+from core.utils.pdf_exporter import generate_pdf_file, pdf_filename, pdf_template
+
+ARTIFACT_SUFFIXES = {"pdf": ".pdf", "excel": ".xlsx", "excel_detail": ".xlsx"}
+
+
+def artifact_root():
+    return Path(getattr(settings, "ARTIFACT_ROOT", Path(settings.MEDIA_ROOT) / "artifacts"))
+
+
+@lru_cache(maxsize=None)
+def _template_digest(template_path):
+    """Hash of a PDF template's source, so editing the template changes every PDF key."""
+    origin = get_template(template_path).origin
+    return hashlib.sha256(Path(origin.name).read_bytes()).hexdigest()
+
+
+def artifact_key(report, result, kind):
+    """
+    Hash of everything an export is rendered from: the ReportResult, the
+    report header fields the exporters print, and the exporter version.
+    """
+    if kind == "pdf":
+        renderer = f"pdf:{pdf_template(report)}:{_template_digest(pdf_template(report))}"
+    else:
+        renderer = f"{kind}:{EXPORTER_VERSION}"
+    parts = [renderer, report.business_type, report.company_name, report.month, report.year, repr(result)]
+    if kind == "excel_detail":
+        # The detail sheets print raw line items that the ReportResult does not carry
+        parts.append(f"report:{report.pk}:v{report.version}")
+    return hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+def artifact_path(key, kind):
+    return artifact_root() / key[:2] / f"{key}{ARTIFACT_SUFFIXES[kind]}"
+
+
+def export_filename(report, kind):
+    """Download filename of an export kind."""
+    if kind == "pdf":
+        return pdf_filename(report)
+    return excel_filename(report, detail=kind == "excel_detail")
+
+
+def render_artifact(report, result, kind, output, wait_timeout=None):
+    """Write the export into the binary file ``output``."""
+    if kind == "pdf":
+        output.write(generate_pdf_file(report, result, pdf_template(report), wait_timeout=wait_timeout))
+    else:
+        write_excel_file(report, output, result, detail=kind == "excel_detail")
+
+
+def get_or_render_artifact(report, result, kind, key=None, wait_timeout=None):
+    """Path of the stored export, rendering and storing it on a miss."""
+    if key is None:
+        key = artifact_key(report, result, kind)
+    path = artifact_path(key, kind)
+    if path.exists():
+        # mtime doubles as "last used" for the eviction order
+        os.utime(path)
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            render_artifact(report, result, kind, output, wait_timeout)
+        # Atomic, so a concurrent reader never sees a half-written file
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    evict_artifacts(keep=path)
+    return path
+
+
+def evict_artifacts(max_bytes=None, keep=None):
+    """Delete the least recently used artifacts until the store fits in ``max_bytes``."""
+    if max_bytes is None:
+        max_bytes = getattr(settings, "ARTIFACT_STORE_MAX_BYTES", 512 * 2**20)
+    files = []
+    for path in artifact_root().glob("*/*"):
+        if path.suffix == ".tmp":
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _mtime, size, _path in files)
+    evicted = 0
+    for _mtime, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    return evicted
@@ -0,0 +1,113 @@
+import io
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import PurePath
+
+from django.conf import settings
+from core.utils.bulk_worker import init_worker, render_entry
+
+# Bytes read from a stored artifact per archive write (and per chunk sent to the client)
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Settings a spawned worker takes from this process instead of the settings module, so it
+# renders against the same database and artifact store (the test runner changes both)
+WORKER_SETTINGS = ("DATABASES", "ARTIFACT_ROOT")
+
+
+def bulk_export_tasks(reports, kinds):
+    """(report_id, kind) pairs to render, in report order."""
+    return [(report.pk, kind) for report in reports for kind in kinds]
+
+
+def iter_rendered(tasks, workers=None):
+    """
+    Yield bulk_worker.render_entry results as they finish. With ``workers`` <= 1 the
+    tasks are rendered in this process, in order.
+    """
+    if workers is None:
+        workers = getattr(settings, "BULK_EXPORT_WORKERS", 2)
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield render_entry(*task)
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=({name: getattr(settings, name) for name in WORKER_SETTINGS if hasattr(settings, name)},),
+    )
+    try:
+        futures = {executor.submit(render_entry, *task): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself died (BrokenProcessPool and the like)
+                report_id, kind = futures[future]
+                yield report_id, kind, None, None, str(e)
+    finally:
+        # Don't wait for renders nobody will read when the client goes away
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that hands what was written to the caller in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(filename, used):
+    name = filename
+    n = 2
+    while name in used:
+        path = PurePath(filename)
+        name = f"{path.stem} ({n}){path.suffix}"
+        n += 1
+    used.add(name)
+    return name
+
+
+def iter_zip(entries):
+    """
+    Stream a ZIP archive of the render results in ``entries``, one chunk at a
+    time; only the chunk being sent is held in memory. Failed renders are
+    listed in an ERRORS.txt entry at the end instead of aborting the download.
+    """
+    sink = _ChunkSink()
+    used = set()
+    errors = []
+    # XLSX and PDF are already compressed, so entries are stored as is
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for report_id, kind, filename, path, error in entries:
+            if error is not None:
+                errors.append(f"report {report_id} ({kind}): {error}")
+                continue
+            with open(path, "rb") as src, archive.open(_unique_name(filename, used), "w", force_zip64=True) as dst:
+                while chunk := src.read(ZIP_CHUNK_SIZE):
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+        if errors:
+            archive.writestr("ERRORS.txt", "\n".join(errors) + "\n")
+    yield sink.drain()
+
+
+def stream_bulk_export(reports, kinds, workers=None):
+    """ZIP archive bytes of every export in ``kinds`` for every report, rendered in parallel."""
+    chunks = iter_zip(iter_rendered(bulk_export_tasks(reports, kinds), workers))
+    return (chunk for chunk in chunks if chunk)
@@ -0,0 +1,37 @@
+"""
+Entry points of the bulk export process pool (core.utils.bulk_export).
+
+Workers are spawned, not forked, so nothing (DB sockets, the PDF pool's
+threads) is inherited; this module is unpickled in a fresh interpreter
+before Django is set up and so must not import models at module level.
+"""
+import django
+
+
+def init_worker(overrides=None):
+    """Set up Django, with ``overrides`` (setting name -> value) taken from the parent process."""
+    if overrides:
+        from django.conf import settings
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+    django.setup()
+
+
+def render_entry(report_id, kind):
+    """
+    Render one export into the artifact store. Takes ids and returns plain
+    values so it can cross the process boundary: (report_id, kind, filename, path, error).
+    """
+    from django.conf import settings
+    from core.models import FinancialReport
+    from core.utils.artifact_store import export_filename, get_or_render_artifact
+    from core.utils.report_cache import get_report_result
+
+    try:
+        report = FinancialReport.objects.get(pk=report_id)
+        path = get_or_render_artifact(
+            report, get_report_result(report), kind, wait_timeout=getattr(settings, "PDF_RENDER_TIMEOUT", 60)
+        )
+        return report_id, kind, export_filename(report, kind), str(path), None
+    except Exception as e:
+        return report_id, kind, None, None, str(e)
@@ -0,0 +1,102 @@
+from django.db.models import Exists, F, OuterRef
+from core.models import (
+    FinancialReport, RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods
+)
+
+# One bit per "section has at least one row" check used by the wizard
+FLAG_PENDAPATAN_USAHA = 1 << 0
+FLAG_HPP_DAGANG = 1 << 1
+FLAG_BB = 1 << 2
+FLAG_BDP = 1 << 3
+FLAG_BTKL = 1 << 4
+FLAG_BOP = 1 << 5
+FLAG_BJ = 1 << 6
+FLAG_PRODUKSI = 1 << 7
+FLAG_BEBAN_USAHA = 1 << 8
+
+FLAG_HPP_MANUFAKTUR = FLAG_BB | FLAG_BDP | FLAG_BTKL | FLAG_BOP | FLAG_BJ | FLAG_PRODUKSI
+ALL_FLAGS = FLAG_PENDAPATAN_USAHA | FLAG_HPP_DAGANG | FLAG_HPP_MANUFAKTUR | FLAG_BEBAN_USAHA
+
+# model -> (flag, filter a row must match to count for that flag)
+TRACKED_MODELS = {
+    RevenueItem: (FLAG_PENDAPATAN_USAHA, {"revenue_type": "usaha"}),
+    HppEntry: (FLAG_HPP_DAGANG, {}),
+    HppManufactureMaterial: (FLAG_BB, {}),
+    HppManufactureWIP: (FLAG_BDP, {}),
+    HppManufactureLabor: (FLAG_BTKL, {}),
+    HppManufactureOverhead: (FLAG_BOP, {}),
+    HppManufactureFinishedGoods: (FLAG_BJ, {}),
+    HppManufactureProduction: (FLAG_PRODUKSI, {}),
+    ExpenseItem: (FLAG_BEBAN_USAHA, {"expense_category": "usaha"}),
+}
+
+
+def row_counts_for_flag(instance):
+    """True when this line item, as saved, satisfies its model's completion check."""
+    _flag, filters = TRACKED_MODELS[type(instance)]
+    return all(getattr(instance, field) == value for field, value in filters.items())
+
+
+def set_completion_flags(report_id, flags):
+    FinancialReport.objects.filter(pk=report_id).update(completion_flags=F("completion_flags").bitor(flags))
+
+
+def refresh_completion_flags(report_id, models=None):
+    """
+    Recompute the flags of the given line item models (default: all of them)
+    from the database in one query and store the result. Used after deletes
+    and bulk operations, which do not go through the per-row signals.
+    """
+    models = list(models or TRACKED_MODELS)
+    annotations = {
+        model._meta.model_name: Exists(model.objects.filter(report=OuterRef("pk"), **TRACKED_MODELS[model][1]))
+        for model in models
+    }
+
+    row = FinancialReport.objects.filter(pk=report_id).annotate(**annotations).values(*annotations).first()
+    if row is None:
+        return 0
+
+    mask = flags = 0
+    for model in models:
+        flag = TRACKED_MODELS[model][0]
+        mask |= flag
+        if row[model._meta.model_name]:
+            flags |= flag
+
+    FinancialReport.objects.filter(pk=report_id).update(
+        completion_flags=F("completion_flags").bitand(ALL_FLAGS ^ mask).bitor(flags)
+    )
+    return flags
+
+
+def get_completion_status(report):
+    """Wizard progress for the sidebar, read from report.completion_flags without queries."""
+    flags = report.completion_flags if report else 0
+
+    status = {
+        "profile": False,
+        "pendapatan": False,
+        "hpp": False,
+        "beban_usaha": False,
+    }
+
+    if report and report.company_name and report.business_type:
+        status["profile"] = True
+
+    if status["profile"] and flags & FLAG_PENDAPATAN_USAHA:
+        status["pendapatan"] = True
+
+    if status["pendapatan"]:
+        if report.business_type == "manufaktur":
+            required = FLAG_HPP_MANUFAKTUR
+        else:
+            required = FLAG_HPP_DAGANG
+        status["hpp"] = flags & required == required
+
+    if status["hpp"] and flags & FLAG_BEBAN_USAHA:
+        status["beban_usaha"] = True
+
+    return status
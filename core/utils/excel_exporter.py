@@ -1,15 +1,18 @@
 # core/utils/excel_exporter.py
 from io import BytesIO
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
-
-# --- MODIFIED: Import both data calculators ---
-from core.utils.final_report import (
-    generate_final_report_data, 
-    get_manufaktur_report_context
+from core.models import (
+    RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods
 )
 
+# Both layouts render a ReportResult, cached per report version
+from core.utils.report_cache import get_report_result
+
 # --- STYLING (can be shared) ---
 bold = Font(bold=True)
 center = Alignment(horizontal="center")
@@ -19,20 +22,153 @@ header_fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="s
 total_fill = PatternFill(start_color="F3F4F6", end_color="F3F4F6", fill_type="solid")
 currency_format = "#,##0"
 
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Part of the stored artifact key (core.utils.artifact_store); bump it whenever the layout changes
+EXPORTER_VERSION = 1
 
-def _auto_fit_columns(ws):
-    for col in ws.columns:
-        length = max(len(str(cell.value or "")) for cell in col)
-        ws.column_dimensions[col[0].column_letter].width = length + 3
+# Rows fetched per round trip when streaming the detail sheets
+DETAIL_CHUNK_SIZE = 2000
+
+# Full detail mode: (sheet title, model, business type or None for both, ((header, field, width), ...))
+DETAIL_SHEETS = (
+    ("Pendapatan", RevenueItem, None, (
+        ("Jenis", "revenue_type", 10), ("Produk", "product__name", 30), ("Nama", "name", 30),
+        ("Qty", "quantity", 10), ("Harga Jual", "selling_price", 15), ("Total", "total", 15),
+    )),
+    ("HPP", HppEntry, "dagang", (
+        ("Kategori", "category", 12), ("Produk", "product__name", 30), ("Qty", "quantity", 10),
+        ("Harga Satuan", "harga_satuan", 15), ("Diskon", "diskon", 12), ("Retur Qty", "retur_qty", 10),
+        ("Ongkir", "ongkir", 12), ("Keterangan", "keterangan", 30),
+    )),
+    ("Bahan Baku", HppManufactureMaterial, "manufaktur", (
+        ("Jenis", "type", 14), ("Produk", "product__name", 30), ("Bahan Baku", "nama_bahan_baku", 30),
+        ("Qty", "quantity", 10), ("Harga Satuan", "harga_satuan", 15), ("Diskon", "diskon", 12),
+        ("Retur Qty", "retur_qty", 10), ("Retur (Rp)", "retur_amount", 12), ("Ongkir", "ongkir", 12),
+        ("Total", "total", 15), ("Keterangan", "keterangan", 30),
+    )),
+    ("BTKL", HppManufactureLabor, "manufaktur", (
+        ("Produk", "product__name", 30), ("Tenaga Kerja", "jenis_tenaga_kerja", 30), ("Qty", "quantity", 10),
+        ("Harga Satuan", "harga_satuan", 15), ("Total", "total", 15), ("Keterangan", "keterangan", 30),
+    )),
+    ("BOP", HppManufactureOverhead, "manufaktur", (
+        ("Produk", "product__name", 30), ("Nama Biaya", "nama_biaya", 30), ("Qty", "quantity", 10),
+        ("Harga Satuan", "harga_satuan", 15), ("Total", "total", 15), ("Keterangan", "keterangan", 30),
+    )),
+    ("BDP", HppManufactureWIP, "manufaktur", (
+        ("Jenis", "type", 12), ("Produk", "product__name", 30), ("Qty", "quantity", 10),
+        ("Harga Satuan", "harga_satuan", 15), ("Total", "total", 15), ("Keterangan", "keterangan", 30),
+    )),
+    ("Barang Diproduksi", HppManufactureProduction, "manufaktur", (
+        ("Produk", "product__name", 30), ("Qty Diproduksi", "qty_diproduksi", 15),
+        ("Total Produksi", "total_produksi", 15), ("HPP / Unit", "hpp_per_unit", 15),
+        ("Keterangan", "keterangan", 30),
+    )),
+    ("Barang Jadi", HppManufactureFinishedGoods, "manufaktur", (
+        ("Jenis", "type", 12), ("Produk", "product__name", 30), ("Qty", "quantity", 10),
+        ("Harga Satuan", "harga_satuan", 15), ("Total", "total", 15), ("Status", "status", 15),
+        ("Keterangan", "keterangan", 30),
+    )),
+    ("Beban", ExpenseItem, None, (
+        ("Kategori", "expense_category", 10), ("Jenis", "expense_type", 20), ("Produk", "product__name", 30),
+        ("Nama", "name", 30), ("Total", "total", 15),
+    )),
+)
 
 
-def _generate_excel_dagang(wb, report, data):
+class _ColumnWidths:
+    """
+    Stand-in for _ExcelBook that runs a layout without writing anything and
+    records each sheet's column widths (longest value + 3).
+
+    A write-only worksheet emits its <cols> element before the first row, and
+    every laporan value is already in the ReportResult, so the layout is run
+    once through this to size the columns, then again to stream the rows.
+    """
+
+    def __init__(self):
+        self.sheets = {}
+
+    def sheet(self, title):
+        return _WidthSheet(self.sheets.setdefault(title, {}))
+
+
+class _WidthSheet:
+    def __init__(self, widths):
+        self.widths = widths
+
+    def append(self, values=(), bold=0, filled=0):
+        for idx, value in enumerate(values, start=1):
+            self.widths[idx] = max(self.widths.get(idx, 0), len(str(value or "")) + 3)
+
+
+class _SheetWriter:
+    """Appends rows straight to a write-only worksheet, styling the first cells of a row on request."""
+
+    # append's ``bold`` argument shadows the module-level font
+    bold_font = bold
+
+    def __init__(self, ws):
+        self.ws = ws
+
+    def append(self, values=(), bold=0, filled=0):
+        """Write a row; the first ``bold`` cells get a bold font, the first ``filled`` the total fill."""
+        if not bold and not filled:
+            self.ws.append(values)
+            return
+        row = []
+        for idx, value in enumerate(values):
+            cell = WriteOnlyCell(self.ws, value)
+            if idx < bold:
+                cell.font = self.bold_font
+            if idx < filled:
+                cell.fill = total_fill
+            row.append(cell)
+        self.ws.append(row)
+
+
+class _ExcelBook:
+    """Write-only workbook whose sheets are filled through _SheetWriter."""
+
+    def __init__(self, widths=None):
+        self.wb = Workbook(write_only=True)
+        # {sheet title: {column index: width}}, from _ColumnWidths
+        self.widths = widths or {}
+
+    def sheet(self, title):
+        ws = self.wb.create_sheet(title=title)
+        for idx, width in self.widths.get(title, {}).items():
+            ws.column_dimensions[get_column_letter(idx)].width = width
+        return _SheetWriter(ws)
+
+    def stream_sheet(self, title, columns, rows):
+        """
+        Write a table sheet straight to the workbook: fixed column widths,
+        a header row, then ``rows`` as they are iterated, never held in memory.
+        """
+        ws = self.wb.create_sheet(title=title)
+        for idx, (_header, width) in enumerate(columns, start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = width
+        header = []
+        for name, _width in columns:
+            cell = WriteOnlyCell(ws, name)
+            cell.font = bold
+            cell.fill = header_fill
+            header.append(cell)
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+
+    def save(self, output):
+        self.wb.save(output)
+
+
+def _generate_excel_dagang(book, report, result):
     """
     Builds the Excel sheet for a "Dagang" report.
     This is your original function, now as a helper.
     """
-    ws = wb.active
-    ws.title = "Laporan Laba Rugi"
+    ws = book.sheet("Laporan Laba Rugi")
 
     # ========== HEADER ==========
     ws.append([report.company_name])
@@ -42,172 +178,168 @@ def _generate_excel_dagang(wb, report, data):
 
     # ========== PENDAPATAN ==========
     ws.append(["Pendapatan"])
-    ws.append(["Jenis", "Jumlah"])
-    ws["A6"].font = bold
-    ws["B6"].font = bold
+    ws.append(["Jenis", "Jumlah"], bold=2)
 
-    ws.append(["Pendapatan Usaha", data["total_pendapatan_usaha"]])
-    ws.append(["Pendapatan Lain-lain", data["total_pendapatan_lain"]])
-    ws.append(["Jumlah Pendapatan", data["jumlah_pendapatan"]])
+    ws.append(["Pendapatan Usaha", result.total_pendapatan_usaha])
+    ws.append(["Pendapatan Lain-lain", result.total_pendapatan_lain])
+    ws.append(["Jumlah Pendapatan", result.jumlah_pendapatan])
     ws.append([])
 
     # ========== BEBAN ==========
     ws.append(["Beban"])
-    ws.append(["Jenis", "Jumlah"])
-    ws["A11"].font = bold
-    ws["B11"].font = bold
+    ws.append(["Jenis", "Jumlah"], bold=2)
 
-    ws.append(["Harga Pokok Penjualan (HPP)", data["hpp_total"]])
+    ws.append(["Harga Pokok Penjualan (HPP)", result.hpp_total])
 
     # Beban usaha & lainnya
-    for item in data["beban_usaha_items"]:
+    for item in result.beban_usaha_items:
         ws.append([item.name, item.total])
-    ws.append(["Total Beban Usaha", data["total_beban_usaha"]])
+    ws.append(["Total Beban Usaha", result.total_beban_usaha])
 
-    for item in data["beban_lain_items"]:
+    for item in result.beban_lain_items:
         ws.append([item.name, item.total])
-    ws.append(["Total Beban Lain", data["total_beban_lain"]])
+    ws.append(["Total Beban Lain", result.total_beban_lain])
 
-    ws.append(["Jumlah Beban", data["jumlah_beban"]])
+    ws.append(["Jumlah Beban", result.jumlah_beban])
     ws.append([])
 
     # ========== LABA ==========
-    ws.append(["Laba/Rugi Sebelum Pajak", data["laba_sebelum_pajak"]])
-    ws.append(["Beban Pajak Penghasilan", data["pajak_penghasilan"]])
-    ws.append(["Laba/Rugi Setelah Pajak", data["laba_setelah_pajak"]])
+    ws.append(["Laba/Rugi Sebelum Pajak", result.laba_sebelum_pajak])
+    ws.append(["Beban Pajak Penghasilan", result.pajak_penghasilan])
+    ws.append(["Laba/Rugi Setelah Pajak", result.laba_setelah_pajak])
     ws.append([])
 
     # ========== HPP PER PRODUK ==========
     ws.append(["Detail HPP Per Produk"])
-    ws.append(["Produk", "HPP / Unit", "HPP Total"])
-    
-    header_row = ws.max_row
-    for col in range(1, 4):
-        ws.cell(row=header_row, column=col).font = bold
+    ws.append(["Produk", "HPP / Unit", "HPP Total"], bold=3)
 
-    for item in data["hpp_per_product"]:
+    for item in result.hpp_per_product:
         ws.append([
-            item.get("product_name"),
-            item.get("hpp_per_unit", 0),
-            item.get("hpp", 0)
+            item.product_name,
+            item.hpp_per_unit,
+            item.hpp
         ])
-        
-    _auto_fit_columns(ws)
-    return wb
 
 
-def _generate_excel_manufaktur(wb, report, data):
+def _generate_excel_manufaktur(book, report, result):
     """
     Builds the Excel sheets for a "Manufaktur" report.
     This is the new function.
     """
     
-    ws_hpp = wb.active
-    ws_hpp.title = "Lap. HPP"
+    ws_hpp = book.sheet("Lap. HPP")
 
     ws_hpp.append([report.company_name])
     ws_hpp.append(["LAPORAN HARGA POKOK PRODUKSI"])
     ws_hpp.append([f"{report.month} {report.year}"])
     ws_hpp.append([])
 
-    ws_hpp.append(["Biaya Bahan Baku"])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
-    ws_hpp.append(["Persediaan bahan baku (awal)", data['total_bb_awal']])
-    ws_hpp.append(["Pembelian Bahan Baku", data['total_bb_pembelian']])
-    ws_hpp.append(["Persediaan Bahan Baku (akhir)", -data['total_bb_akhir']])
-    ws_hpp.append(["Total Biaya Bahan Baku", data['total_bbb']])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
+    ws_hpp.append(["Biaya Bahan Baku"], bold=1)
+    ws_hpp.append(["Persediaan bahan baku (awal)", result.total_bb_awal])
+    ws_hpp.append(["Pembelian Bahan Baku", result.total_bb_pembelian])
+    ws_hpp.append(["Persediaan Bahan Baku (akhir)", -result.total_bb_akhir])
+    ws_hpp.append(["Total Biaya Bahan Baku", result.total_bbb], bold=1)
     ws_hpp.append([])
     
-    ws_hpp.append(["Biaya Tenaga Kerja Langsung", data['total_btkl']])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
+    ws_hpp.append(["Biaya Tenaga Kerja Langsung", result.total_btkl], bold=1)
     ws_hpp.append([])
 
-    ws_hpp.append(["Biaya Overhead Pabrik"])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
-    for item in data['bop_items']:
+    ws_hpp.append(["Biaya Overhead Pabrik"], bold=1)
+    for item in result.bop_items:
         ws_hpp.append([item.nama_biaya, item.total])
-    ws_hpp.append(["Total Biaya Overhead Pabrik", data['total_bop']])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
+    ws_hpp.append(["Total Biaya Overhead Pabrik", result.total_bop], bold=1)
     ws_hpp.append([])
 
-    ws_hpp.append(["Total Biaya Produksi", data['total_biaya_produksi']])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
-    ws_hpp.append(["Persediaan BDP (Awal)", data['total_bdp_awal']])
-    ws_hpp.append(["Persediaan BDP (Akhir)", -data['total_bdp_akhir']])
-    ws_hpp.append(["Cost of Goods Manufactured (COGM)", data['cogm']])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).fill = total_fill
-    ws_hpp.cell(row=ws_hpp.max_row, column=2).fill = total_fill
+    ws_hpp.append(["Total Biaya Produksi", result.total_biaya_produksi], bold=1)
+    ws_hpp.append(["Persediaan BDP (Awal)", result.total_bdp_awal])
+    ws_hpp.append(["Persediaan BDP (Akhir)", -result.total_bdp_akhir])
+    ws_hpp.append(["Cost of Goods Manufactured (COGM)", result.cogm], bold=1, filled=2)
     ws_hpp.append([])
     
-    ws_hpp.append(["Persediaan Barang Jadi (Awal)", data['total_bj_awal']])
-    ws_hpp.append(["Barang Siap untuk Dijual", data['barang_siap_dijual']])
-    ws_hpp.append(["Persediaan Barang Jadi (Akhir)", -data['total_bj_akhir']])
-    ws_hpp.append(["Harga Pokok Penjualan (HPP)", data['hpp_total']])
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).font = bold
-    ws_hpp.cell(row=ws_hpp.max_row, column=1).fill = total_fill
-    ws_hpp.cell(row=ws_hpp.max_row, column=2).fill = total_fill
+    ws_hpp.append(["Persediaan Barang Jadi (Awal)", result.total_bj_awal])
+    ws_hpp.append(["Barang Siap untuk Dijual", result.barang_siap_dijual])
+    ws_hpp.append(["Persediaan Barang Jadi (Akhir)", -result.total_bj_akhir])
+    ws_hpp.append(["Harga Pokok Penjualan (HPP)", result.hpp_total], bold=1, filled=2)
     ws_hpp.append([])
 
-    _auto_fit_columns(ws_hpp)
-
-    ws_lr = wb.create_sheet(title="Lap. Laba Rugi")
+    ws_lr = book.sheet("Lap. Laba Rugi")
     
     ws_lr.append([report.company_name])
     ws_lr.append(["LAPORAN LABA RUGI (MANUFAKTUR)"])
     ws_lr.append([f"{report.month} {report.year}"])
     ws_lr.append([])
     
-    ws_lr.append(["Pendapatan"])
-    ws_lr.cell(row=ws_lr.max_row, column=1).font = bold
-    ws_lr.append(["Pendapatan Usaha", data['total_pendapatan_usaha']])
-    ws_lr.append(["Pendapatan Lain-lain", data['total_pendapatan_lain']])
-    ws_lr.append(["Jumlah Pendapatan", data['jumlah_pendapatan']])
-    ws_lr.cell(row=ws_lr.max_row, column=1).font = bold
+    ws_lr.append(["Pendapatan"], bold=1)
+    ws_lr.append(["Pendapatan Usaha", result.total_pendapatan_usaha])
+    ws_lr.append(["Pendapatan Lain-lain", result.total_pendapatan_lain])
+    ws_lr.append(["Jumlah Pendapatan", result.jumlah_pendapatan], bold=1)
     ws_lr.append([])
     
-    ws_lr.append(["Beban"])
-    ws_lr.cell(row=ws_lr.max_row, column=1).font = bold
-    ws_lr.append(["Harga Pokok Penjualan (HPP)", data['hpp_total']])
-    for item in data['beban_usaha_items']:
+    ws_lr.append(["Beban"], bold=1)
+    ws_lr.append(["Harga Pokok Penjualan (HPP)", result.hpp_total])
+    for item in result.beban_usaha_items:
         ws_lr.append([item.name, item.total])
-    ws_lr.append(["Total Beban Usaha Lainnya", data['total_beban_usaha_lainnya']])
-    for item in data['beban_lain_items']:
+    ws_lr.append(["Total Beban Usaha Lainnya", result.total_beban_usaha_lainnya])
+    for item in result.beban_lain_items:
         ws_lr.append([item.name, item.total])
-    ws_lr.append(["Total Beban Lain-lain", data['total_beban_lain']])
-    ws_lr.append(["Jumlah Beban", data['jumlah_beban']])
-    ws_lr.cell(row=ws_lr.max_row, column=1).font = bold
+    ws_lr.append(["Total Beban Lain-lain", result.total_beban_lain])
+    ws_lr.append(["Jumlah Beban", result.jumlah_beban], bold=1)
     ws_lr.append([])
     
-    ws_lr.append(["Laba/Rugi Sebelum Pajak", data['laba_sebelum_pajak']])
-    ws_lr.append(["Beban Pajak Penghasilan", data['pajak_penghasilan']])
-    ws_lr.append(["Laba/Rugi Setelah Pajak", data['laba_setelah_pajak']])
-    ws_lr.cell(row=ws_lr.max_row, column=1).font = bold
-    ws_lr.cell(row=ws_lr.max_row, column=1).fill = total_fill
-    ws_lr.cell(row=ws_lr.max_row, column=2).fill = total_fill
-    
-    _auto_fit_columns(ws_lr)
-    
-    return wb
+    ws_lr.append(["Laba/Rugi Sebelum Pajak", result.laba_sebelum_pajak])
+    ws_lr.append(["Beban Pajak Penghasilan", result.pajak_penghasilan])
+    ws_lr.append(["Laba/Rugi Setelah Pajak", result.laba_setelah_pajak], bold=1, filled=2)
 
 
-def generate_excel_file(report):
-    
-    wb = Workbook()
+def _generate_detail_sheets(book, report):
+    """One sheet per line-item table, read in chunks straight off the database cursor."""
+    business_type = report.business_type if report.business_type == 'manufaktur' else 'dagang'
+    for title, model, sheet_business_type, columns in DETAIL_SHEETS:
+        if sheet_business_type not in (None, business_type):
+            continue
+        rows = (
+            model.objects.filter(report=report)
+            .order_by("id")
+            .values_list(*(field for _header, field, _width in columns))
+            .iterator(chunk_size=DETAIL_CHUNK_SIZE)
+        )
+        book.stream_sheet(title, [(header, width) for header, _field, width in columns], rows)
+
+
+def excel_filename(report, detail=False):
+    suffix = "_Detail" if detail else ""
+    if report.business_type == 'manufaktur':
+        return f"Laporan_Manufaktur_{report.company_name}_{report.month}_{report.year}{suffix}.xlsx"
+    return f"Laporan_Dagang_{report.company_name}_{report.month}_{report.year}{suffix}.xlsx"
+
+
+def write_excel_file(report, output, result=None, detail=False):
+    """
+    Write the report's workbook into ``output`` (a path or a binary file
+    object) and return its download filename. ``detail`` appends a sheet
+    per line-item table after the laporan sheets.
+    """
+    if result is None:
+        result = get_report_result(report)
 
     if report.business_type == 'manufaktur':
-        data = get_manufaktur_report_context(report)
-        wb = _generate_excel_manufaktur(wb, report, data)
-        filename = f"Laporan_Manufaktur_{report.company_name}_{report.month}_{report.year}.xlsx"
+        layout = _generate_excel_manufaktur
     else:
         # Default to Dagang
-        data = generate_final_report_data(report)
-        wb = _generate_excel_dagang(wb, report, data)
-        filename = f"Laporan_Dagang_{report.company_name}_{report.month}_{report.year}.xlsx"
+        layout = _generate_excel_dagang
 
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+    widths = _ColumnWidths()
+    layout(widths, report, result)
+    book = _ExcelBook(widths.sheets)
+    layout(book, report, result)
+    if detail:
+        _generate_detail_sheets(book, report)
+    book.save(output)
+    return excel_filename(report, detail)
 
-    return buffer.getvalue(), filename
\ No newline at end of file
+
+def generate_excel_file(report, result=None, detail=False):
+    """The whole workbook as bytes, with its filename."""
+    buffer = BytesIO()
+    filename = write_excel_file(report, buffer, result, detail)
+    return buffer.getvalue(), filename
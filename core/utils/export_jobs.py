@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.urls import reverse
+from django.utils import timezone
+from core.models import ExportJob, FinancialReport
+from core.utils.artifact_store import export_filename, get_or_render_artifact
+from core.utils.report_cache import get_report_result
+
+EXPORT_KINDS = {kind for kind, _label in ExportJob.KIND_CHOICES}
+
+
+def enqueue_export(report, user, kind):
+    """
+    Queue an export of the report's current version, or return the job that
+    already covers it (queued, running, or done with its file still stored).
+    """
+    existing = (
+        ExportJob.objects.filter(report=report, kind=kind, report_version=report.version)
+        .exclude(status=ExportJob.STATUS_FAILED)
+        .order_by("-created_at", "-id")
+        .first()
+    )
+    if existing is not None and (existing.status != ExportJob.STATUS_DONE or existing.file):
+        return existing
+    return ExportJob.objects.create(user=user, report=report, kind=kind, report_version=report.version)
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it, or None when the queue is empty."""
+    candidates = ExportJob.objects.filter(status=ExportJob.STATUS_QUEUED).order_by("created_at", "id")
+    for job_id in candidates.values_list("id", flat=True)[:10]:
+        # Conditional UPDATE so two workers can never claim the same job
+        claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.STATUS_QUEUED).update(
+            status=ExportJob.STATUS_RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return ExportJob.objects.select_related("report").get(id=job_id)
+    return None
+
+
+def render_export(report, kind):
+    """The export's content as a django File, and its download filename."""
+    result = get_report_result(report)
+    # Shares the artifact store with the direct export views
+    path = get_or_render_artifact(
+        report, result, kind, wait_timeout=getattr(settings, "PDF_RENDER_TIMEOUT", 60)
+    )
+    return File(open(path, "rb")), export_filename(report, kind)
+
+
+def run_export_job(job):
+    """Render a claimed job and store its file; failures are recorded on the job."""
+    try:
+        report = FinancialReport.objects.get(pk=job.report_id)
+        content, filename = render_export(report, job.kind)
+        with content:
+            job.file.save(filename, content, save=False)
+        job.filename = filename
+        job.report_version = report.version
+        job.status = ExportJob.STATUS_DONE
+    except Exception as e:
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def process_next_job():
+    job = claim_next_job()
+    if job is not None:
+        run_export_job(job)
+    return job
+
+
+def requeue_stale_jobs(stale_after=None):
+    """Put jobs whose worker died mid-render back in the queue."""
+    if stale_after is None:
+        stale_after = getattr(settings, "EXPORT_JOB_STALE_AFTER", 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING, started_at__lt=cutoff).update(
+        status=ExportJob.STATUS_QUEUED, started_at=None
+    )
+
+
+def purge_finished_jobs(ttl=None):
+    """Delete finished jobs (and, through the post_delete signal, their files) older than ``ttl`` seconds."""
+    if ttl is None:
+        ttl = getattr(settings, "EXPORT_JOB_TTL", 86400)
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    deleted, _per_model = ExportJob.objects.filter(
+        status__in=[ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def export_job_payload(job):
+    """What the status endpoint returns and the export menu polls."""
+    payload = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "status_url": reverse("core:export_job_status", args=[job.id]),
+    }
+    if job.status == ExportJob.STATUS_DONE:
+        payload["download_url"] = reverse("core:export_job_download", args=[job.id])
+        payload["filename"] = job.filename
+    elif job.status == ExportJob.STATUS_FAILED:
+        payload["error"] = job.error
+    return payload
@@ -1,52 +1,61 @@
-from django.db.models import Sum
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from django.db.models import BigIntegerField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from core.models import (
-    Product, HppEntry, RevenueItem, ExpenseItem,
+    FinancialReport, RevenueItem, ExpenseItem, ReportSummary,
     HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
     HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods
 )
-from core.utils.hpp_calculator import calculate_hpp_for_product
+from core.utils.hpp_calculator import calculate_hpp_batch
 
-def generate_final_report_data(report):
-    """
-    Generate the full final report data for laporan.html and Excel export.
-    Includes Pendapatan, HPP, Beban, Laba/Rugi, and HPP per produk.
-    """
 
-    # PENDAPATAN (Revenue)
-    total_pendapatan_usaha = (
-        report.revenue_items.filter(revenue_type="usaha").aggregate(Sum("total"))["total__sum"] or 0
+def _sum_total(queryset):
+    """Correlated SUM(total) of a child queryset, scoped to the outer report."""
+    subquery = (
+        queryset.filter(report=OuterRef("pk"))
+        .order_by()
+        .values("report")
+        .annotate(s=Sum("total"))
+        .values("s")
     )
-    total_pendapatan_lain = (
-        report.revenue_items.filter(revenue_type="lain").aggregate(Sum("total"))["total__sum"] or 0
+    return Coalesce(Subquery(subquery), 0, output_field=BigIntegerField())
+
+
+def load_report_totals(report, **columns):
+    """
+    Fetch several SUM(total) columns for one report in a single query.
+    Each keyword maps a result name to a (filtered) child queryset, e.g.
+    ``pendapatan_usaha=RevenueItem.objects.filter(revenue_type="usaha")``.
+    """
+    annotations = {name: _sum_total(qs) for name, qs in columns.items()}
+    return (
+        FinancialReport.objects
+        .filter(pk=report.pk)
+        .annotate(**annotations)
+        .values(*columns)
+        .get()
     )
-    jumlah_pendapatan = total_pendapatan_usaha + total_pendapatan_lain
 
-    # HPP (Harga Pokok Penjualan)
-    products = (
-        Product.objects
-        .filter(report=report, revenue_entries__revenue_type="usaha")
-        .prefetch_related("revenue_entries")
-        .distinct()
+
+def load_expense_items(report, order_by=("id",)):
+    """Beban line items of a report as plain ``{"name", "total"}`` dicts, split into usaha and lain."""
+    items = {"usaha": [], "lain": []}
+    rows = (
+        ExpenseItem.objects.filter(report=report)
+        .order_by(*order_by)
+        .values("expense_category", "name", "total")
     )
+    for row in rows:
+        items.setdefault(row.pop("expense_category"), []).append(row)
+    return items
 
-    entries_by_product = {}
-    for entry in HppEntry.objects.filter(report=report).select_related("product"):
-        pid = entry.product.id
-        if pid not in entries_by_product:
-            entries_by_product[pid] = {"PEMBELIAN": []}
-        if entry.category == "AWAL":
-            entries_by_product[pid]["AWAL"] = entry
-        elif entry.category == "AKHIR":
-            entries_by_product[pid]["AKHIR"] = entry
-        elif entry.category == "PEMBELIAN":
-            entries_by_product[pid]["PEMBELIAN"].append(entry)
 
+def compute_hpp_per_product(report):
+    """FIFO HPP rows for every product with pendapatan usaha, as shown on the laporan."""
     hpp_per_product = []
-    total_hpp = 0
 
-    for product in products:
-        product_entries = entries_by_product.get(product.id, {"AWAL": None, "PEMBELIAN": [], "AKHIR": None})
-        result = calculate_hpp_for_product(product, product_entries)
+    for product, result in calculate_hpp_batch(report):
 
         total_awal = result.get("total_awal", 0)
         total_pembelian_neto = result.get("total_pembelian_neto", 0)
@@ -61,8 +70,6 @@ def generate_final_report_data(report):
         hpp_total = total_awal + total_pembelian_neto - total_akhir
         hpp_per_unit = hpp_total / qty_terjual if qty_terjual > 0 else 0
 
-        total_hpp += hpp_total
-
         hpp_per_product.append({
             "product_name": product.name,
             "hpp_per_unit": hpp_per_unit,
@@ -75,6 +82,25 @@ def generate_final_report_data(report):
             "detail_akhir": {"qty": qty_akhir},
         })
 
+    return hpp_per_product
+
+
+def generate_final_report_data(report):
+    """
+    Generate the full final report data for laporan.html and Excel export.
+    Includes Pendapatan, HPP, Beban, Laba/Rugi, and HPP per produk.
+    """
+    from core.utils.report_summary import get_report_summary
+    summary = get_report_summary(report)
+
+    # PENDAPATAN (Revenue)
+    total_pendapatan_usaha = summary.pendapatan_usaha
+    total_pendapatan_lain = summary.pendapatan_lain
+    jumlah_pendapatan = total_pendapatan_usaha + total_pendapatan_lain
+
+    # HPP (Harga Pokok Penjualan)
+    hpp_per_product = compute_hpp_per_product(report)
+
     total_persediaan_awal = sum(p['total_awal'] for p in hpp_per_product)
     total_pembelian_neto = sum(p['total_pembelian_neto'] for p in hpp_per_product)
     total_persediaan_akhir = sum(p['total_akhir'] for p in hpp_per_product)
@@ -82,11 +108,12 @@ def generate_final_report_data(report):
     barang_siap_dijual = total_persediaan_awal + total_pembelian_neto
 
     # BEBAN (Expenses)
-    beban_usaha_items = report.expense_items.filter(expense_category="usaha")
-    beban_lain_items = report.expense_items.filter(expense_category="lain")
+    expense_items = load_expense_items(report)
+    beban_usaha_items = expense_items["usaha"]
+    beban_lain_items = expense_items["lain"]
 
-    total_beban_usaha = beban_usaha_items.aggregate(Sum("total"))["total__sum"] or 0
-    total_beban_lain = beban_lain_items.aggregate(Sum("total"))["total__sum"] or 0
+    total_beban_usaha = summary.beban_usaha
+    total_beban_lain = summary.beban_lain
     jumlah_beban = total_hpp + total_beban_usaha + total_beban_lain
 
     # LABA / RUGI
@@ -122,49 +149,105 @@ def generate_final_report_data(report):
     }
 
 
+@dataclass(frozen=True)
+class ManufakturTotals:
+    """Every SUM(total) the manufaktur laporan needs."""
+    bb_awal: int = 0
+    bb_pembelian: int = 0
+    bb_akhir: int = 0
+    btkl: int = 0
+    bop: int = 0
+    bdp_awal: int = 0
+    bdp_akhir: int = 0
+    bj_awal: int = 0
+    bj_akhir: int = 0
+    pendapatan_usaha: int = 0
+    pendapatan_lain: int = 0
+    beban_usaha: int = 0
+    beban_lain: int = 0
+
+    @classmethod
+    def from_summary(cls, summary):
+        """The same totals as maintained on the report's ReportSummary row."""
+        return cls(**{field.name: getattr(summary, field.name) for field in fields(cls)})
+
+
+def load_manufaktur_totals(report):
+    """Load every COGM/COGS component and laba rugi total from the line items with one query."""
+    return ManufakturTotals(**load_report_totals(
+        report,
+        bb_awal=HppManufactureMaterial.objects.filter(type="BB_AWAL"),
+        bb_pembelian=HppManufactureMaterial.objects.filter(type="BB_PEMBELIAN"),
+        bb_akhir=HppManufactureMaterial.objects.filter(type="BB_AKHIR"),
+        btkl=HppManufactureLabor.objects.all(),
+        bop=HppManufactureOverhead.objects.all(),
+        bdp_awal=HppManufactureWIP.objects.filter(type="WIP_AWAL"),
+        bdp_akhir=HppManufactureWIP.objects.filter(type="WIP_AKHIR"),
+        bj_awal=HppManufactureFinishedGoods.objects.filter(type="FG_AWAL"),
+        bj_akhir=HppManufactureFinishedGoods.objects.filter(type="FG_AKHIR"),
+        pendapatan_usaha=RevenueItem.objects.filter(revenue_type="usaha"),
+        pendapatan_lain=RevenueItem.objects.filter(revenue_type="lain"),
+        beban_usaha=ExpenseItem.objects.filter(expense_category="usaha"),
+        beban_lain=ExpenseItem.objects.filter(expense_category="lain"),
+    ))
+
+
 def get_manufaktur_report_context(report):
     """
     Helper function to calculate all final report data for Manufaktur.
     This is used by the web view, PDF export, and Excel export.
     """
-    
+    # The summary row holds the same totals, kept current by the signals; reports from
+    # before it get them from the line items in one query until their next write builds it
+    summary = ReportSummary.objects.filter(report=report).first()
+    totals = ManufakturTotals.from_summary(summary) if summary else load_manufaktur_totals(report)
+
     # --- 1. CALCULATE HARGA POKOK PRODUKSI (COGM) ---
-    total_bb_awal = HppManufactureMaterial.objects.filter(report=report, type="BB_AWAL").aggregate(Sum('total'))['total__sum'] or 0
-    total_bb_pembelian = HppManufactureMaterial.objects.filter(report=report, type="BB_PEMBELIAN").aggregate(Sum('total'))['total__sum'] or 0
-    total_bb_akhir = HppManufactureMaterial.objects.filter(report=report, type="BB_AKHIR").aggregate(Sum('total'))['total__sum'] or 0
+    total_bb_awal = totals.bb_awal
+    total_bb_pembelian = totals.bb_pembelian
+    total_bb_akhir = totals.bb_akhir
     total_bbb = total_bb_awal + total_bb_pembelian - total_bb_akhir
     
-    total_btkl = HppManufactureLabor.objects.filter(report=report).aggregate(Sum('total'))['total__sum'] or 0
+    total_btkl = totals.btkl
     
-    bop_items = HppManufactureOverhead.objects.filter(report=report).order_by('nama_biaya')
-    total_bop = bop_items.aggregate(Sum('total'))['total__sum'] or 0
+    bop_items = list(
+        HppManufactureOverhead.objects.filter(report=report)
+        .order_by('nama_biaya', 'id')
+        .values('nama_biaya', 'total')
+    )
+    total_bop = totals.bop
     
     total_biaya_produksi = total_bbb + total_btkl + total_bop
     
-    total_bdp_awal = HppManufactureWIP.objects.filter(report=report, type="WIP_AWAL").aggregate(Sum('total'))['total__sum'] or 0
-    total_bdp_akhir = HppManufactureWIP.objects.filter(report=report, type="WIP_AKHIR").aggregate(Sum('total'))['total__sum'] or 0
+    total_bdp_awal = totals.bdp_awal
+    total_bdp_akhir = totals.bdp_akhir
     
     cogm = total_biaya_produksi + total_bdp_awal - total_bdp_akhir
 
     # --- 2. CALCULATE HARGA POKOK PENJUALAN (HPP / COGS) ---
-    total_bj_awal = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AWAL").aggregate(Sum('total'))['total__sum'] or 0
-    total_bj_akhir = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AKHIR").aggregate(Sum('total'))['total__sum'] or 0
+    total_bj_awal = totals.bj_awal
+    total_bj_akhir = totals.bj_akhir
     
     barang_siap_dijual = cogm + total_bj_awal
     total_hpp = barang_siap_dijual - total_bj_akhir
     
-    hpp_per_product = HppManufactureProduction.objects.filter(report=report).order_by('product__name')
+    hpp_per_product = list(
+        HppManufactureProduction.objects.filter(report=report)
+        .order_by('product__name')
+        .values('qty_diproduksi', 'total_produksi', 'hpp_per_unit', product_name=F('product__name'))
+    )
     
     # --- 3. CALCULATE LABA RUGI ---
-    total_pendapatan_usaha = RevenueItem.objects.filter(report=report, revenue_type='usaha').aggregate(Sum('total'))['total__sum'] or 0
-    total_pendapatan_lain = RevenueItem.objects.filter(report=report, revenue_type='lain').aggregate(Sum('total'))['total__sum'] or 0
+    total_pendapatan_usaha = totals.pendapatan_usaha
+    total_pendapatan_lain = totals.pendapatan_lain
     jumlah_pendapatan = total_pendapatan_usaha + total_pendapatan_lain
     
-    beban_usaha_items = ExpenseItem.objects.filter(report=report, expense_category='usaha').order_by('name')
-    total_beban_usaha_lainnya = beban_usaha_items.aggregate(Sum('total'))['total__sum'] or 0
+    expense_items = load_expense_items(report, order_by=('name', 'id'))
+    beban_usaha_items = expense_items['usaha']
+    total_beban_usaha_lainnya = totals.beban_usaha
     
-    beban_lain_items = ExpenseItem.objects.filter(report=report, expense_category='lain').order_by('name')
-    total_beban_lain = beban_lain_items.aggregate(Sum('total'))['total__sum'] or 0
+    beban_lain_items = expense_items['lain']
+    total_beban_lain = totals.beban_lain
     
     jumlah_beban = total_hpp + total_beban_usaha_lainnya + total_beban_lain
     
@@ -208,4 +291,153 @@ def get_manufaktur_report_context(report):
         'pajak_penghasilan': pajak_penghasilan,
         'laba_setelah_pajak': laba_setelah_pajak,
     }
-    return context
\ No newline at end of file
+    return context
+
+
+# --- Materialized results consumed by the laporan page, PDF and Excel ---
+
+@dataclass(frozen=True, slots=True)
+class ExpenseLine:
+    name: str
+    total: int
+
+
+@dataclass(frozen=True, slots=True)
+class BopLine:
+    nama_biaya: str
+    total: int
+
+
+@dataclass(frozen=True, slots=True)
+class HppProductLine:
+    """One row of the dagang HPP per produk table."""
+    product_name: str
+    hpp_per_unit: float
+    hpp: int
+    total_awal: int
+    total_pembelian_neto: int
+    total_akhir: int
+    qty_awal: int
+    qty_pembelian: int
+    qty_akhir: int
+
+
+@dataclass(frozen=True, slots=True)
+class ProductionLine:
+    """One barang diproduksi row of the manufaktur laporan."""
+    product_name: str
+    qty_diproduksi: int
+    total_produksi: int
+    hpp_per_unit: Decimal
+
+
+def _as_context(result):
+    return {field.name: getattr(result, field.name) for field in fields(result)}
+
+
+@dataclass(frozen=True, slots=True)
+class DagangReportResult:
+    """Everything the dagang laporan shows, fully loaded; rendering it runs no queries."""
+    total_pendapatan_usaha: int
+    total_pendapatan_lain: int
+    jumlah_pendapatan: int
+    hpp_total: int
+    hpp_per_product: tuple
+    total_persediaan_awal: int
+    total_pembelian_neto: int
+    barang_siap_dijual: int
+    total_persediaan_akhir: int
+    beban_usaha_items: tuple
+    beban_lain_items: tuple
+    total_beban_usaha: int
+    total_beban_lain: int
+    jumlah_beban: int
+    laba_sebelum_pajak: int
+    pajak_penghasilan: float
+    laba_setelah_pajak: float
+
+    def as_context(self):
+        """Template context with the same names generate_final_report_data uses."""
+        return _as_context(self)
+
+
+@dataclass(frozen=True, slots=True)
+class ManufakturReportResult:
+    """Everything the manufaktur laporan shows, fully loaded; rendering it runs no queries."""
+    total_bb_awal: int
+    total_bb_pembelian: int
+    total_bb_akhir: int
+    total_bbb: int
+    total_btkl: int
+    bop_items: tuple
+    total_bop: int
+    total_biaya_produksi: int
+    total_bdp_awal: int
+    total_bdp_akhir: int
+    cogm: int
+    total_bj_awal: int
+    total_bj_akhir: int
+    barang_siap_dijual: int
+    total_hpp: int
+    hpp_per_product: tuple
+    total_pendapatan_usaha: int
+    total_pendapatan_lain: int
+    jumlah_pendapatan: int
+    beban_usaha_items: tuple
+    total_beban_usaha_lainnya: int
+    beban_lain_items: tuple
+    total_beban_lain: int
+    jumlah_beban: int
+    laba_sebelum_pajak: int
+    pajak_penghasilan: float
+    laba_setelah_pajak: float
+
+    @property
+    def hpp_total(self):
+        return self.total_hpp
+
+    def as_context(self):
+        """Template context with the same names get_manufaktur_report_context uses."""
+        return {**_as_context(self), "hpp_total": self.total_hpp}
+
+
+def build_dagang_result(report):
+    data = generate_final_report_data(report)
+    return DagangReportResult(**{
+        **data,
+        "hpp_per_product": tuple(
+            HppProductLine(
+                product_name=p["product_name"],
+                hpp_per_unit=p["hpp_per_unit"],
+                hpp=p["hpp"],
+                total_awal=p["total_awal"],
+                total_pembelian_neto=p["total_pembelian_neto"],
+                total_akhir=p["total_akhir"],
+                qty_awal=p["detail_awal"]["qty"],
+                qty_pembelian=p["detail_pembelian"]["qty"],
+                qty_akhir=p["detail_akhir"]["qty"],
+            )
+            for p in data["hpp_per_product"]
+        ),
+        "beban_usaha_items": tuple(ExpenseLine(**item) for item in data["beban_usaha_items"]),
+        "beban_lain_items": tuple(ExpenseLine(**item) for item in data["beban_lain_items"]),
+    })
+
+
+def build_manufaktur_result(report):
+    context = get_manufaktur_report_context(report)
+    del context["report"], context["hpp_total"]
+    return ManufakturReportResult(**{
+        **context,
+        "bop_items": tuple(BopLine(**item) for item in context["bop_items"]),
+        "hpp_per_product": tuple(ProductionLine(**item) for item in context["hpp_per_product"]),
+        "beban_usaha_items": tuple(ExpenseLine(**item) for item in context["beban_usaha_items"]),
+        "beban_lain_items": tuple(ExpenseLine(**item) for item in context["beban_lain_items"]),
+    })
+
+
+def build_report_result(report):
+    """The ReportResult matching the report's business type."""
+    if report.business_type == 'manufaktur':
+        return build_manufaktur_result(report)
+    return build_dagang_result(report)
@@ -1,110 +1,241 @@
 from decimal import Decimal
+from operator import add, mul, sub
+from types import SimpleNamespace
 from django.db import transaction
-from core.models import HppManufactureProduction, Product
+from django.db.models import Exists, OuterRef, Sum
+from core.models import (
+    HppEntry, HppManufactureFinishedGoods, HppManufactureOverhead, HppManufactureProduction, HppManufactureWIP,
+    Product, RevenueItem,
+)
+from core.utils.completion import FLAG_HPP_DAGANG, FLAG_PRODUKSI, set_completion_flags
+from core.utils.stock_ledger import rebuild_stock_ledger
+
+HPP_CATEGORIES = ("AWAL", "PEMBELIAN", "AKHIR")
+
+# Per-product integer columns used by calculate_hpp_columns
+HPP_COLUMNS = (
+    "qty_awal", "harga_awal", "pembelian_neto", "qty_pembelian_net", "qty_akhir",
+    "has_awal", "has_pembelian", "has_akhir",
+)
+VALIDATION_ERROR_AKHIR = "Periksa Kembali Catatan Penjualan/Persediaan Akhir."
+
+
+def _fifo_hpp(qty_terjual, qty_awal, harga_awal, total_awal, neto, qty_net):
+    """
+    FIFO HPP of one product: stok awal first, the rest at the averaged new
+    purchase price (neto / qty_net). Returns an int, or a Decimal when that
+    price is fractional so the 28-digit rounding the laporan always used is kept.
+    """
+    if qty_terjual <= qty_awal:
+        # Penjualan sedikit, hanya mengambil dari stok awal
+        return qty_terjual * harga_awal
+    if qty_net <= 0:
+        return total_awal
+    if neto % qty_net == 0:
+        return total_awal + (qty_terjual - qty_awal) * (neto // qty_net)
+    return Decimal(total_awal) + Decimal(qty_terjual - qty_awal) * (Decimal(neto) / Decimal(qty_net))
+
+
+def _per_unit(hpp, qty_terjual):
+    if qty_terjual <= 0:
+        return 0.0
+    if isinstance(hpp, int) and hpp % qty_terjual == 0:
+        return float(hpp // qty_terjual)
+    return float(Decimal(hpp) / Decimal(qty_terjual))
+
 
 def calculate_hpp_for_product(product, entries):
     awal = entries.get('AWAL')
     pembelian_list = entries.get('PEMBELIAN')
     akhir = entries.get('AKHIR')
 
+    # Semua kolom berupa integer; hanya pembagian (_fifo_hpp, _per_unit) yang memakai Decimal
+
     # 1. Hitung Data Awal
-    qty_awal = Decimal(awal.quantity if awal else 0)
-    harga_awal = Decimal(awal.harga_satuan if awal else 0)
+    qty_awal = awal.quantity if awal else 0
+    harga_awal = awal.harga_satuan if awal else 0
     total_awal = qty_awal * harga_awal
 
     # 2. Hitung Data Pembelian (Neto)
-    total_pembelian_neto = Decimal(0)
-    total_pembelian_qty_net = Decimal(0) 
+    total_pembelian_neto = 0
+    total_pembelian_qty_net = 0
 
     for p in pembelian_list:
-        qty_beli = Decimal(p.quantity)
-        harga_beli = Decimal(p.harga_satuan)
-        retur_qty = Decimal(p.retur_qty)
-        diskon = Decimal(p.diskon)
-        ongkir = Decimal(p.ongkir)
-        
         # Hitung retur dalam rupiah
-        nilai_retur_rp = retur_qty * harga_beli
-        
-        pembelian_bruto = qty_beli * harga_beli
-        total_pembelian_item = pembelian_bruto - diskon - nilai_retur_rp + ongkir
+        nilai_retur_rp = p.retur_qty * p.harga_satuan
 
-        total_pembelian_neto += total_pembelian_item
-        total_pembelian_qty_net += (qty_beli - retur_qty)
+        pembelian_bruto = p.quantity * p.harga_satuan
+        total_pembelian_neto += pembelian_bruto - p.diskon - nilai_retur_rp + p.ongkir
+        total_pembelian_qty_net += p.quantity - p.retur_qty
 
     # 3. Variabel Dasar (A)
     total_nilai_tersedia = total_awal + total_pembelian_neto
     total_qty_tersedia = qty_awal + total_pembelian_qty_net
 
-    # Hitung Harga Beli Baru per Unit (untuk perhitungan C - FIFO)
-    if total_pembelian_qty_net > 0:
-        harga_beli_baru_per_unit = total_pembelian_neto / total_pembelian_qty_net
-    else:
-        harga_beli_baru_per_unit = Decimal(0)
-
     # 4. Tentukan Jumlah Terjual & Validasi Stok Akhir
-    qty_akhir = Decimal(akhir.quantity if akhir else 0)
-    
+    qty_akhir = akhir.quantity if akhir else 0
+
     if qty_akhir > total_qty_tersedia:
         qty_akhir = total_qty_tersedia # Cap agar tidak minus
-        validation_error_akhir = "Periksa Kembali Catatan Penjualan/Persediaan Akhir."
+        validation_error_akhir = VALIDATION_ERROR_AKHIR
     else:
         validation_error_akhir = None
 
     qty_terjual = total_qty_tersedia - qty_akhir
 
     # 5. Hitung HPP menggunakan Logika FIFO (First-In, First-Out)
-    hpp_total = Decimal(0)
-
-    if qty_terjual > qty_awal:
-        # KASUS 1: Penjualan menghabiskan stok awal & mengambil stok baru
-        # B = Stok Awal terjual semua
-        biaya_stok_awal = total_awal 
-        
-        # C = Sisa penjualan diambil dari harga pembelian baru
-        qty_sisa_jual = qty_terjual - qty_awal
-        biaya_stok_baru = qty_sisa_jual * harga_beli_baru_per_unit
-        
-        hpp_total = biaya_stok_awal + biaya_stok_baru
-    else:
-        # KASUS 2: Penjualan sedikit, hanya mengambil dari stok awal
-        hpp_total = qty_terjual * harga_awal
+    hpp_total = _fifo_hpp(
+        qty_terjual, qty_awal, harga_awal, total_awal, total_pembelian_neto, total_pembelian_qty_net
+    )
 
     # 6. Hitung Nilai Akhir (A - HPP)
     total_akhir = total_nilai_tersedia - hpp_total
 
-    # HPP per unit (Statistik)
-    if qty_terjual > 0:
-        hpp_per_unit = hpp_total / qty_terjual
-    else:
-        hpp_per_unit = 0
-
     return {
-        "total_awal": int(total_awal),
-        "total_pembelian_neto": int(total_pembelian_neto),
-        "barang_tersedia": int(total_nilai_tersedia),
+        "total_awal": total_awal,
+        "total_pembelian_neto": total_pembelian_neto,
+        "barang_tersedia": total_nilai_tersedia,
         "total_akhir": int(total_akhir),
         "hpp": int(hpp_total),
-        "hpp_per_unit": float(hpp_per_unit),
+        # HPP per unit (Statistik)
+        "hpp_per_unit": _per_unit(hpp_total, qty_terjual),
 
         "detail_awal": {
-            "qty": int(qty_awal),
-            "harga_satuan": int(harga_awal)
+            "qty": qty_awal,
+            "harga_satuan": harga_awal
         } if awal else None,
 
         "detail_pembelian": {
-            "qty": int(total_pembelian_qty_net),
+            "qty": total_pembelian_qty_net,
         } if pembelian_list else None,
 
         "detail_akhir": {
-            "qty": int(qty_akhir),
+            "qty": qty_akhir,
         } if akhir else None,
 
-        "qty_terjual": int(qty_terjual),
+        "qty_terjual": qty_terjual,
         "validation_error_akhir": validation_error_akhir,
     }
 
 
+def hpp_columns(product_entries):
+    """
+    Flatten ``(product, entries)`` pairs, in the shape calculate_hpp_for_product
+    takes, into the integer columns calculate_hpp_columns works on.
+    """
+    columns = {name: [] for name in HPP_COLUMNS}
+    for _product, entries in product_entries:
+        awal = entries.get("AWAL")
+        akhir = entries.get("AKHIR")
+        pembelian_list = entries.get("PEMBELIAN") or []
+        columns["qty_awal"].append(awal.quantity if awal else 0)
+        columns["harga_awal"].append(awal.harga_satuan if awal else 0)
+        columns["pembelian_neto"].append(sum(
+            p.quantity * p.harga_satuan - p.diskon - p.retur_qty * p.harga_satuan + p.ongkir
+            for p in pembelian_list
+        ))
+        columns["qty_pembelian_net"].append(sum(p.quantity - p.retur_qty for p in pembelian_list))
+        columns["qty_akhir"].append(akhir.quantity if akhir else 0)
+        columns["has_awal"].append(awal is not None)
+        columns["has_pembelian"].append(bool(pembelian_list))
+        columns["has_akhir"].append(akhir is not None)
+    return columns
+
+
+def load_hpp_columns(report, product_ids=None):
+    """
+    Load every product with pendapatan usaha (or those of them in
+    ``product_ids``) and its AWAL/PEMBELIAN/AKHIR entries in one LEFT JOIN
+    query, straight into integer columns.
+    Returns ``(products, columns)``; products are (id, name) namespaces in name order.
+    """
+    products = Product.objects.filter(report=report)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    rows = (
+        products
+        .filter(Exists(RevenueItem.objects.filter(product=OuterRef("pk"), revenue_type="usaha")))
+        .order_by("name", "id")
+        .values_list(
+            "id", "name", "hpp_entries__category", "hpp_entries__quantity", "hpp_entries__harga_satuan",
+            "hpp_entries__diskon", "hpp_entries__retur_qty", "hpp_entries__ongkir",
+        )
+    )
+
+    products = []
+    columns = {name: [] for name in HPP_COLUMNS}
+    qty_awal, harga_awal = columns["qty_awal"], columns["harga_awal"]
+    neto, qty_net, qty_akhir = columns["pembelian_neto"], columns["qty_pembelian_net"], columns["qty_akhir"]
+    has_awal, has_pembelian, has_akhir = columns["has_awal"], columns["has_pembelian"], columns["has_akhir"]
+
+    last_id = None
+    for pid, name, category, quantity, harga, diskon, retur_qty, ongkir in rows:
+        if pid != last_id:
+            last_id = pid
+            products.append(SimpleNamespace(id=pid, name=name))
+            for column in columns.values():
+                column.append(0)
+        if category == "AWAL":
+            qty_awal[-1], harga_awal[-1], has_awal[-1] = quantity, harga, True
+        elif category == "PEMBELIAN":
+            neto[-1] += quantity * harga - diskon - retur_qty * harga + ongkir
+            qty_net[-1] += quantity - retur_qty
+            has_pembelian[-1] = True
+        elif category == "AKHIR":
+            qty_akhir[-1], has_akhir[-1] = quantity, True
+
+    for name in ("has_awal", "has_pembelian", "has_akhir"):
+        columns[name] = [bool(flag) for flag in columns[name]]
+    return products, columns
+
+
+def calculate_hpp_columns(columns):
+    """
+    Column-wise FIFO HPP over many products at once, with the same integer
+    arithmetic and division helpers as calculate_hpp_for_product; each result
+    is identical to the scalar one for the same product.
+    """
+    qty_awal = columns["qty_awal"]
+    harga_awal = columns["harga_awal"]
+    neto = columns["pembelian_neto"]
+    qty_net = columns["qty_pembelian_net"]
+    qty_akhir_input = columns["qty_akhir"]
+
+    total_awal = list(map(mul, qty_awal, harga_awal))
+    nilai_tersedia = list(map(add, total_awal, neto))
+    qty_tersedia = list(map(add, qty_awal, qty_net))
+    qty_akhir = list(map(min, qty_akhir_input, qty_tersedia))
+    qty_terjual = list(map(sub, qty_tersedia, qty_akhir))
+    hpp = list(map(_fifo_hpp, qty_terjual, qty_awal, harga_awal, total_awal, neto, qty_net))
+    hpp_per_unit = list(map(_per_unit, hpp, qty_terjual))
+
+    return [
+        {
+            "total_awal": total_awal[i],
+            "total_pembelian_neto": neto[i],
+            "barang_tersedia": nilai_tersedia[i],
+            "total_akhir": int(nilai_tersedia[i] - hpp[i]),
+            "hpp": int(hpp[i]),
+            "hpp_per_unit": hpp_per_unit[i],
+            "detail_awal": {"qty": qty_awal[i], "harga_satuan": harga_awal[i]} if columns["has_awal"][i] else None,
+            "detail_pembelian": {"qty": qty_net[i]} if columns["has_pembelian"][i] else None,
+            "detail_akhir": {"qty": qty_akhir[i]} if columns["has_akhir"][i] else None,
+            "qty_terjual": qty_terjual[i],
+            "validation_error_akhir": VALIDATION_ERROR_AKHIR if qty_akhir_input[i] > qty_tersedia[i] else None,
+        }
+        for i in range(len(qty_awal))
+    ]
+
+
+def calculate_hpp_batch(report, product_ids=None):
+    """
+    FIFO HPP for every product of a report with pendapatan usaha (or those of
+    them in ``product_ids``), as ``[(product, result)]`` in name order.
+    """
+    products, columns = load_hpp_columns(report, product_ids)
+    return list(zip(products, calculate_hpp_columns(columns)))
+
+
 # --- FUNGSI HELPER (INI YANG TADI HILANG) ---
 
 def to_int(val, default=0):
@@ -128,50 +259,281 @@ def to_number(x):
         except Exception:
             return Decimal(0)
 
-def save_barang_diproduksi(report, barang_diproduksi_list):
-    """
-    Save or update barang_diproduksi_list into HppManufactureProduction model.
-    Important: Respect manual override if an existing record already has a non-zero qty_diproduksi.
-    """
-    with transaction.atomic():
-        for row in barang_diproduksi_list:
-            product_obj = None
-            if row.get("product_id"):
-                product_obj = Product.objects.filter(id=row["product_id"], report=report).first()
-            if not product_obj:
-                product_obj = Product.objects.filter(name=row.get("product_name"), report=report).first()
-            if not product_obj:
-                continue
-
-            existing = HppManufactureProduction.objects.filter(report=report, product=product_obj).first()
-
-            if existing and (existing.qty_diproduksi is not None) and int(existing.qty_diproduksi) != 0:
-                manual_qty = int(existing.qty_diproduksi)
-                total_produksi = row.get("total_produksi", 0)
-                hpp_per_unit = (total_produksi / manual_qty) if manual_qty > 0 else 0
-
-                HppManufactureProduction.objects.update_or_create(
-                    report=report,
-                    product=product_obj,
-                    defaults={
-                        "qty_diproduksi": manual_qty,
-                        "total_produksi": total_produksi,
-                        "hpp_per_unit": hpp_per_unit,
-                    },
-                )
-            else:
-                qty = int(row.get("qty_diproduksi", 0)) if row.get("qty_diproduksi") is not None else 0
-                if qty < 0:
-                    qty = 0
-                total_produksi = row.get("total_produksi", 0) or 0
-                hpp_per_unit = (total_produksi / qty) if qty > 0 else 0
-
-                HppManufactureProduction.objects.update_or_create(
-                    report=report,
-                    product=product_obj,
-                    defaults={
-                        "qty_diproduksi": qty,
-                        "total_produksi": total_produksi,
-                        "hpp_per_unit": hpp_per_unit,
-                    },
-                )
\ No newline at end of file
+def save_barang_diproduksi(report, barang_diproduksi_list, production_map=None):
+    """
+    Save barang_diproduksi_list into HppManufactureProduction with one bulk_create
+    for new products and one bulk_update for rows whose values changed.
+    Each row carries ``product``, ``qty_diproduksi``, ``total_produksi`` and
+    ``hpp_per_unit``; manual qty overrides are resolved by the caller.
+    Returns the production objects in the same order as the rows.
+    """
+    if production_map is None:
+        production_map = {
+            p.product_id: p
+            for p in HppManufactureProduction.objects.filter(report=report).select_related("product")
+        }
+
+    fields = ["qty_diproduksi", "total_produksi", "hpp_per_unit"]
+    items, to_create, to_update = [], [], []
+
+    for row in barang_diproduksi_list:
+        product_obj = row["product"]
+        values = {field: row.get(field) or 0 for field in fields}
+
+        item = production_map.get(product_obj.id)
+        if item is None:
+            item = HppManufactureProduction(report=report, product=product_obj, **values)
+            to_create.append(item)
+        elif any(getattr(item, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(item, field, value)
+            to_update.append(item)
+        items.append(item)
+
+    if to_create or to_update:
+        from core.utils.report_cache import bump_report_version
+        with transaction.atomic():
+            if to_create:
+                HppManufactureProduction.objects.bulk_create(to_create)
+                set_completion_flags(report.id, FLAG_PRODUKSI)
+            if to_update:
+                HppManufactureProduction.objects.bulk_update(to_update, fields)
+            rebuild_stock_ledger(report, [item.product_id for item in to_create + to_update])
+            bump_report_version(report.id)
+
+    return items
+
+def refresh_barang_diproduksi(report, products=None, production_map=None, total_bop=None):
+    """
+    Recompute the Barang Diproduksi rows of a manufaktur report and save them
+    through save_barang_diproduksi.
+
+    Qty is BDP akhir - BDP awal unless a manual qty was saved; the BOP is
+    allocated over the products by produced qty. ``products``,
+    ``production_map`` and ``total_bop`` can be passed when the caller has
+    already loaded them. Returns a namespace with the production ``items``
+    and the allocation the HPP page shows.
+    """
+    if products is None:
+        products = Product.objects.filter(report=report)
+    if production_map is None:
+        production_map = {
+            p.product_id: p
+            for p in HppManufactureProduction.objects.filter(report=report).select_related("product")
+        }
+    if total_bop is None:
+        total_bop = HppManufactureOverhead.objects.filter(report=report).aggregate(total=Sum("total"))["total"] or 0
+
+    bdp_qty = {
+        (row["product_id"], row["type"]): row["qty"]
+        for row in HppManufactureWIP.objects.filter(report=report)
+        .values("product_id", "type").annotate(qty=Sum("quantity")).order_by()
+    }
+
+    rows = []
+    for product in products:
+        # 1) Auto-calc default produksi (BDP akhir - BDP awal)
+        qty_auto = bdp_qty.get((product.id, "WIP_AKHIR"), 0) - bdp_qty.get((product.id, "WIP_AWAL"), 0)
+
+        # 2) A previous manual override wins
+        prod_item = production_map.get(product.id)
+        if prod_item and (prod_item.qty_diproduksi is not None) and int(prod_item.qty_diproduksi) != 0:
+            qty_diproduksi = int(prod_item.qty_diproduksi)
+        else:
+            qty_diproduksi = max(qty_auto, 0)
+
+        rows.append({"product": product, "qty_diproduksi": qty_diproduksi})
+
+    rows.sort(key=lambda row: (row["product"].name, row["product"].id))
+
+    # Alokasi BOP per produk
+    total_qty_produksi = sum(row["qty_diproduksi"] for row in rows)
+    bop_per_produk = {}
+    for row in rows:
+        if total_qty_produksi > 0:
+            bop_alloc = total_bop * (row["qty_diproduksi"] / total_qty_produksi)
+        else:
+            bop_alloc = 0
+        bop_per_produk[row["product"].name] = round(bop_alloc)
+
+    # Harga satuan produk (BOP-based only)
+    total_bop_allocated = sum(bop_per_produk.values())
+    bop_per_unit = total_bop_allocated / total_qty_produksi if total_qty_produksi > 0 else 0
+
+    harga_satuan_per_produk = {}
+    total_hpp_per_produk = {}
+    for row in rows:
+        key = str(row["product"].id)
+        bop_total = round(bop_per_unit * row["qty_diproduksi"])
+        harga_satuan_per_produk[key] = round(bop_per_unit)
+        total_hpp_per_produk[key] = bop_total
+        row["hpp_per_unit"] = harga_satuan_per_produk[key]
+        row["total_produksi"] = bop_total
+
+    return SimpleNamespace(
+        items=save_barang_diproduksi(report, rows, production_map),
+        total_qty_produksi=total_qty_produksi,
+        total_bop=total_bop_allocated,
+        bop_per_produk=bop_per_produk,
+        harga_satuan_per_produk=harga_satuan_per_produk,
+        total_hpp_per_produk=total_hpp_per_produk,
+    )
+
+
+def value_finished_goods_akhir(qty, qty_awal, harga_awal, qty_produksi, total_biaya_produksi, qty_penjualan):
+    """
+    FIFO value of a Persediaan Barang Jadi Akhir row: ``(total, harga_satuan, status)``.
+    Sales take the stok awal first, then the production at its average cost.
+    """
+    stok_seharusnya = qty_awal + qty_produksi - qty_penjualan
+
+    if qty > stok_seharusnya:
+        return 0, 0, "Periksa Kembali: Stok Akhir melebihi (Awal + Produksi - Penjualan)"
+
+    if (qty_penjualan - qty_awal) < 0:
+        sisa_nilai_awal = (qty_awal - qty_penjualan) * harga_awal
+        total = sisa_nilai_awal + total_biaya_produksi
+    else:
+        total_nilai_awal = qty_awal * harga_awal
+        modal_tersedia = total_nilai_awal + total_biaya_produksi
+        hpp_stok_lama = total_nilai_awal
+
+        if qty_produksi > 0:
+            harga_prod_per_unit = total_biaya_produksi / qty_produksi
+        else:
+            harga_prod_per_unit = 0
+
+        qty_ambil_baru = qty_penjualan - qty_awal
+        hpp_stok_baru = qty_ambil_baru * harga_prod_per_unit
+        total = modal_tersedia - hpp_stok_lama - hpp_stok_baru
+
+    harga_satuan = total / qty if qty > 0 else 0
+    return total, harga_satuan, "OK"
+
+
+def value_finished_goods_akhir_items(report, items, production_items):
+    """
+    Value unsaved FG_AKHIR rows the way the Barang Jadi form does, with the
+    FG_AWAL rows and sold quantities loaded once for all of them.
+    """
+    awal = {}
+    for product_id, quantity, harga_satuan in (
+        HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AWAL")
+        .order_by("id").values_list("product_id", "quantity", "harga_satuan")
+    ):
+        awal.setdefault(product_id, (quantity, harga_satuan))
+    sold = dict(
+        RevenueItem.objects.filter(report=report, revenue_type="usaha")
+        .values_list("product_id").annotate(qty=Sum("quantity")).order_by()
+    )
+    production = {item.product_id: item for item in production_items}
+
+    for item in items:
+        qty_awal, harga_awal = awal.get(item.product_id, (0, 0))
+        prod_item = production.get(item.product_id)
+        item.total, item.harga_satuan, item.status = value_finished_goods_akhir(
+            item.quantity,
+            qty_awal,
+            harga_awal,
+            prod_item.qty_diproduksi if prod_item else 0,
+            prod_item.total_produksi if prod_item else 0,
+            sold.get(item.product_id) or 0,
+        )
+
+
+def load_hpp_entries(report):
+    """Load all HppEntry rows of a report as {product_id: {AWAL, PEMBELIAN, AKHIR}}."""
+    entries_by_product = {}
+    for entry in HppEntry.objects.filter(report=report).order_by("id"):
+        entries = entries_by_product.setdefault(entry.product_id, {"AWAL": None, "PEMBELIAN": [], "AKHIR": None})
+        if entry.category == "PEMBELIAN":
+            entries["PEMBELIAN"].append(entry)
+        else:
+            entries[entry.category] = entry
+    return entries_by_product
+
+
+def seed_hpp_entries(report, products, entries_by_product=None):
+    """
+    Create the missing AWAL/PEMBELIAN/AKHIR rows for the given products with a
+    single bulk_create. Returns True when any row was inserted.
+    """
+    if entries_by_product is None:
+        existing = set(
+            HppEntry.objects.filter(report=report, product__in=products)
+            .values_list("product_id", "category")
+        )
+    else:
+        existing = {
+            (pid, category)
+            for pid, entries in entries_by_product.items()
+            for category in HPP_CATEGORIES
+            if entries[category]
+        }
+
+    missing = [
+        HppEntry(report=report, product=product, category=category, keterangan="")
+        for product in products
+        for category in HPP_CATEGORIES
+        if (product.id, category) not in existing
+    ]
+    if not missing:
+        return False
+
+    from core.utils.report_cache import bump_report_version
+    HppEntry.objects.bulk_create(missing, ignore_conflicts=True)
+    # bulk_create skips post_save, so mark the section as filled and the report changed here
+    set_completion_flags(report.id, FLAG_HPP_DAGANG)
+    bump_report_version(report.id)
+    return True
+
+
+def sync_hpp_entries(report):
+    """
+    Bring the HppEntry rows of a dagang report up to date and return
+    ``(products, hpp_data_by_product)`` for display.
+
+    Qty Akhir (awal + pembelian neto - terjual) is the product's stock ledger
+    balance, loaded with the products; rows are only written when they are
+    missing or their values actually changed, so a repeated GET does not
+    touch the database.
+    """
+    products = list(
+        Product.objects
+        .filter(report=report)
+        .filter(Exists(RevenueItem.objects.filter(product=OuterRef("pk"), revenue_type="usaha")))
+        .select_related("stock_balance")
+    )
+    on_hand = {product.id: product.stock_balance.quantity for product in products if hasattr(product, "stock_balance")}
+    missing = [product.id for product in products if product.id not in on_hand]
+    if missing:
+        # Reports from before the ledger
+        balances = rebuild_stock_ledger(report, missing)
+        on_hand.update((product_id, balance.quantity) for product_id, balance in balances.items())
+    entries_by_product = load_hpp_entries(report)
+
+    if seed_hpp_entries(report, products, entries_by_product):
+        entries_by_product = load_hpp_entries(report)
+
+    changed = []
+    for product in products:
+        entries = entries_by_product[product.id]
+        awal = entries["AWAL"]
+        akhir = entries["AKHIR"]
+
+        qty_akhir_calc = on_hand[product.id]
+        keterangan_awal = awal.keterangan if awal else "-"
+
+        if akhir.quantity != qty_akhir_calc or akhir.keterangan != keterangan_awal:
+            akhir.quantity = qty_akhir_calc
+            akhir.keterangan = keterangan_awal
+            changed.append(akhir)
+
+    if changed:
+        from core.utils.report_cache import bump_report_version
+        from core.utils.report_summary import refresh_hpp_dagang_summary
+        HppEntry.objects.bulk_update(changed, ["quantity", "keterangan"])
+        refresh_hpp_dagang_summary(report.id, [entry.product_id for entry in changed])
+        bump_report_version(report.id)
+
+    return products, {product: entries_by_product[product.id] for product in products}
@@ -0,0 +1,291 @@
+"""
+Create, update and delete many line items of a report in one request.
+
+The pages post one add, edit or delete at a time, each followed by a
+redirect and a full recompute. apply_line_item_batch takes a list of
+operations on the LINE_ITEM_TABLES slugs, validates all of them with the
+rules of the forms, applies them with one bulk_create / bulk_update /
+DELETE per table in a single transaction, and then refreshes what the
+signals and the page would derive (HPP rows, Barang Diproduksi, Barang Jadi
+Akhir, completion flags, summary, version) once for the whole batch.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from core.models import (
+    Product, RevenueItem, ExpenseItem, HppManufactureFinishedGoods, ReportSummary,
+)
+from core.signals import refresh_after_bulk
+from core.utils.hpp_calculator import refresh_barang_diproduksi, seed_hpp_entries, value_finished_goods_akhir_items
+from core.utils.line_item_export import LINE_ITEM_TABLES
+from core.utils.manufaktur_import import MANUFAKTUR_SECTIONS
+from core.utils.revenue_import import IMPORT_BATCH_SIZE, parse_int_cell, validate_revenue_row
+
+BATCH_OPERATIONS = ("create", "update", "delete")
+
+
+class LineItemBatchError(Exception):
+    """The batch was rejected as a whole; ``errors`` holds ``(operation index, message)`` pairs."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} operasi tidak valid, tidak ada yang disimpan.")
+        self.errors = errors
+
+
+@dataclass
+class LineItemBatchResult:
+    # row id per operation, in request order
+    ids: list = field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    summary: ReportSummary = None
+
+
+def _revenue(report, values, product_id):
+    revenue_type, name, quantity, selling_price, total = validate_revenue_row(values.get)
+    return RevenueItem(
+        report=report, revenue_type=revenue_type, product_id=product_id if revenue_type == "usaha" else None,
+        name=name, quantity=quantity, selling_price=selling_price, total=total,
+    )
+
+
+def _expense(report, values, product_id):
+    category = str(values.get("expense_category") or "").strip().lower()
+    if category not in dict(ExpenseItem.EXPENSE_CATEGORY_CHOICES):
+        raise ValueError("Kategori beban harus 'usaha' atau 'lain'.")
+    name = str(values.get("name") or "").strip()
+    if not name:
+        raise ValueError("Nama beban harus diisi.")
+    try:
+        total = parse_int_cell(values.get("total"))
+    except ValueError:
+        total = None
+    if total is None or total < 0:
+        raise ValueError("Total beban harus berupa angka yang valid.")
+    return ExpenseItem(
+        report=report, product_id=product_id, expense_category=category, scope=report.business_type,
+        expense_type=str(values.get("expense_type") or "").strip() or None, name=name, total=total,
+    )
+
+
+_SECTION_BUILDERS = {title: (product_required, build) for title, _model, product_required, build in MANUFAKTUR_SECTIONS}
+
+# slug -> (product required, row builder, business type or None); the builders take the model's field names
+BATCH_TABLES = {
+    "pendapatan": (False, _revenue, None),
+    "beban": (False, _expense, None),
+    "bahan-baku": _SECTION_BUILDERS["Bahan Baku"] + ("manufaktur",),
+    "bdp": _SECTION_BUILDERS["BDP"] + ("manufaktur",),
+    "btkl": _SECTION_BUILDERS["BTKL"] + ("manufaktur",),
+    "bop": _SECTION_BUILDERS["BOP"] + ("manufaktur",),
+    "barang-jadi": _SECTION_BUILDERS["Barang Jadi"] + ("manufaktur",),
+}
+
+
+def _update_fields(model):
+    return [f.name for f in model._meta.concrete_fields if not f.primary_key and f.name != "report"]
+
+
+def _row_values(obj):
+    """A stored row as the builders' input, so an update only has to send the changed fields."""
+    return {f.attname: getattr(obj, f.attname) for f in obj._meta.concrete_fields}
+
+
+def _parse_operations(report, operations, errors):
+    """``(index, op, table, row id, values)`` of every well-formed operation."""
+    parsed = []
+    seen = set()
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append((index, "Operasi harus berupa objek."))
+            continue
+        op, table, values = operation.get("op"), operation.get("table"), operation.get("values") or {}
+        if op not in BATCH_OPERATIONS:
+            errors.append((index, f"op harus salah satu dari {', '.join(BATCH_OPERATIONS)}."))
+            continue
+        if table not in BATCH_TABLES:
+            errors.append((index, f"Tabel '{table}' tidak dikenal."))
+            continue
+        if BATCH_TABLES[table][2] not in (None, report.business_type):
+            errors.append((index, f"Tabel '{table}' tidak dipakai laporan {report.business_type}."))
+            continue
+        if not isinstance(values, dict):
+            errors.append((index, "values harus berupa objek."))
+            continue
+
+        row_id = operation.get("id")
+        if op == "create":
+            row_id = None
+        elif isinstance(row_id, bool) or not isinstance(row_id, int):
+            errors.append((index, "id baris harus diisi untuk update dan delete."))
+            continue
+        elif (table, row_id) in seen:
+            errors.append((index, f"Baris {row_id} muncul di lebih dari satu operasi."))
+            continue
+        else:
+            seen.add((table, row_id))
+        parsed.append((index, op, table, row_id, values))
+    return parsed
+
+
+def apply_line_item_batch(report, operations):
+    """
+    Apply ``operations`` (dicts with ``op``, ``table``, ``id`` for update and
+    delete, and ``values``) to ``report``'s line items, all or nothing.
+    Raises LineItemBatchError listing every invalid operation.
+    """
+    errors = []
+    parsed = _parse_operations(report, operations, errors)
+
+    # Rows touched by update/delete, one query per table
+    wanted = {}
+    for _index, op, table, row_id, _values in parsed:
+        if op != "create":
+            wanted.setdefault(table, set()).add(row_id)
+    stored = {
+        table: LINE_ITEM_TABLES[table][0].objects.filter(report=report).in_bulk(ids)
+        for table, ids in wanted.items()
+    }
+
+    products = dict(Product.objects.filter(report=report).values_list("id", "name"))
+    product_ids = {name: product_id for product_id, name in products.items()}
+    products_folded = {name.casefold(): product_id for name, product_id in product_ids.items()}
+    new_products = set()
+
+    def product_for(table, values):
+        """``(product id, name)``; a new pendapatan product has no id yet."""
+        name = str(values.get("product") or "").strip()
+        if name:
+            product_id = product_ids.get(name) or products_folded.get(name.casefold())
+            if product_id is not None:
+                return product_id, products[product_id]
+            if table == "pendapatan":
+                return None, name
+            raise ValueError(f"Produk '{name}' tidak ada di laporan ini.")
+        product_id = values.get("product_id")
+        if product_id in (None, ""):
+            return None, None
+        if product_id not in products:
+            raise ValueError(f"Produk {product_id} tidak ada di laporan ini.")
+        return product_id, products[product_id]
+
+    # (index, op, table, row); rows are built in memory, nothing is written yet
+    planned = []
+    for index, op, table, row_id, values in parsed:
+        product_required, build, _business_type = BATCH_TABLES[table]
+        if op == "delete":
+            if row_id not in stored[table]:
+                errors.append((index, f"Baris {row_id} tidak ditemukan."))
+            else:
+                planned.append((index, op, table, stored[table][row_id]))
+            continue
+
+        if op == "update":
+            if row_id not in stored[table]:
+                errors.append((index, f"Baris {row_id} tidak ditemukan."))
+                continue
+            base = _row_values(stored[table][row_id])
+            if "product" in values:
+                base.pop("product_id")
+            values = {**base, **values}
+
+        try:
+            product_id, product_name = product_for(table, values)
+            if product_required and product_id is None:
+                raise ValueError("Produk harus diisi.")
+            if table == "pendapatan":
+                values = {**values, "product": product_name}
+            row = build(report, values, product_id)
+        except ValueError as e:
+            errors.append((index, str(e)))
+            continue
+        if table == "pendapatan" and row.revenue_type == "usaha" and row.product_id is None:
+            new_products.add(row.name)
+        row.pk = row_id
+        planned.append((index, op, table, row))
+
+    if errors:
+        raise LineItemBatchError(sorted(errors))
+
+    result = LineItemBatchResult()
+    with transaction.atomic():
+        if new_products:
+            Product.objects.bulk_create(
+                [Product(report=report, name=name) for name in sorted(new_products)], ignore_conflicts=True
+            )
+            # ignore_conflicts does not hand back ids
+            product_ids = dict(Product.objects.filter(report=report).values_list("name", "id"))
+
+        by_table = {}
+        for _index, op, table, row in planned:
+            if table == "pendapatan" and row.revenue_type == "usaha" and row.product_id is None:
+                row.product_id = product_ids[row.name]
+            by_table.setdefault(table, {"create": [], "update": [], "delete": []})[op].append(row)
+
+        # Barang Jadi Akhir is valued from the production, so it is written last
+        fg_akhir = {"create": [], "update": []}
+        if "barang-jadi" in by_table:
+            for op in fg_akhir:
+                rows = by_table["barang-jadi"][op]
+                fg_akhir[op] = [row for row in rows if row.type == "FG_AKHIR"]
+                by_table["barang-jadi"][op] = [row for row in rows if row.type != "FG_AKHIR"]
+
+        for table, rows in by_table.items():
+            model = LINE_ITEM_TABLES[table][0]
+            _write_rows(model, rows["create"], rows["update"], rows["delete"])
+            result.created += len(rows["create"])
+            result.updated += len(rows["update"])
+            result.deleted += len(rows["delete"])
+
+        if report.business_type == "manufaktur":
+            production = refresh_barang_diproduksi(report)
+            fg_rows = fg_akhir["create"] + fg_akhir["update"]
+            if fg_rows:
+                value_finished_goods_akhir_items(report, fg_rows, production.items)
+                _write_rows(HppManufactureFinishedGoods, fg_akhir["create"], fg_akhir["update"], [])
+                result.created += len(fg_akhir["create"])
+                result.updated += len(fg_akhir["update"])
+        elif "pendapatan" in by_table:
+            sold = {
+                row.product_id
+                for op in ("create", "update")
+                for row in by_table["pendapatan"][op]
+                if row.revenue_type == "usaha"
+            }
+            if sold:
+                seed_hpp_entries(report, list(Product.objects.filter(pk__in=sold)))
+
+        result.summary = refresh_after_bulk(report, [LINE_ITEM_TABLES[table][0] for table in by_table])
+
+    result.ids = [row.pk for _index, _op, _table, row in sorted(planned, key=lambda plan: plan[0])]
+    return result
+
+
+def _write_rows(model, created, updated, deleted):
+    if created:
+        model.objects.bulk_create(created, batch_size=IMPORT_BATCH_SIZE)
+    if updated:
+        model.objects.bulk_update(updated, _update_fields(model), batch_size=IMPORT_BATCH_SIZE)
+    if deleted:
+        model.objects.filter(pk__in=[row.pk for row in deleted]).delete()
+
+
+def line_item_batch_payload(report, result):
+    summary = result.summary
+    report.refresh_from_db(fields=["version"])
+    totals = {
+        f.name: getattr(summary, f.name)
+        for f in ReportSummary._meta.concrete_fields
+        if f.name not in ("id", "report", "hpp_dagang_products", "updated_at")
+    }
+    for name in ("jumlah_pendapatan", "hpp_total", "jumlah_beban", "laba_sebelum_pajak", "laba_setelah_pajak"):
+        totals[name] = getattr(summary, name)
+    return {
+        "ids": result.ids,
+        "created": result.created,
+        "updated": result.updated,
+        "deleted": result.deleted,
+        "totals": totals,
+        "version": report.version,
+    }
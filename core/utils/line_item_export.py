@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from core.models import (
+    RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods,
+)
+
+# Rows fetched per database round trip (a server-side cursor on PostgreSQL)
+FETCH_CHUNK_SIZE = 2000
+# Characters collected before a chunk is handed to the client
+STREAM_CHUNK_CHARS = 64 * 1024
+
+# URL slug -> (model, fields); the raw column names, for analytics rather than display
+LINE_ITEM_TABLES = {
+    "pendapatan": (RevenueItem, (
+        "id", "revenue_type", "product_id", "product__name", "name", "quantity", "selling_price", "total",
+    )),
+    "hpp": (HppEntry, (
+        "id", "category", "product_id", "product__name", "quantity", "harga_satuan", "diskon", "retur_qty",
+        "ongkir", "keterangan",
+    )),
+    "bahan-baku": (HppManufactureMaterial, (
+        "id", "type", "product_id", "product__name", "nama_bahan_baku", "quantity", "harga_satuan", "diskon",
+        "retur_qty", "retur_amount", "ongkir", "total", "keterangan",
+    )),
+    "btkl": (HppManufactureLabor, (
+        "id", "product_id", "product__name", "jenis_tenaga_kerja", "quantity", "harga_satuan", "total",
+        "keterangan",
+    )),
+    "bop": (HppManufactureOverhead, (
+        "id", "product_id", "product__name", "nama_biaya", "quantity", "harga_satuan", "total", "keterangan",
+    )),
+    "bdp": (HppManufactureWIP, (
+        "id", "type", "product_id", "product__name", "quantity", "harga_satuan", "total", "keterangan",
+    )),
+    "barang-diproduksi": (HppManufactureProduction, (
+        "id", "product_id", "product__name", "qty_diproduksi", "total_produksi", "hpp_per_unit", "keterangan",
+    )),
+    "barang-jadi": (HppManufactureFinishedGoods, (
+        "id", "type", "product_id", "product__name", "quantity", "harga_satuan", "total", "status", "keterangan",
+    )),
+    "beban": (ExpenseItem, (
+        "id", "expense_category", "scope", "expense_type", "product_id", "product__name", "name", "total",
+    )),
+}
+
+LINE_ITEM_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def line_item_columns(table):
+    return [field.replace("__", "_") for field in LINE_ITEM_TABLES[table][1]]
+
+
+def line_item_rows(report, table):
+    """The table's rows of the report as tuples, read lazily in id order."""
+    model, fields = LINE_ITEM_TABLES[table]
+    return (
+        model.objects.filter(report=report)
+        .order_by("id")
+        .values_list(*fields)
+        .iterator(chunk_size=FETCH_CHUNK_SIZE)
+    )
+
+
+def _take(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data.encode("utf-8")
+
+
+def _stream(buffer, rows, write_row):
+    # The first row goes out on its own so the client sees bytes before the rest is read
+    first = True
+    for row in rows:
+        write_row(row)
+        if first or buffer.tell() >= STREAM_CHUNK_CHARS:
+            yield _take(buffer)
+            first = False
+    if buffer.tell():
+        yield _take(buffer)
+
+
+def iter_csv(report, table):
+    """The table as CSV with a header row, in ~64 KiB chunks of bytes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(line_item_columns(table))
+    yield _take(buffer)
+    yield from _stream(buffer, line_item_rows(report, table), writer.writerow)
+
+
+def iter_ndjson(report, table):
+    """The table as one JSON object per line, in ~64 KiB chunks of bytes."""
+    buffer = io.StringIO()
+    columns = line_item_columns(table)
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    def write_row(row):
+        buffer.write(encoder.encode(dict(zip(columns, row))))
+        buffer.write("\n")
+
+    yield from _stream(buffer, line_item_rows(report, table), write_row)
+
+
+def iter_line_items(report, table, fmt):
+    if fmt == "csv":
+        return iter_csv(report, table)
+    return iter_ndjson(report, table)
@@ -0,0 +1,231 @@
+"""
+Bulk import of the manufaktur HPP sections from one XLSX workbook.
+
+One sheet per section, named and laid out like the detail Excel export
+(Bahan Baku, BDP, BTKL, BOP, Barang Jadi), so an exported workbook can be
+imported into another report. Products are resolved by name from one
+in-memory map; every row is validated first, then all sections are
+inserted with bulk_create in one transaction. Barang Diproduksi and the
+Barang Jadi Akhir valuation, which depend on the other sections, are
+computed once after the inserts instead of after every row.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from openpyxl import load_workbook
+from core.models import (
+    Product,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureFinishedGoods,
+)
+from core.signals import refresh_after_bulk
+from core.utils.excel_exporter import DETAIL_SHEETS
+from core.utils.hpp_calculator import refresh_barang_diproduksi, value_finished_goods_akhir_items
+from core.utils.revenue_import import IMPORT_BATCH_SIZE, parse_int_cell
+
+
+class ManufakturImportError(Exception):
+    """The workbook as a whole cannot be read."""
+
+
+@dataclass
+class ManufakturImportResult:
+    # sheet title -> rows inserted
+    created: dict = field(default_factory=dict)
+    # (sheet title, row number, message)
+    errors: list = field(default_factory=list)
+
+
+def _choice(values, choices):
+    text = str(values.get("type") or "").strip()
+    for code, label in choices:
+        if text.upper() == code or text.lower() == label.lower():
+            return code
+    raise ValueError(f"Jenis harus salah satu dari {', '.join(code for code, _label in choices)}.")
+
+
+def _number(values, name):
+    try:
+        number = parse_int_cell(values.get(name))
+    except ValueError:
+        raise ValueError("Qty dan nilai rupiah harus bilangan bulat.")
+    if number is not None and number < 0:
+        raise ValueError("Qty dan nilai rupiah tidak boleh negatif.")
+    return number or 0
+
+
+def _text(values, name):
+    return str(values.get(name) or "").strip()
+
+
+def _material(report, values, product_id):
+    tipe = _choice(values, HppManufactureMaterial.TYPE_CHOICES)
+    qty, harga, diskon, retur_qty, retur_amount, ongkir = (
+        _number(values, name)
+        for name in ("quantity", "harga_satuan", "diskon", "retur_qty", "retur_amount", "ongkir")
+    )
+    if retur_qty > qty:
+        raise ValueError("Retur (Qty) tidak boleh lebih besar dari Kuantitas.")
+    if retur_amount <= 0:
+        retur_amount = retur_qty * harga
+
+    if tipe in ("BB_AWAL", "BB_AKHIR"):
+        total = qty * harga
+    else:
+        total = (qty * harga) - diskon - retur_amount + ongkir
+
+    return HppManufactureMaterial(
+        report=report, product_id=product_id, type=tipe, nama_bahan_baku=_text(values, "nama_bahan_baku"),
+        quantity=qty, harga_satuan=harga, diskon=diskon, retur_qty=retur_qty, retur_amount=retur_amount,
+        ongkir=ongkir, total=total, keterangan=_text(values, "keterangan"),
+    )
+
+
+def _wip(report, values, product_id):
+    tipe = _choice(values, HppManufactureWIP.TYPE_CHOICES)
+    qty, harga = _number(values, "quantity"), _number(values, "harga_satuan")
+    return HppManufactureWIP(
+        report=report, product_id=product_id, type=tipe, quantity=qty, harga_satuan=harga,
+        total=qty * harga, keterangan=_text(values, "keterangan"),
+    )
+
+
+def _labor(report, values, product_id):
+    qty, harga = _number(values, "quantity"), _number(values, "harga_satuan")
+    return HppManufactureLabor(
+        report=report, product_id=product_id, jenis_tenaga_kerja=_text(values, "jenis_tenaga_kerja"),
+        quantity=qty, harga_satuan=harga, total=qty * harga, keterangan=_text(values, "keterangan"),
+    )
+
+
+def _overhead(report, values, product_id):
+    qty, harga = _number(values, "quantity"), _number(values, "harga_satuan")
+    return HppManufactureOverhead(
+        report=report, product_id=product_id, nama_biaya=_text(values, "nama_biaya"),
+        quantity=qty, harga_satuan=harga, total=qty * harga, keterangan=_text(values, "keterangan"),
+    )
+
+
+def _finished_goods(report, values, product_id):
+    tipe = _choice(values, HppManufactureFinishedGoods.TYPE_CHOICES)
+    qty, harga = _number(values, "quantity"), _number(values, "harga_satuan")
+    # FG_AKHIR is valued with value_finished_goods_akhir_items once everything else is in
+    return HppManufactureFinishedGoods(
+        report=report, product_id=product_id, type=tipe, quantity=qty, harga_satuan=harga,
+        total=qty * harga, status="OK", keterangan=_text(values, "keterangan"),
+    )
+
+
+# (sheet title, model, product required, row builder), in insert order
+MANUFAKTUR_SECTIONS = (
+    ("Bahan Baku", HppManufactureMaterial, True, _material),
+    ("BDP", HppManufactureWIP, True, _wip),
+    ("BTKL", HppManufactureLabor, True, _labor),
+    ("BOP", HppManufactureOverhead, False, _overhead),
+    ("Barang Jadi", HppManufactureFinishedGoods, True, _finished_goods),
+)
+
+
+def _columns_by_header(columns):
+    """{lower-case header or field name: field} of a detail export sheet."""
+    fields = {}
+    for header, field_name, _width in columns:
+        field_name = field_name.removesuffix("__name")
+        fields[header.lower()] = field_name
+        fields[field_name] = field_name
+    return fields
+
+
+_SECTION_COLUMNS = {title: _columns_by_header(columns) for title, _model, _business_type, columns in DETAIL_SHEETS}
+
+
+def _sheet_records(ws, columns):
+    """``(row_number, {field: value})`` of every non-empty row under the header row."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None) or ()
+    positions = [
+        (pos, columns[name])
+        for pos, name in enumerate(str(cell or "").strip().lower() for cell in header)
+        if name in columns
+    ]
+    for row_number, row in enumerate(rows, start=2):
+        if not any(value not in (None, "") for value in row):
+            continue
+        yield row_number, {
+            name: (row[pos].strip() if isinstance(row[pos], str) else row[pos])
+            for pos, name in positions
+            if pos < len(row)
+        }
+
+
+def import_manufaktur_workbook(report, file, skip_invalid=False):
+    """
+    Import the section sheets of the XLSX ``file`` into ``report``. Without
+    ``skip_invalid`` nothing is written when any row is invalid.
+    """
+    try:
+        wb = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ManufakturImportError("File harus berupa workbook XLSX.")
+
+    products = dict(Product.objects.filter(report=report).values_list("name", "id"))
+    products_folded = {name.casefold(): product_id for name, product_id in products.items()}
+
+    def product_id_for(name, required):
+        name = str(name or "").strip()
+        if not name:
+            if required:
+                raise ValueError("Produk harus diisi.")
+            return None
+        product_id = products.get(name) or products_folded.get(name.casefold())
+        if product_id is None:
+            raise ValueError(f"Produk '{name}' tidak ada di laporan ini.")
+        return product_id
+
+    result = ManufakturImportResult()
+    rows_by_section = {}
+    try:
+        sheets = {ws.title.strip().lower(): ws for ws in wb.worksheets}
+        if not any(title.lower() in sheets for title, *_rest in MANUFAKTUR_SECTIONS):
+            raise ManufakturImportError("Workbook tidak berisi sheet Bahan Baku, BDP, BTKL, BOP atau Barang Jadi.")
+
+        for title, model, product_required, build in MANUFAKTUR_SECTIONS:
+            ws = sheets.get(title.lower())
+            if ws is None:
+                continue
+            section_rows = rows_by_section.setdefault(title, [])
+            for row_number, values in _sheet_records(ws, _SECTION_COLUMNS[title]):
+                try:
+                    section_rows.append(build(report, values, product_id_for(values.get("product"), product_required)))
+                except ValueError as e:
+                    result.errors.append((title, row_number, str(e)))
+    finally:
+        wb.close()
+
+    if (result.errors and not skip_invalid) or not any(rows_by_section.values()):
+        return result
+
+    # Barang Jadi Akhir is valued from the production, so it goes in last
+    fg_akhir = []
+    if "Barang Jadi" in rows_by_section:
+        finished_goods = rows_by_section["Barang Jadi"]
+        fg_akhir = [item for item in finished_goods if item.type == "FG_AKHIR"]
+        rows_by_section["Barang Jadi"] = [item for item in finished_goods if item.type != "FG_AKHIR"]
+
+    with transaction.atomic():
+        for title, model, _product_required, _build in MANUFAKTUR_SECTIONS:
+            if title not in rows_by_section:
+                continue
+            items = rows_by_section[title]
+            model.objects.bulk_create(items, batch_size=IMPORT_BATCH_SIZE)
+            result.created[title] = len(items)
+
+        # Derived values, once for the whole import
+        production = refresh_barang_diproduksi(report)
+        if fg_akhir:
+            value_finished_goods_akhir_items(report, fg_akhir, production.items)
+            HppManufactureFinishedGoods.objects.bulk_create(fg_akhir, batch_size=IMPORT_BATCH_SIZE)
+            result.created["Barang Jadi"] += len(fg_akhir)
+
+        refresh_after_bulk(report, [model for _title, model, *_rest in MANUFAKTUR_SECTIONS])
+    return result
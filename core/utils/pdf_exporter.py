@@ -1,11 +1,24 @@
 import pdfkit
 from django.template.loader import render_to_string
 from django.conf import settings
+from core.utils.pdf_pool import get_pdf_pool
 
-def generate_pdf_file(report, data, template_path, request=None):
+def pdf_template(report):
+    if report.business_type == 'manufaktur':
+        return 'core/pdf/laporan_manufaktur_pdf.html'
+    return 'core/pdf/laporan_pdf.html'
+
+
+def pdf_filename(report):
+    if report.business_type == 'manufaktur':
+        return f"Laporan_Manufaktur_{report.company_name}_{report.year}.pdf"
+    return f"Laporan_Dagang_{report.company_name}_{report.year}.pdf"
+
+
+def generate_pdf_file(report, result, template_path, request=None, wait_timeout=None):
     
     html = render_to_string(template_path, {
-        **data,
+        **result.as_context(),
         "report": report,
     })
 
@@ -25,6 +38,10 @@ def generate_pdf_file(report, data, template_path, request=None):
         import os
         config = pdfkit.configuration(wkhtmltopdf=settings.WKHTMLTOPDF_CMD)
 
-    pdf = pdfkit.from_string(html, False, options=options, configuration=config)
+    if wait_timeout is None:
+        wait_timeout = getattr(settings, "PDF_RENDER_WAIT_TIMEOUT", 30)
+
+    # Rendered by the process-wide pool; raises PdfRenderUnavailable when it is saturated
+    pdf = get_pdf_pool().render(html, options, config, wait_timeout=wait_timeout)
     
-    return pdf
\ No newline at end of file
+    return pdf
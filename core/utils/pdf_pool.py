@@ -0,0 +1,149 @@
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import pdfkit
+from django.conf import settings
+
+# Render / wait latencies kept for the percentile metrics
+LATENCY_WINDOW = 200
+
+
+class PdfRenderUnavailable(Exception):
+    """The PDF could not be rendered in time; the caller should fall back."""
+
+
+class PdfQueueFull(PdfRenderUnavailable):
+    pass
+
+
+class PdfRenderTimeout(PdfRenderUnavailable):
+    pass
+
+
+def run_wkhtmltopdf(html, options=None, configuration=None, timeout=None):
+    """One wkhtmltopdf run, killed when it takes longer than ``timeout`` seconds."""
+    kit = pdfkit.PDFKit(html, "string", options=options, configuration=configuration)
+    args = list(kit.command())
+    try:
+        completed = subprocess.run(
+            args, input=html.encode("utf-8"), capture_output=True, timeout=timeout, env=kit.environ
+        )
+    except subprocess.TimeoutExpired as e:
+        raise PdfRenderTimeout(f"wkhtmltopdf took longer than {timeout}s") from e
+    kit.handle_error(completed.returncode, (completed.stderr or completed.stdout or b"").decode("utf-8", "replace"))
+    return completed.stdout
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(values)
+
+    def ms(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {"p50": ms(0.5), "p95": ms(0.95), "max": ms(1)}
+
+
+class PdfRenderPool:
+    """
+    A fixed number of worker threads, each running at most one wkhtmltopdf
+    process, fed from a bounded queue. A full queue rejects new jobs
+    straight away instead of piling up more renders.
+    """
+
+    def __init__(self, workers, queue_size, render_timeout=None, renderer=run_wkhtmltopdf):
+        self.workers = workers
+        self.render_timeout = render_timeout
+        self.renderer = renderer
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counts = {"completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+        self._render_times = deque(maxlen=LATENCY_WINDOW)
+        self._wait_times = deque(maxlen=LATENCY_WINDOW)
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"pdf-render-{i}", daemon=True).start()
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def submit(self, html, options=None, configuration=None):
+        """Queue a render and return its Future, or raise PdfQueueFull."""
+        future = Future()
+        try:
+            self._queue.put_nowait((future, time.monotonic(), html, options, configuration))
+        except queue.Full:
+            self._count("rejected")
+            raise PdfQueueFull("Antrean PDF penuh") from None
+        return future
+
+    def render(self, html, options=None, configuration=None, wait_timeout=None):
+        """Render and wait for the PDF bytes, at most ``wait_timeout`` seconds including the queue."""
+        future = self.submit(html, options, configuration)
+        try:
+            return future.result(timeout=wait_timeout)
+        except FutureTimeoutError:
+            # Still queued: the worker skips it. Already running: bounded by render_timeout.
+            future.cancel()
+            self._count("timed_out")
+            raise PdfRenderTimeout(f"PDF tidak selesai dalam {wait_timeout}s") from None
+
+    def _work(self):
+        while True:
+            future, queued_at, html, options, configuration = self._queue.get()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                started = time.monotonic()
+                with self._lock:
+                    self._in_flight += 1
+                    self._wait_times.append(started - queued_at)
+                try:
+                    pdf = self.renderer(html, options, configuration, timeout=self.render_timeout)
+                except Exception as e:
+                    self._count("failed")
+                    future.set_exception(e)
+                else:
+                    self._count("completed")
+                    future.set_result(pdf)
+                finally:
+                    with self._lock:
+                        self._in_flight -= 1
+                        self._render_times.append(time.monotonic() - started)
+            finally:
+                self._queue.task_done()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self._queue.maxsize,
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                **self._counts,
+                "render_ms": _percentiles(self._render_times),
+                "wait_ms": _percentiles(self._wait_times),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_pool():
+    """This process's render pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PdfRenderPool(
+                workers=getattr(settings, "PDF_RENDER_WORKERS", 2),
+                queue_size=getattr(settings, "PDF_RENDER_QUEUE_SIZE", 8),
+                render_timeout=getattr(settings, "PDF_RENDER_TIMEOUT", 60),
+            )
+        return _pool
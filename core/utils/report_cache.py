@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from core.models import (
+    FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods
+)
+from core.utils.final_report import build_report_result
+
+REPORT_CACHE_ALIAS = getattr(settings, "REPORT_CACHE_ALIAS", "default")
+
+# Saving or deleting any of these moves their report to a new version
+REPORT_CHILD_MODELS = (
+    Product, RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureProduction, HppManufactureFinishedGoods,
+)
+
+
+def bump_report_version(report_id):
+    """Invalidate every cached result of a report by moving it to a new version."""
+    FinancialReport.objects.filter(pk=report_id).update(version=F("version") + 1)
+
+
+def report_cache_key(report, kind):
+    return f"report:{report.pk}:v{report.version}:{kind}"
+
+
+def get_report_result(report):
+    """
+    The report's DagangReportResult or ManufakturReportResult, computed once
+    per report version and shared by the laporan page, PDF and Excel export.
+    """
+    cache = caches[REPORT_CACHE_ALIAS]
+    key = report_cache_key(report, report.business_type or "dagang")
+    result = cache.get(key)
+    if result is None:
+        result = build_report_result(report)
+        cache.set(key, result)
+    return result
@@ -0,0 +1,177 @@
+import threading
+from collections import defaultdict
+from functools import partial
+from operator import add, sub
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from core.models import (
+    FinancialReport, ReportSummary, RevenueItem, HppEntry, ExpenseItem,
+    HppManufactureMaterial, HppManufactureLabor, HppManufactureOverhead,
+    HppManufactureWIP, HppManufactureFinishedGoods
+)
+from core.utils.final_report import load_report_totals
+from core.utils.hpp_calculator import calculate_hpp_batch
+
+# model -> (discriminator field or None, {discriminator value: summary field})
+LINEAR_BUCKETS = {
+    RevenueItem: ("revenue_type", {"usaha": "pendapatan_usaha", "lain": "pendapatan_lain"}),
+    ExpenseItem: ("expense_category", {"usaha": "beban_usaha", "lain": "beban_lain"}),
+    HppManufactureMaterial: ("type", {"BB_AWAL": "bb_awal", "BB_PEMBELIAN": "bb_pembelian", "BB_AKHIR": "bb_akhir"}),
+    HppManufactureWIP: ("type", {"WIP_AWAL": "bdp_awal", "WIP_AKHIR": "bdp_akhir"}),
+    HppManufactureLabor: (None, {None: "btkl"}),
+    HppManufactureOverhead: (None, {None: "bop"}),
+    HppManufactureFinishedGoods: ("type", {"FG_AWAL": "bj_awal", "FG_AKHIR": "bj_akhir"}),
+}
+
+# Models whose changes can move the FIFO HPP of a dagang report
+HPP_DAGANG_MODELS = (HppEntry, RevenueItem)
+
+# Summary columns kept per product in ReportSummary.hpp_dagang_products, in its order
+HPP_DAGANG_COLUMNS = ("persediaan_awal", "pembelian_neto", "persediaan_akhir", "hpp_dagang")
+
+# (report id, product id) pairs whose FIFO HPP changed in the current transaction, per thread
+_pending_hpp_dagang = threading.local()
+
+
+def summary_bucket(instance):
+    """Summary field a line item's ``total`` counts towards, or None."""
+    field, buckets = LINEAR_BUCKETS[type(instance)]
+    key = getattr(instance, field) if field else None
+    return buckets.get(key)
+
+
+def summary_state(instance):
+    """(report_id, bucket, total) of a line item, used to compute save/delete deltas."""
+    return (instance.report_id, summary_bucket(instance), instance.total or 0)
+
+
+def _linear_columns():
+    columns = {}
+    for model, (field, buckets) in LINEAR_BUCKETS.items():
+        for key, name in buckets.items():
+            columns[name] = model.objects.filter(**{field: key}) if field else model.objects.all()
+    return columns
+
+
+def _product_hpp_values(report, product_ids=None):
+    """``{str(product id): [awal, pembelian neto, akhir, hpp]}`` of the products with pendapatan usaha."""
+    values = {}
+    for product, result in calculate_hpp_batch(report, product_ids):
+        awal, neto, akhir = result["total_awal"], result["total_pembelian_neto"], result["total_akhir"]
+        values[str(product.id)] = [awal, neto, akhir, awal + neto - akhir]
+    return values
+
+
+def _hpp_dagang_values(report):
+    # Only the dagang laporan and report list read these columns; like hpp_total and
+    # build_report_result, anything that is not manufaktur (a NULL type too) counts as dagang
+    by_product = {} if report.business_type == "manufaktur" else _product_hpp_values(report)
+    totals = [sum(column) for column in zip(*by_product.values())] or [0] * len(HPP_DAGANG_COLUMNS)
+    return {**dict(zip(HPP_DAGANG_COLUMNS, totals)), "hpp_dagang_products": by_product}
+
+
+def compute_report_summary(report):
+    """All ReportSummary field values computed from scratch out of the line items."""
+    values = load_report_totals(report, **_linear_columns())
+    values.update(_hpp_dagang_values(report))
+    return values
+
+
+def rebuild_report_summary(report):
+    summary, _created = ReportSummary.objects.update_or_create(
+        report=report, defaults=compute_report_summary(report)
+    )
+    return summary
+
+
+def get_report_summary(report):
+    """The report's summary row, built on first access for reports that predate it."""
+    summary = ReportSummary.objects.filter(report=report).first()
+    if summary is None:
+        summary = rebuild_report_summary(report)
+    summary.report = report
+    return summary
+
+
+def apply_summary_deltas(report_id, deltas):
+    """Add ``{field: delta}`` to a report's summary row, building the row if it is missing."""
+    deltas = {name: delta for name, delta in deltas.items() if name and delta}
+    if not deltas:
+        return
+    updated = ReportSummary.objects.filter(report_id=report_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated:
+        rebuild_report_summary(FinancialReport.objects.get(pk=report_id))
+
+
+def refresh_hpp_dagang_summary(report_id, product_ids=None):
+    """
+    Recompute the FIFO HPP of the given products (default: all of them),
+    which cannot be maintained by simple deltas, and apply the difference
+    from what they contributed before to the summary.
+    """
+    report = FinancialReport.objects.filter(pk=report_id).first()
+    if report is None:
+        return
+    with transaction.atomic():
+        summary = ReportSummary.objects.select_for_update().filter(report_id=report_id).first()
+        if summary is None:
+            rebuild_report_summary(report)
+            return
+        stored = summary.hpp_dagang_products
+        if product_ids is None or stored is None:
+            ReportSummary.objects.filter(pk=summary.pk).update(**_hpp_dagang_values(report))
+            return
+        if report.business_type == "manufaktur":
+            return
+
+        fresh = _product_hpp_values(report, product_ids)
+        zeros = [0] * len(HPP_DAGANG_COLUMNS)
+        deltas = zeros
+        for product_id in map(str, product_ids):
+            # A product without pendapatan usaha (or deleted) no longer contributes
+            old = stored.pop(product_id, zeros)
+            new = fresh.get(product_id)
+            if new is not None:
+                stored[product_id] = new
+            deltas = list(map(add, deltas, map(sub, new or zeros, old)))
+        ReportSummary.objects.filter(pk=summary.pk).update(
+            hpp_dagang_products=stored,
+            **{name: F(name) + delta for name, delta in zip(HPP_DAGANG_COLUMNS, deltas) if delta},
+        )
+
+
+def _flush_hpp_dagang_refreshes(using):
+    pending = _pending_hpp_dagang.__dict__.pop(using, set())
+    product_ids = defaultdict(set)
+    for report_id, product_id in pending:
+        product_ids[report_id].add(product_id)
+    for report_id, ids in product_ids.items():
+        refresh_hpp_dagang_summary(report_id, ids)
+
+
+def schedule_hpp_dagang_refresh(report_id, product_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Run refresh_hpp_dagang_summary for the given products of ``report_id``
+    once, when the current transaction commits, however many HppEntry/pendapatan
+    rows of theirs it touches (a Product delete cascades to all of them).
+    """
+    pending = _pending_hpp_dagang.__dict__.setdefault(using, set())
+    pending.update((report_id, product_id) for product_id in product_ids if product_id is not None)
+    # Registered on every call, the first one to run drains the set and the rest find it
+    # empty: a rolled back transaction drops its callbacks but not the set, so a single
+    # registration could leave later changes to the same products waiting forever
+    transaction.on_commit(partial(_flush_hpp_dagang_refreshes, using), using=using)
+
+
+def verify_report_summary(report):
+    """Return ``{field: (stored, expected)}`` for every column that drifted."""
+    stored = ReportSummary.objects.filter(report=report).values().first() or {}
+    expected = compute_report_summary(report)
+    return {
+        name: (stored.get(name), value)
+        for name, value in expected.items()
+        if stored.get(name) != value
+    }
@@ -0,0 +1,239 @@
+"""
+Bulk import of pendapatan rows from a CSV or XLSX file.
+
+The file needs a header row; columns are matched by name (see
+``REVENUE_COLUMNS``), so the CSV written by the line-item export can be
+imported back. Every row is validated first, then Products are resolved in
+one query, created in one bulk_create, and the RevenueItems inserted in
+chunks, all in one transaction. bulk_create skips the post_save signals,
+so the completion flags, summary and version are refreshed once at the end.
+"""
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import PurePath
+
+from django.db import transaction
+from openpyxl import load_workbook
+from core.models import Product, RevenueItem
+
+# RevenueItems per INSERT
+IMPORT_BATCH_SIZE = 2000
+
+# Accepted header names (lower case) per field
+REVENUE_COLUMNS = {
+    "revenue_type": ("jenis", "tipe", "revenue_type"),
+    "product": ("produk", "nama produk", "product", "product_name"),
+    "name": ("nama", "keterangan", "name"),
+    "quantity": ("qty", "kuantitas", "quantity"),
+    "selling_price": ("harga", "harga jual", "harga_jual", "selling_price"),
+    "total": ("total",),
+}
+
+REVENUE_TYPES = {"usaha": "usaha", "lain": "lain", "lain-lain": "lain"}
+
+_GROUPED_INT = re.compile(r"^-?\d{1,3}([.,]\d{3})+$")
+_PLAIN_NUMBER = re.compile(r"^-?\d+([.,]\d+)?$")
+
+
+class RevenueImportError(Exception):
+    """The file as a whole cannot be read (format, header)."""
+
+
+@dataclass
+class RevenueImportResult:
+    created: int = 0
+    products_created: int = 0
+    # (row number in the file, message)
+    errors: list = field(default_factory=list)
+
+
+def parse_int_cell(value):
+    """Whole number from a cell: 1500, 1500.0, "1500", "1.500", "1,500", "Rp 1.500"."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    text = str(value).strip().removeprefix("Rp").replace(" ", "")
+    if not text:
+        return None
+    if _GROUPED_INT.match(text):
+        return int(text.replace(".", "").replace(",", ""))
+    # No float(): it rounds past 2**53 and accepts "1e3", "inf" and "nan"
+    if not _PLAIN_NUMBER.match(text):
+        raise ValueError
+    number = Decimal(text.replace(",", "."))
+    if number != number.to_integral_value():
+        raise ValueError
+    return int(number)
+
+
+def _read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield next(csv.reader([sample], dialect), [])
+    yield from csv.reader(text, dialect)
+
+
+def _read_xlsx(file):
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def read_rows(file, filename):
+    """Rows of a CSV or XLSX file as sequences of cell values, header first."""
+    suffix = PurePath(filename).suffix.lower()
+    if suffix == ".csv":
+        return _read_csv(file)
+    if suffix in (".xlsx", ".xlsm"):
+        return _read_xlsx(file)
+    raise RevenueImportError("Format file harus CSV atau XLSX.")
+
+
+def _column_positions(header):
+    names = [str(cell or "").strip().lower() for cell in header]
+    positions = {}
+    for name, aliases in REVENUE_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                positions[name] = names.index(alias)
+                break
+    if "product" not in positions and "name" not in positions:
+        raise RevenueImportError("Kolom 'produk' atau 'nama' tidak ditemukan di baris judul.")
+    return positions
+
+
+def validate_revenue_row(cell):
+    """``(revenue_type, name, quantity, selling_price, total)`` of a row; ValueError with the message otherwise."""
+    revenue_type = REVENUE_TYPES.get(str(cell("revenue_type") or "usaha").lower())
+    if revenue_type is None:
+        raise ValueError("Jenis harus 'usaha' atau 'lain'.")
+
+    try:
+        quantity = parse_int_cell(cell("quantity"))
+        selling_price = parse_int_cell(cell("selling_price"))
+        total = parse_int_cell(cell("total"))
+    except ValueError:
+        raise ValueError("Qty, harga dan total harus bilangan bulat.")
+
+    if revenue_type == "usaha":
+        name = str(cell("product") or cell("name") or "")
+        if not name or not quantity or quantity <= 0 or not selling_price or selling_price <= 0:
+            raise ValueError("Nama produk, kuantitas, dan harga jual harus diisi dengan benar.")
+        # What RevenueItem.save would compute
+        values = ("usaha", name, quantity, selling_price, quantity * selling_price)
+    else:
+        name = str(cell("name") or cell("product") or "")
+        if not name or not total or total <= 0:
+            raise ValueError("Keterangan dan total harus diisi dengan benar.")
+        values = ("lain", name, 1, 0, total)
+
+    if len(name) > 255:
+        raise ValueError("Nama maksimal 255 karakter.")
+    return values
+
+
+def parse_revenue_rows(rows):
+    """
+    Validate the rows (header first). Yields ``(row_number, values, error)``
+    per non-empty row, with exactly one of ``values`` / ``error`` set.
+    """
+    rows = iter(rows)
+    positions = _column_positions(next(rows, None) or [])
+
+    for row_number, row in enumerate(rows, start=2):
+        if not any(value not in (None, "") for value in row):
+            continue
+
+        def cell(name):
+            pos = positions.get(name)
+            if pos is None or pos >= len(row):
+                return None
+            value = row[pos]
+            return value.strip() if isinstance(value, str) else value
+
+        try:
+            yield row_number, validate_revenue_row(cell), None
+        except ValueError as e:
+            yield row_number, None, str(e)
+
+
+def import_revenue_rows(report, rows, skip_invalid=False):
+    """
+    Import the raw ``rows`` (header first) into ``report``. Without
+    ``skip_invalid`` nothing is written when any row is invalid.
+    """
+    result = RevenueImportResult()
+    valid = []
+    for row_number, values, error in parse_revenue_rows(rows):
+        if error is None:
+            valid.append(values)
+        else:
+            result.errors.append((row_number, error))
+    if (result.errors and not skip_invalid) or not valid:
+        return result
+
+    product_names = {name for revenue_type, name, *_rest in valid if revenue_type == "usaha"}
+    with transaction.atomic():
+        product_ids = dict(Product.objects.filter(report=report).values_list("name", "id"))
+        existing = len(product_ids)
+        new_names = product_names - product_ids.keys()
+        if new_names:
+            Product.objects.bulk_create(
+                [Product(report=report, name=name) for name in sorted(new_names)],
+                batch_size=IMPORT_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            # ignore_conflicts does not hand back ids
+            product_ids = dict(Product.objects.filter(report=report).values_list("name", "id"))
+            # nor says which rows it skipped, count what is there now
+            result.products_created = len(product_ids) - existing
+
+        for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+            RevenueItem.objects.bulk_create([
+                RevenueItem(
+                    report=report,
+                    revenue_type=revenue_type,
+                    product_id=product_ids[name] if revenue_type == "usaha" else None,
+                    name=name,
+                    quantity=quantity,
+                    selling_price=selling_price,
+                    total=total,
+                )
+                for revenue_type, name, quantity, selling_price, total in valid[start:start + IMPORT_BATCH_SIZE]
+            ])
+        result.created = len(valid)
+
+        products = [Product(pk=product_ids[name], report=report, name=name) for name in product_names]
+        _refresh_after_import(report, products)
+    return result
+
+
+def _refresh_after_import(report, products):
+    from core.signals import refresh_after_bulk
+    from core.utils.hpp_calculator import seed_hpp_entries
+
+    if products and report.business_type != "manufaktur":
+        seed_hpp_entries(report, products)
+    # Only the imported products' ledgers can have moved
+    refresh_after_bulk(report, [RevenueItem], [product.pk for product in products])
+
+
+def import_revenue_file(report, file, filename, skip_invalid=False):
+    """Import a CSV/XLSX upload (a binary file object) into ``report``."""
+    return import_revenue_rows(report, read_rows(file, filename), skip_invalid)
@@ -0,0 +1,131 @@
+"""
+Roll a report forward into the next period.
+
+The new report gets the same profile and products, and the closing stock
+of the old one becomes its opening stock: the FIFO value of the HppEntry
+AKHIR rows (dagang), or the BB/WIP/FG akhir rows (manufaktur), as AWAL rows.
+Everything is read with a handful of queries and written with bulk_create
+in one transaction, so the cost does not depend on the number of products
+beyond the rows themselves.
+"""
+from django.db import transaction
+from core.models import (
+    FinancialReport, Product, HppEntry,
+    HppManufactureMaterial, HppManufactureWIP, HppManufactureFinishedGoods,
+)
+from core.signals import refresh_after_bulk
+from core.utils.hpp_calculator import calculate_hpp_batch
+
+ROLL_FORWARD_BATCH_SIZE = 2000
+
+MONTHS = (
+    "Januari", "Februari", "Maret", "April", "Mei", "Juni",
+    "Juli", "Agustus", "September", "Oktober", "November", "Desember",
+)
+
+# Profile fields carried over unchanged
+PROFILE_FIELDS = (
+    "company_name", "business_type", "business_status", "umkm_incentive", "omzet_status", "ptkp_status",
+)
+
+# model, akhir type -> awal type, copied fields (besides product, quantity, harga_satuan and total)
+MANUFAKTUR_CARRY_OVER = (
+    (HppManufactureMaterial, "BB_AKHIR", "BB_AWAL", ("nama_bahan_baku",)),
+    (HppManufactureWIP, "WIP_AKHIR", "WIP_AWAL", ()),
+    (HppManufactureFinishedGoods, "FG_AKHIR", "FG_AWAL", ()),
+)
+
+
+def next_period(month, year):
+    """``(month, year)`` after the given one; an unknown month is left for the profile page."""
+    if month not in MONTHS or year is None:
+        return None, year
+    index = MONTHS.index(month) + 1
+    if index == len(MONTHS):
+        return MONTHS[0], int(year) + 1
+    return MONTHS[index], int(year)
+
+
+def _unit_price(total, quantity):
+    """``total / quantity`` rounded half up, in integers: money columns are BigInteger rupiah."""
+    return (total + quantity // 2) // quantity
+
+
+def _opening_note(report):
+    return f"Saldo akhir {report.month} {report.year}" if report.month else "Saldo akhir periode lalu"
+
+
+def _hpp_dagang_awal(report, new_report, product_ids):
+    """
+    AWAL HppEntry rows valued at the FIFO value of the old report's persediaan akhir.
+
+    HppEntry stores a unit price, not a total, and allows one AWAL row per
+    product, so the opening value is ``quantity * round(total_akhir / quantity)``:
+    it differs from the closing FIFO value by at most ``quantity / 2`` rupiah.
+    """
+    rows = []
+    note = _opening_note(report)
+    for product, result in calculate_hpp_batch(report):
+        qty = (result["detail_akhir"] or {}).get("qty", 0)
+        if qty <= 0:
+            continue
+        rows.append(HppEntry(
+            report=new_report, product_id=product_ids[product.name], category="AWAL",
+            quantity=qty, harga_satuan=_unit_price(result["total_akhir"], qty), keterangan=note,
+        ))
+    return rows
+
+
+def _manufaktur_awal(report, new_report, product_ids, old_names):
+    """BB/WIP/FG AWAL rows carrying over the old report's akhir rows, per model."""
+    rows = {}
+    note = _opening_note(report)
+    for model, akhir_type, awal_type, extra_fields in MANUFAKTUR_CARRY_OVER:
+        values = (
+            model.objects.filter(report=report, type=akhir_type, quantity__gt=0)
+            .order_by("id")
+            .values_list("product_id", "quantity", "harga_satuan", "total", *extra_fields)
+        )
+        rows[model] = []
+        for product_id, quantity, harga_satuan, total, *extra in values:
+            if model is not HppManufactureFinishedGoods:
+                # BB and WIP are valued at their unit price; FG akhir keeps its exact FIFO total,
+                # harga_satuan is only its rounded unit price
+                total = quantity * harga_satuan
+            rows[model].append(model(
+                report=new_report, product_id=product_ids[old_names[product_id]], type=awal_type,
+                quantity=quantity, harga_satuan=_unit_price(total, quantity), total=total, keterangan=note,
+                **dict(zip(extra_fields, extra)),
+            ))
+    return rows
+
+
+def roll_forward_report(report):
+    """
+    Create the next period's report from ``report`` with its products and
+    opening stock. Returns the new FinancialReport.
+    """
+    month, year = next_period(report.month, report.year)
+    products = list(Product.objects.filter(report=report).order_by("id").values_list("id", "name"))
+    old_names = dict(products)
+
+    with transaction.atomic():
+        new_report = FinancialReport.objects.create(
+            user_id=report.user_id, month=month, year=year,
+            **{name: getattr(report, name) for name in PROFILE_FIELDS},
+        )
+        Product.objects.bulk_create(
+            [Product(report=new_report, name=name) for _id, name in products], batch_size=ROLL_FORWARD_BATCH_SIZE
+        )
+        product_ids = dict(Product.objects.filter(report=new_report).values_list("name", "id"))
+
+        if report.business_type == "manufaktur":
+            created = _manufaktur_awal(report, new_report, product_ids, old_names)
+        else:
+            created = {HppEntry: _hpp_dagang_awal(report, new_report, product_ids)}
+        for model, rows in created.items():
+            model.objects.bulk_create(rows, batch_size=ROLL_FORWARD_BATCH_SIZE)
+
+        refresh_after_bulk(new_report, list(created))
+    return new_report
+
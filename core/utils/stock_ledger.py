@@ -0,0 +1,234 @@
+"""
+Per-product stock ledger with running balances.
+
+StockMovement holds every change to a product's quantity on hand with the
+balance after it. StockBalance is the snapshot at the end of the report's
+period, so the quantity on hand is one indexed lookup instead of
+re-aggregating HppEntry and RevenueItem on every request.
+
+The sources are HppEntry AWAL/PEMBELIAN rows for dagang reports and the
+Barang Jadi Awal / Barang Diproduksi rows for manufaktur reports, plus the
+pendapatan usaha rows. The ledger is perpetual: a new source row appends
+its movements and moves the balance by their sum (record_stock_movements).
+Editing or deleting a source row rewrites history, so the product's ledger
+is rebuilt from the source rows instead, as it is once per report by the
+bulk paths and by ``manage.py backfill_stock_ledger`` for existing reports.
+
+Appended movements are in recording order; a rebuild lays them out in
+ledger order (awal, each pembelian and its retur, produksi, each
+penjualan). The running balances in between may differ, the final
+balance does not.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from core.models import (
+    Product, RevenueItem, HppEntry, HppManufactureProduction, HppManufactureFinishedGoods,
+    StockMovement, StockBalance,
+)
+
+STOCK_BATCH_SIZE = 2000
+
+BALANCE_FIELDS = [
+    "report", "quantity_awal", "quantity_in", "quantity_retur", "quantity_out", "quantity", "movement_count",
+    "updated_at",
+]
+
+
+def affects_stock(instance):
+    """True when a saved/deleted row is one of the ledger's sources."""
+    if isinstance(instance, HppEntry):
+        return instance.category != "AKHIR"
+    if isinstance(instance, RevenueItem):
+        return instance.product_id is not None
+    if isinstance(instance, HppManufactureFinishedGoods):
+        return instance.type == "FG_AWAL"
+    return isinstance(instance, HppManufactureProduction)
+
+
+STOCK_SOURCE_MODELS = (HppEntry, RevenueItem, HppManufactureFinishedGoods, HppManufactureProduction)
+
+# StockBalance column each movement kind adds to, and its sign there
+BALANCE_COLUMNS = {
+    "AWAL": ("quantity_awal", 1),
+    "PEMBELIAN": ("quantity_in", 1),
+    "PRODUKSI": ("quantity_in", 1),
+    "RETUR": ("quantity_retur", -1),
+    "PENJUALAN": ("quantity_out", -1),
+}
+
+
+def _row_movements(business_type, instance):
+    """``[(kind, signed quantity)]`` one source row adds to its product's ledger."""
+    moves = []
+    if isinstance(instance, RevenueItem):
+        if instance.revenue_type == "usaha" and instance.product_id is not None:
+            moves = [("PENJUALAN", -instance.quantity)]
+    elif business_type == "manufaktur":
+        if isinstance(instance, HppManufactureFinishedGoods) and instance.type == "FG_AWAL":
+            moves = [("AWAL", instance.quantity)]
+        elif isinstance(instance, HppManufactureProduction):
+            moves = [("PRODUKSI", instance.qty_diproduksi or 0)]
+    elif isinstance(instance, HppEntry):
+        if instance.category == "AWAL":
+            moves = [("AWAL", instance.quantity)]
+        elif instance.category == "PEMBELIAN":
+            moves = [("PEMBELIAN", instance.quantity), ("RETUR", -instance.retur_qty)]
+    return [move for move in moves if move[1]]
+
+
+def _source_movements(report, product_ids=None):
+    """``{product_id: [(kind, signed quantity)]}`` in ledger order, in four queries at most."""
+    def rows(queryset, *fields):
+        if product_ids is not None:
+            queryset = queryset.filter(product_id__in=product_ids)
+        return queryset.order_by("product_id", "id").values_list("product_id", *fields)
+
+    awal, masuk, keluar = defaultdict(list), defaultdict(list), defaultdict(list)
+    if report.business_type == "manufaktur":
+        for product_id, quantity in rows(
+            HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AWAL"), "quantity"
+        ):
+            awal[product_id].append(("AWAL", quantity))
+        for product_id, quantity in rows(HppManufactureProduction.objects.filter(report=report), "qty_diproduksi"):
+            masuk[product_id].append(("PRODUKSI", quantity or 0))
+    else:
+        for product_id, category, quantity, retur_qty in rows(
+            HppEntry.objects.filter(report=report, category__in=("AWAL", "PEMBELIAN")),
+            "category", "quantity", "retur_qty",
+        ):
+            if category == "AWAL":
+                awal[product_id].append(("AWAL", quantity))
+            else:
+                masuk[product_id] += [("PEMBELIAN", quantity), ("RETUR", -retur_qty)]
+    for product_id, quantity in rows(
+        RevenueItem.objects.filter(report=report, revenue_type="usaha", product__isnull=False), "quantity"
+    ):
+        keluar[product_id].append(("PENJUALAN", -quantity))
+
+    return {
+        product_id: [move for move in awal[product_id] + masuk[product_id] + keluar[product_id] if move[1]]
+        for product_id in awal.keys() | masuk.keys() | keluar.keys()
+    }
+
+
+def _compute_ledger(report, product_ids=None):
+    """Unsaved ``(movements, {product_id: StockBalance})`` of the given products, from the source rows."""
+    products = Product.objects.filter(report=report)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    sources = _source_movements(report, product_ids)
+
+    movements, balances = [], {}
+    for product_id in products.order_by("id").values_list("id", flat=True):
+        balance = StockBalance(report=report, product_id=product_id)
+        for sequence, (kind, quantity) in enumerate(sources.get(product_id, ()), start=1):
+            balance.quantity += quantity
+            column, sign = BALANCE_COLUMNS[kind]
+            setattr(balance, column, getattr(balance, column) + sign * quantity)
+            movements.append(StockMovement(
+                report=report, product_id=product_id, sequence=sequence, kind=kind,
+                quantity=quantity, balance=balance.quantity,
+            ))
+            balance.movement_count = sequence
+        balances[product_id] = balance
+    return movements, balances
+
+
+def rebuild_stock_ledger(report, product_ids=None):
+    """
+    Rebuild the movements and balance of the given products of ``report``
+    (default: all of them) from the source rows. Returns the balances as
+    ``{product_id: StockBalance}``.
+    """
+    if product_ids is not None:
+        product_ids = [product_id for product_id in product_ids if product_id is not None]
+    movements, balances = _compute_ledger(report, product_ids)
+
+    with transaction.atomic():
+        stale = StockMovement.objects.filter(report=report)
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=product_ids)
+        # The ledger has no signals and nothing points at its rows, so this is a single DELETE
+        stale.delete()
+        StockMovement.objects.bulk_create(movements, batch_size=STOCK_BATCH_SIZE)
+        StockBalance.objects.bulk_create(
+            balances.values(), batch_size=STOCK_BATCH_SIZE,
+            update_conflicts=True, unique_fields=["product"], update_fields=BALANCE_FIELDS,
+        )
+    return balances
+
+
+def record_stock_movements(instance):
+    """
+    Append the movements of a newly created source row to its product's
+    ledger and move the balance by them, without reading its history.
+    A product with no balance yet gets its ledger built instead.
+    """
+    report = instance.report
+    moves = _row_movements(report.business_type, instance)
+    if not moves:
+        return
+
+    with transaction.atomic():
+        balances = StockBalance.objects.select_for_update().filter(product_id=instance.product_id)
+        current = balances.values_list("quantity", "movement_count").first()
+        if current is None:
+            rebuild_stock_ledger(report, [instance.product_id])
+            return
+
+        quantity, sequence = current
+        movements, deltas = [], defaultdict(int)
+        for kind, moved in moves:
+            quantity += moved
+            sequence += 1
+            column, sign = BALANCE_COLUMNS[kind]
+            deltas[column] += sign * moved
+            deltas["quantity"] += moved
+            movements.append(StockMovement(
+                report=report, product_id=instance.product_id, sequence=sequence, kind=kind,
+                quantity=moved, balance=quantity,
+            ))
+        StockMovement.objects.bulk_create(movements)
+        balances.update(
+            movement_count=F("movement_count") + len(movements), updated_at=timezone.now(),
+            **{column: F(column) + delta for column, delta in deltas.items()},
+        )
+
+
+def verify_stock_ledger(report):
+    """Return ``{product_id: (stored quantity, expected quantity)}`` for every balance that drifted or is missing."""
+    _movements, expected = _compute_ledger(report)
+    stored = dict(StockBalance.objects.filter(report=report).values_list("product_id", "quantity"))
+    return {
+        product_id: (stored.get(product_id), balance.quantity)
+        for product_id, balance in expected.items()
+        if stored.get(product_id) != balance.quantity
+    }
+
+
+def stock_balances(report, product_ids=None):
+    """
+    ``{product_id: StockBalance}`` of the given products (default: all),
+    building the ledger of products that have none yet (reports that predate it).
+    """
+    balances = StockBalance.objects.filter(report=report)
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        balances = balances.filter(product_id__in=product_ids)
+    balances = {balance.product_id: balance for balance in balances}
+
+    if product_ids is None:
+        missing = set(Product.objects.filter(report=report).values_list("id", flat=True)) - balances.keys()
+    else:
+        missing = product_ids - balances.keys()
+    if missing:
+        balances.update(rebuild_stock_ledger(report, missing))
+    return balances
+
+
+def stock_on_hand(report, product_ids=None):
+    """``{product_id: quantity on hand}`` at the end of the report's period."""
+    return {product_id: balance.quantity for product_id, balance in stock_balances(report, product_ids).items()}
@@ -1,11 +1,16 @@
+import json
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.db.models import Sum, F
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
-from .models import FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_POST
+from .models import FinancialReport, Product, RevenueItem, HppEntry, ExpenseItem, ExportJob
 from .models import (
     HppManufactureMaterial,
     HppManufactureLabor,
@@ -14,52 +19,25 @@ from .models import (
     HppManufactureProduction,
     HppManufactureFinishedGoods,
 )
-from core.utils.hpp_calculator import calculate_hpp_for_product, to_int, to_number, save_barang_diproduksi
-from core.utils.final_report import generate_final_report_data
-from core.utils.excel_exporter import generate_excel_file
-from core.utils.pdf_exporter import generate_pdf_file
-from core.utils.final_report import get_manufaktur_report_context
-
-
-def get_completion_status(report):
-    status = {
-        "profile": False,
-        "pendapatan": False,
-        "hpp": False,
-        "beban_usaha": False,
-    }
-
-    if report and report.company_name and report.business_type:
-        status["profile"] = True
-
-    if status["profile"] and report.revenue_items.filter(revenue_type="usaha").exists():
-        status["pendapatan"] = True
-
-    if status["pendapatan"]:
-        if report.business_type == "manufaktur":
-            if (
-                report.hpp_manufaktur_materials.exists()
-                and report.hpp_manufaktur_wip.exists()
-                and report.hpp_manufaktur_labor.exists()
-                and report.hpp_manufaktur_overhead.exists()
-                and report.hpp_manufaktur_fg.exists()
-                and report.hpp_manufaktur_production.exists()
-            ):
-                status["hpp"] = True
-        else:
-            if report.hpp_entries.exists():
-                status["hpp"] = True
-
-    if status['hpp']:
-        if report.business_type == 'manufaktur':
-            from core.models import ExpenseItem
-            if ExpenseItem.objects.filter(report=report, expense_category='usaha').exists():
-                status['beban_usaha'] = True
-        else:
-            if report.expense_items.filter(expense_category='usaha').exists():
-                status['beban_usaha'] = True
-
-    return status
+from core.utils.hpp_calculator import calculate_hpp_columns, hpp_columns, to_int, to_number
+from core.utils.hpp_calculator import refresh_barang_diproduksi, value_finished_goods_akhir
+from core.utils.hpp_calculator import seed_hpp_entries, sync_hpp_entries
+from core.utils.report_cache import get_report_result
+from core.utils.excel_exporter import XLSX_CONTENT_TYPE, excel_filename
+from core.utils.pdf_exporter import pdf_filename
+from core.utils.artifact_store import artifact_key, get_or_render_artifact
+from core.utils.bulk_export import stream_bulk_export
+from core.utils.line_item_export import LINE_ITEM_FORMATS, LINE_ITEM_TABLES, iter_line_items
+from core.utils.line_item_batch import LineItemBatchError, apply_line_item_batch, line_item_batch_payload
+from core.utils.revenue_import import RevenueImportError, import_revenue_file
+from core.utils.roll_forward import roll_forward_report
+from core.utils.stock_ledger import rebuild_stock_ledger, stock_balances
+from core.utils.manufaktur_import import ManufakturImportError, import_manufaktur_workbook
+from core.utils.pdf_pool import PdfRenderUnavailable, get_pdf_pool
+from core.utils.export_jobs import EXPORT_KINDS, enqueue_export, export_job_payload
+from core.utils.final_report import load_report_totals
+from core.utils.completion import get_completion_status
+from core.utils.report_summary import rebuild_report_summary
 
 
 def landing_page_view(request):
@@ -97,8 +75,12 @@ def report_list(request):
                 messages.success(request, "Laporan berhasil dihapus.")
             return redirect("core:report_list")
 
-    reports = FinancialReport.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'core/pages/report_list.html', {'reports': reports})
+    reports = list(FinancialReport.objects.filter(user=request.user).select_related('summary').order_by('-created_at'))
+    for report in reports:
+        if not hasattr(report, 'summary'):
+            report.summary = rebuild_report_summary(report)
+    years = sorted({report.year for report in reports if report.year}, reverse=True)
+    return render(request, 'core/pages/report_list.html', {'reports': reports, 'years': years})
 
 
 @login_required(login_url='core:login')
@@ -108,12 +90,28 @@ def create_report(request):
     return redirect('core:profile', report_id=report.id)
 
 
+@login_required(login_url='core:login')
+@require_POST
+def roll_forward(request, report_id):
+    """New report for the next period with this report's products and closing stock as opening stock."""
+    report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
+    new_report = roll_forward_report(report)
+    period = f"{new_report.month} {new_report.year}" if new_report.month else "periode berikutnya"
+    messages.success(
+        request,
+        f"Laporan {period} berhasil dibuat dengan produk dan persediaan awal dari laporan sebelumnya. "
+        "Silakan periksa profil perusahaan.",
+    )
+    return redirect('core:profile', report_id=new_report.id)
+
+
 @login_required(login_url='core:login')
 def profile_view(request, report_id):
     report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
     completion_status = get_completion_status(report)
 
     if request.method == 'POST':
+        old_business_type = report.business_type
         report.company_name = request.POST.get("company_name")
         report.month = request.POST.get("month")
         report.year = request.POST.get("year")
@@ -123,6 +121,10 @@ def profile_view(request, report_id):
         report.ptkp_status = request.POST.get("ptkp_status")
         report.omzet_status = request.POST.get("omzet_status")
         report.save()
+        if report.business_type != old_business_type:
+            # The stock ledger and summary are built from the other business type's rows
+            rebuild_stock_ledger(report)
+            rebuild_report_summary(report)
         messages.success(request, 'Profil perusahaan berhasil disimpan!')
         
         return redirect('core:pendapatan', report_id=report.id)
@@ -168,6 +170,8 @@ def pendapatan_view(request, report_id):
                             quantity=quantity,
                             selling_price=selling_price
                         )
+                        if report.business_type != 'manufaktur':
+                            seed_hpp_entries(report, [product])
                         messages.success(request, f'Pendapatan usaha "{product_name}" berhasil ditambahkan.')
 
                 elif data_type == 'lain':
@@ -188,6 +192,31 @@ def pendapatan_view(request, report_id):
             except Exception as e:
                 messages.error(request, f'Terjadi kesalahan: {e}')
 
+        elif action == 'import':
+            upload = request.FILES.get('import_file')
+            if upload is None:
+                messages.error(request, 'Pilih file CSV atau XLSX yang akan diimpor.')
+            else:
+                try:
+                    result = import_revenue_file(
+                        report, upload, upload.name, skip_invalid=bool(request.POST.get('skip_invalid'))
+                    )
+                except RevenueImportError as e:
+                    messages.error(request, str(e))
+                except Exception as e:
+                    messages.error(request, f'Gagal mengimpor file: {e}')
+                else:
+                    for row_number, error in result.errors[:10]:
+                        messages.error(request, f'Baris {row_number}: {error}')
+                    if len(result.errors) > 10:
+                        messages.error(request, f'... dan {len(result.errors) - 10} baris lain tidak valid.')
+                    if result.created:
+                        messages.success(request, f'{result.created} baris pendapatan berhasil diimpor.')
+                    elif result.errors:
+                        messages.warning(request, 'Tidak ada data yang diimpor. Perbaiki baris di atas lalu coba lagi.')
+                    else:
+                        messages.warning(request, 'File tidak berisi baris pendapatan.')
+
         elif action == 'edit_revenue_item':
             try:
                 item_id = int(request.POST.get('item_id', -1))
@@ -214,6 +243,8 @@ def pendapatan_view(request, report_id):
                         item.selling_price = selling_price
                         item.total = quantity * selling_price
                         item.save(update_fields=['product', 'quantity', 'selling_price', 'total'])
+                        if report.business_type != 'manufaktur':
+                            seed_hpp_entries(report, [product])
                         
                         messages.success(request, f'Pendapatan usaha "{product_name}" berhasil diubah.')
 
@@ -248,6 +279,7 @@ def pendapatan_view(request, report_id):
                 messages.error(request, f'Gagal menghapus item: {e}')
 
         if 'next_step' in request.POST:
+            report.refresh_from_db(fields=['completion_flags'])
             completion_status = get_completion_status(report)
             if not completion_status['pendapatan']:
                  messages.warning(request, 'Harap tambahkan minimal satu pendapatan usaha sebelum melanjutkan.')
@@ -297,47 +329,7 @@ def hpp_dagang_view(request, report_id):
     report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
     completion_status = get_completion_status(report)
 
-    products = (
-        Product.objects
-        .filter(report=report, revenue_entries__revenue_type="usaha")
-        .prefetch_related("revenue_entries")
-        .distinct()
-    )
-
-    for product in products:
-        for category in ['AWAL', 'PEMBELIAN', 'AKHIR']:
-            HppEntry.objects.get_or_create(
-                report=report,
-                product=product,
-                category=category,
-                defaults={'keterangan': ''}
-            )
-
-    for product in products:
-        try:
-            awal = HppEntry.objects.filter(report=report, product=product, category='AWAL').first()
-            qty_awal = awal.quantity if awal else 0
-            keterangan_awal = awal.keterangan if awal else '-'
-            
-            pembelian_list = HppEntry.objects.filter(report=report, product=product, category='PEMBELIAN')
-            qty_pembelian_neto = sum(p.quantity - p.retur_qty for p in pembelian_list)
-            
-            revenue_data = RevenueItem.objects.filter(report=report, product=product, revenue_type='usaha').aggregate(total_sold=Sum('quantity'))
-            qty_terjual = revenue_data['total_sold'] or 0
-            
-            qty_akhir_calc = qty_awal + qty_pembelian_neto - qty_terjual
-            
-            HppEntry.objects.update_or_create(
-                report=report,
-                product=product,
-                category='AKHIR',
-                defaults={
-                    'quantity': qty_akhir_calc,
-                    'keterangan' : keterangan_awal
-                    }
-            )
-        except Exception as e:
-            messages.error(request, f"Gagal menghitung Qty Akhir untuk {product.name}: {e}")
+    products, hpp_data_by_product = sync_hpp_entries(report)
 
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -369,25 +361,23 @@ def hpp_dagang_view(request, report_id):
             except Exception as e:
                 messages.error(request, f"Gagal menyimpan data HPP: {e}")
 
+            products, hpp_data_by_product = sync_hpp_entries(report)
+
         elif 'next_step' in request.POST:
             invalid_found = False
             invalid_products = []
 
-            for product in products:
-                try:
-                    awal = HppEntry.objects.filter(report=report, product=product, category='AWAL').first()
-                    pembelian = HppEntry.objects.filter(report=report, product=product, category='PEMBELIAN')
-                    akhir = HppEntry.objects.filter(report=report, product=product, category='AKHIR').first()
+            for product, entries in hpp_data_by_product.items():
+                awal = entries['AWAL']
+                akhir = entries['AKHIR']
 
-                    qty_awal = awal.quantity if awal else 0
-                    qty_pembelian = sum(p.quantity for p in pembelian)
-                    qty_akhir = akhir.quantity if akhir else 0
+                qty_awal = awal.quantity if awal else 0
+                qty_pembelian = sum(p.quantity for p in entries['PEMBELIAN'])
+                qty_akhir = akhir.quantity if akhir else 0
 
-                    if qty_akhir > (qty_awal + qty_pembelian):
-                        invalid_found = True
-                        invalid_products.append(product.name)
-                except Exception:
-                    continue
+                if qty_akhir > (qty_awal + qty_pembelian):
+                    invalid_found = True
+                    invalid_products.append(product.name)
 
             if invalid_found:
                 msg = "Tidak dapat melanjutkan: Periksa Kembali Catatan Penjualan/Persediaan Akhir."
@@ -401,20 +391,11 @@ def hpp_dagang_view(request, report_id):
             return redirect('core:beban_usaha', report_id=report.id)
 
 
-    hpp_data_by_product = {}
-    for product in products:
-        entries = HppEntry.objects.filter(product=product, report=report)
-        hpp_data_by_product[product] = {
-            'AWAL': entries.filter(category='AWAL').first(),
-            'PEMBELIAN': entries.filter(category='PEMBELIAN'),
-            'AKHIR': entries.filter(category='AKHIR').first(),
-        }
-
     grand_total_awal = grand_total_pembelian = grand_total_akhir = grand_total_barang_tersedia = grand_hpp = 0
     calculation_details = {}
 
-    for product, entries in hpp_data_by_product.items():
-        result = calculate_hpp_for_product(product, entries)
+    results = calculate_hpp_columns(hpp_columns(hpp_data_by_product.items()))
+    for product, result in zip(hpp_data_by_product, results):
         calculation_details[product.id] = result
         grand_total_awal += result['total_awal']
         grand_total_pembelian += result['total_pembelian_neto']
@@ -443,8 +424,8 @@ def hpp_manufaktur_view(request, report_id):
     products = Product.objects.filter(report=report)
 
     # --- 1. LOAD DATA PRODUKSI DARI DB  ---
-    existing_production = HppManufactureProduction.objects.filter(report=report)
-    production_map = {p.product.id: p for p in existing_production}
+    existing_production = HppManufactureProduction.objects.filter(report=report).select_related('product')
+    production_map = {p.product_id: p for p in existing_production}
 
     if request.method == "POST":
         action = request.POST.get("action")
@@ -471,6 +452,35 @@ def hpp_manufaktur_view(request, report_id):
 
             return redirect(f"{reverse('core:hpp_manufaktur', args=[report.id])}#produksi-anchor")
 
+        # === IMPOR WORKBOOK ===
+        if action == "import":
+            upload = request.FILES.get("import_file")
+            if upload is None:
+                messages.error(request, "Pilih file XLSX yang akan diimpor.")
+            else:
+                try:
+                    result = import_manufaktur_workbook(
+                        report, upload, skip_invalid=bool(request.POST.get("skip_invalid"))
+                    )
+                except ManufakturImportError as e:
+                    messages.error(request, str(e))
+                except Exception as e:
+                    messages.error(request, f"Gagal mengimpor file: {e}")
+                else:
+                    for sheet, row_number, error in result.errors[:10]:
+                        messages.error(request, f"{sheet} baris {row_number}: {error}")
+                    if len(result.errors) > 10:
+                        messages.error(request, f"... dan {len(result.errors) - 10} baris lain tidak valid.")
+                    created = sum(result.created.values())
+                    if created:
+                        messages.success(request, f"{created} baris HPP manufaktur berhasil diimpor.")
+                    elif result.errors:
+                        messages.warning(request, "Tidak ada data yang diimpor. Perbaiki baris di atas lalu coba lagi.")
+                    else:
+                        messages.warning(request, "Workbook tidak berisi baris HPP manufaktur.")
+
+            return redirect("core:hpp_manufaktur", report_id=report.id)
+
         # --- BAHAN BAKU ---
         if action == "add_bb":
             product_id = request.POST.get("product_id")
@@ -680,7 +690,12 @@ def hpp_manufaktur_view(request, report_id):
         if action in ["add_fg", "edit_fg"]:
             item_id = request.POST.get("item_id")
             tipe_data = request.POST.get("tipe_data")
-            product_id = request.POST.get("product_id")
+            product_id = Product.objects.filter(
+                report=report, pk=to_int(request.POST.get("product_id"))
+            ).values_list("id", flat=True).first()
+            if product_id is None:
+                messages.error(request, "Produk tidak ditemukan di laporan ini.")
+                return redirect(f"{reverse('core:hpp_manufaktur', args=[report.id])}#bj-anchor")
             qty = to_int(request.POST.get("kuantitas"))
             harga_satuan_manual = to_int(request.POST.get("harga_satuan")) 
             keterangan = request.POST.get("keterangan", "")
@@ -696,52 +711,17 @@ def hpp_manufaktur_view(request, report_id):
                 qty_awal = to_int(bj_awal_item.quantity) if bj_awal_item else 0
                 harga_awal = to_int(bj_awal_item.harga_satuan) if bj_awal_item else 0
 
-                prod_item = production_map.get(int(product_id))
+                prod_item = production_map.get(product_id)
                 qty_produksi = to_int(prod_item.qty_diproduksi) if prod_item else 0
                 total_biaya_produksi = to_int(prod_item.total_produksi) if prod_item else 0
 
-                revenue_sold = RevenueItem.objects.filter(
-                    report=report, product_id=product_id, revenue_type='usaha'
-                ).aggregate(Sum('quantity'))['quantity__sum'] or 0
-                qty_penjualan = to_int(revenue_sold)
+                qty_penjualan = stock_balances(report, [product_id])[product_id].quantity_out
 
-                stok_seharusnya = qty_awal + qty_produksi - qty_penjualan
-                
                 if qty < 0: qty = 0
 
-                if qty > stok_seharusnya:
-                    status = "Periksa Kembali: Stok Akhir melebihi (Awal + Produksi - Penjualan)"
-                    total = 0 
-                else:
-                    if (qty_penjualan - qty_awal) < 0:
-                        
-                        sisa_nilai_awal = (qty_awal - qty_penjualan) * harga_awal
-                        
-                        total = sisa_nilai_awal + total_biaya_produksi
-                        
-                    else:
-                        
-                        total_nilai_awal = qty_awal * harga_awal
-                        modal_tersedia = total_nilai_awal + total_biaya_produksi
-                        
-                        hpp_stok_lama = total_nilai_awal
-                        
-                        if qty_produksi > 0:
-                            harga_prod_per_unit = total_biaya_produksi / qty_produksi
-                        else:
-                            harga_prod_per_unit = 0
-                            
-                        qty_ambil_baru = qty_penjualan - qty_awal
-                        hpp_stok_baru = qty_ambil_baru * harga_prod_per_unit
-                        
-                        total = modal_tersedia - hpp_stok_lama - hpp_stok_baru
-
-                    status = "OK"
-
-                if qty > 0:
-                    harga_satuan_final = total / qty
-                else:
-                    harga_satuan_final = 0
+                total, harga_satuan_final, status = value_finished_goods_akhir(
+                    qty, qty_awal, harga_awal, qty_produksi, total_biaya_produksi, qty_penjualan
+                )
 
             tipe_db = "FG_AWAL" if tipe_data == "AWAL_BJ" else "FG_AKHIR"
             
@@ -784,19 +764,17 @@ def hpp_manufaktur_view(request, report_id):
 
     # --- VIEW DISPLAY LOGIC ---
     
-    bb_awal = HppManufactureMaterial.objects.filter(report=report, type="BB_AWAL")
-    bb_pembelian = HppManufactureMaterial.objects.filter(report=report, type="BB_PEMBELIAN")
-    bb_akhir = HppManufactureMaterial.objects.filter(report=report, type="BB_AKHIR")
-    bdp_awal = HppManufactureWIP.objects.filter(report=report, type="WIP_AWAL")
-    bdp_akhir = HppManufactureWIP.objects.filter(report=report, type="WIP_AKHIR")
-    btkl_items = HppManufactureLabor.objects.filter(report=report)
-    bop_items = HppManufactureOverhead.objects.filter(report=report)
-    bj_awal = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AWAL")
-    bj_akhir = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AKHIR")
+    bb_awal = HppManufactureMaterial.objects.filter(report=report, type="BB_AWAL").select_related("product")
+    bb_pembelian = HppManufactureMaterial.objects.filter(report=report, type="BB_PEMBELIAN").select_related("product")
+    bb_akhir = HppManufactureMaterial.objects.filter(report=report, type="BB_AKHIR").select_related("product")
+    bdp_awal = HppManufactureWIP.objects.filter(report=report, type="WIP_AWAL").select_related("product")
+    bdp_akhir = HppManufactureWIP.objects.filter(report=report, type="WIP_AKHIR").select_related("product")
+    btkl_items = HppManufactureLabor.objects.filter(report=report).select_related("product")
+    bop_items = HppManufactureOverhead.objects.filter(report=report).select_related("product")
+    bj_awal = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AWAL").select_related("product")
+    bj_akhir = HppManufactureFinishedGoods.objects.filter(report=report, type="FG_AKHIR").select_related("product")
 
     def grouped_totals(queryset):
-        if not queryset.exists():
-            return []
         return (
             queryset.values("product", product_name=F("product__name"))
             .annotate(total=Sum("total"))
@@ -813,153 +791,41 @@ def hpp_manufaktur_view(request, report_id):
     totals_bj_awal_per_produk = grouped_totals(bj_awal)
     totals_bj_akhir_per_produk = grouped_totals(bj_akhir)
 
-    # Helper Map
-    def map_totals(qs):
-        return {row["product"]: row["total"] for row in qs}
-    
-    def map_qty(qs):
-        return {row["product"]: row["qty"] for row in qs}
-
-    bb_awal_map = map_totals(totals_awal_per_produk)
-    bb_pembelian_map = map_totals(totals_pembelian_per_produk)
-    bb_akhir_map = map_totals(totals_akhir_per_produk)
-    bdp_awal_map = map_totals(totals_bdp_awal_per_produk)
-    bdp_akhir_map = map_totals(totals_bdp_akhir_per_produk)
-    btkl_map = map_totals(totals_btkl_per_produk)
-    bop_map = map_totals(totals_bop_per_produk)
-
-    bdp_awal_qty = (
-        bdp_awal.values("product")
-        .annotate(qty=Sum("quantity"))
-    )
-
-    bdp_akhir_qty = (
-        bdp_akhir.values("product")
-        .annotate(qty=Sum("quantity"))
-    )
-
-    bdp_awal_qty_map = map_qty(bdp_awal_qty)
-    bdp_akhir_qty_map = map_qty(bdp_akhir_qty)
-
-    barang_diproduksi_list = []
-    
-    product_ids = set(bb_awal_map.keys()) | set(bb_pembelian_map.keys()) | set(bb_akhir_map.keys()) | set(production_map.keys()) | set(bdp_awal_map.keys()) | set(bdp_akhir_map.keys())
-
-    for p in products:
-        product_ids.add(p.id)
-
-    for pid in product_ids:
-        product = Product.objects.filter(id=pid).first()
-        if not product:
-            continue
-
-        total_biaya_produksi = (
-            (bb_awal_map.get(pid, 0) + bb_pembelian_map.get(pid, 0) - bb_akhir_map.get(pid, 0))
-            + (bdp_awal_map.get(pid, 0) - bdp_akhir_map.get(pid, 0))
-            + btkl_map.get(pid, 0)
-            + bop_map.get(pid, 0)
-        )
-
-        # 1) Auto-calc default produksi (BDP akhir - BDP awal)
-        qty_auto = bdp_akhir_qty_map.get(pid, 0) - bdp_awal_qty_map.get(pid, 0)
-        # if qty_auto < 0:
-        #     qty_auto = 0
-
-
-        # 2) Check if DB has a previous manual override
-        prod_item = production_map.get(pid)
-
-        if prod_item and (prod_item.qty_diproduksi is not None) and int(prod_item.qty_diproduksi) != 0:
-            qty_diproduksi = int(prod_item.qty_diproduksi)  # manual override
-        else:
-            qty_diproduksi = qty_auto  # auto value
-
-        # 3) HPP per unit
-        hpp_per_unit = (total_biaya_produksi / qty_diproduksi) if qty_diproduksi > 0 else 0
-
-        barang_diproduksi_list.append({
-            "product_name": product.name,
-            "product_id": product.id,
-            "qty_diproduksi": qty_diproduksi,
-            "total_produksi": total_biaya_produksi,
-            "hpp_per_unit": hpp_per_unit,
-        })
-
-    # Save into DB but respect manual overrides inside save function
-    save_barang_diproduksi(report, barang_diproduksi_list)
-
-    # After save, fetch fresh queryset for template (template expects objects with ids for modals)
-    barang_diproduksi_list_objects = HppManufactureProduction.objects.filter(
-        report=report
-    ).select_related('product').order_by('product__name')   
-
     # SUMS
+    totals = load_report_totals(
+        report,
+        bb_awal=HppManufactureMaterial.objects.filter(type="BB_AWAL"),
+        bb_pembelian=HppManufactureMaterial.objects.filter(type="BB_PEMBELIAN"),
+        bb_akhir=HppManufactureMaterial.objects.filter(type="BB_AKHIR"),
+        bdp_awal=HppManufactureWIP.objects.filter(type="WIP_AWAL"),
+        bdp_akhir=HppManufactureWIP.objects.filter(type="WIP_AKHIR"),
+        btkl=HppManufactureLabor.objects.all(),
+        bop=HppManufactureOverhead.objects.all(),
+        bj_awal=HppManufactureFinishedGoods.objects.filter(type="FG_AWAL"),
+        bj_akhir=HppManufactureFinishedGoods.objects.filter(type="FG_AKHIR"),
+    )
 
-    total_bahan_baku_awal = bb_awal.aggregate(Sum('total'))['total__sum'] or 0
-    total_bahan_baku_pembelian = bb_pembelian.aggregate(Sum('total'))['total__sum'] or 0
-    total_bahan_baku_akhir = bb_akhir.aggregate(Sum('total'))['total__sum'] or 0
-    total_bdp_awal = bdp_awal.aggregate(Sum('total'))['total__sum'] or 0
-    total_bdp_akhir = bdp_akhir.aggregate(Sum('total'))['total__sum'] or 0
-    total_btkl = btkl_items.aggregate(Sum('total'))['total__sum'] or 0
-    total_bop = bop_items.aggregate(Sum('total'))['total__sum'] or 0
-    total_bj_awal = bj_awal.aggregate(Sum('total'))['total__sum'] or 0
-    total_bj_akhir = bj_akhir.aggregate(Sum('total'))['total__sum'] or 0
+    total_bahan_baku_awal = totals["bb_awal"]
+    total_bahan_baku_pembelian = totals["bb_pembelian"]
+    total_bahan_baku_akhir = totals["bb_akhir"]
+    total_bdp_awal = totals["bdp_awal"]
+    total_bdp_akhir = totals["bdp_akhir"]
+    total_btkl = totals["btkl"]
+    total_bop = totals["bop"]
+    total_bj_awal = totals["bj_awal"]
+    total_bj_akhir = totals["bj_akhir"]
     total_bj_akhir_calc = sum(getattr(x, "total", 0) for x in bj_akhir)
 
-    # ==============================
-    #  HITUNG ALOKASI BOP PER PRODUK
-    # ==============================
-    total_qty_produksi = sum(x.qty_diproduksi for x in barang_diproduksi_list_objects)
-
-    bop_per_produk = {}
-
-    for item in barang_diproduksi_list_objects:
-        if total_qty_produksi > 0:
-            bop_alloc = total_bop * (item.qty_diproduksi / total_qty_produksi)
-        else:
-            bop_alloc = 0
-
-        bop_per_produk[item.product.name] = round(bop_alloc)
-
-    # ===============================================
-    #   HITUNG HARGA SATUAN PRODUK (BOP-BASED ONLY)
-    # ===============================================
-    harga_satuan_per_produk = {}
-    total_hpp_per_produk = {}
-
-    total_qty_produksi = sum(item.qty_diproduksi for item in barang_diproduksi_list_objects)
-
-    total_bop = sum(bop_per_produk.values())
-
-    if total_qty_produksi > 0:
-        bop_per_unit = total_bop / total_qty_produksi
-    else:
-        bop_per_unit = 0
+    # Barang diproduksi and the BOP allocation; a single batched write, unchanged rows are skipped
+    production = refresh_barang_diproduksi(report, products, production_map, total_bop)
+    barang_diproduksi_list_objects = production.items
+    total_qty_produksi = production.total_qty_produksi
+    total_bop = production.total_bop
+    bop_per_produk = production.bop_per_produk
+    harga_satuan_per_produk = production.harga_satuan_per_produk
+    total_hpp_per_produk = production.total_hpp_per_produk
 
-    for item in barang_diproduksi_list_objects:
-        id = str(item.product.id)
-        qty = item.qty_diproduksi
-
-        bop_total = round(bop_per_unit * qty)
-
-        harga_satuan_per_produk[id] = round(bop_per_unit)
-        total_hpp_per_produk[id] = bop_total
-
-    print(harga_satuan_per_produk)
-    print(total_hpp_per_produk)
-    print(barang_diproduksi_list_objects)
-
-    for item in barang_diproduksi_list_objects:
-        new_hpp = harga_satuan_per_produk.get(str(item.product.id), 0)
-        new_total = total_hpp_per_produk.get(str(item.product.id), 0)
-
-        item.hpp_per_unit = new_hpp
-        item.total_produksi = new_total
-        item.save(update_fields=["hpp_per_unit", "total_produksi"])
-    
-    total_barang_diproduksi = barang_diproduksi_list_objects.aggregate(
-        total=Sum('total_produksi')
-    )['total'] or 0
+    total_barang_diproduksi = sum(item.total_produksi for item in barang_diproduksi_list_objects)
     
     return render(request, "core/pages/hpp_manufaktur.html", {
         "report": report,
@@ -1235,10 +1101,10 @@ def laporan_dagang_view(request, report_id):
     report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
     completion_status = get_completion_status(report)
 
-    data = generate_final_report_data(report) 
+    result = get_report_result(report)
     
     context = {
-        **data,
+        **result.as_context(),
         'report': report,
         'completion_status': completion_status,
     }
@@ -1255,8 +1121,12 @@ def laporan_manufaktur_view(request, report_id):
         messages.error(request, 'Harap lengkapi data Beban Usaha terlebih dahulu.')
         return redirect('core:beban_usaha', report_id=report.id)
 
-    context = get_manufaktur_report_context(report) 
-    context['completion_status'] = completion_status
+    result = get_report_result(report)
+    context = {
+        **result.as_context(),
+        'report': report,
+        'completion_status': completion_status,
+    }
     
     return render(request, 'core/pages/laporan_manufaktur.html', context)
 
@@ -1265,15 +1135,14 @@ def laporan_manufaktur_view(request, report_id):
 def export_excel(request, report_id):
     report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
     
+    # ?mode=detail adds a sheet per line-item table
+    detail = request.GET.get('mode') == 'detail'
+
     try:
-        content, filename = generate_excel_file(report)
-        
-        response = HttpResponse(
-            content,
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        return _artifact_response(
+            request, report, 'excel_detail' if detail else 'excel',
+            excel_filename(report, detail), XLSX_CONTENT_TYPE,
         )
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
     
     except Exception as e:
         messages.error(request, f"Gagal membuat file Excel: {e}")
@@ -1284,22 +1153,144 @@ def export_pdf(request, report_id):
     report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
 
     try:
-        if report.business_type == 'manufaktur':
-            data = get_manufaktur_report_context(report)
-            template_path = 'core/pdf/laporan_manufaktur_pdf.html'
-            filename = f"Laporan_Manufaktur_{report.company_name}_{report.year}.pdf"
-
-        else:
-            data = generate_final_report_data(report) 
-            template_path = 'core/pdf/laporan_pdf.html'
-            filename = f"Laporan_Dagang_{report.company_name}_{report.year}.pdf"
+        return _artifact_response(request, report, 'pdf', pdf_filename(report), "application/pdf")
 
-        pdf_content = generate_pdf_file(report, data, template_path, request=request)
-        
-        response = HttpResponse(pdf_content, content_type="application/pdf")
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+    except PdfRenderUnavailable:
+        messages.warning(request, "Server sedang sibuk membuat PDF lain. Silakan coba lagi dalam beberapa saat, atau unduh versi Excel.")
+        return redirect('core:laporan', report_id=report.id)
         
     except Exception as e:
         messages.error(request, f"Gagal membuat PDF: {e}")
-        return redirect('core:laporan', report_id=report.id)
\ No newline at end of file
+        return redirect('core:laporan', report_id=report.id)
+
+
+def _artifact_response(request, report, kind, filename, content_type):
+    """
+    Serve the stored export for the report's current data, rendering it only
+    on a store miss. The artifact key doubles as a strong ETag, so a client
+    that already has this version gets a 304.
+    """
+    result = get_report_result(report)
+    key = artifact_key(report, result, kind)
+    etag = f'"{key}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        path = get_or_render_artifact(report, result, kind, key=key)
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required(login_url='core:login')
+def export_line_items(request, report_id, table, fmt):
+    """Raw rows of one line-item table as CSV or NDJSON, streamed straight from the database cursor."""
+    report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
+    if table not in LINE_ITEM_TABLES or fmt not in LINE_ITEM_FORMATS:
+        raise Http404("Unknown table or format")
+
+    response = StreamingHttpResponse(iter_line_items(report, table, fmt), content_type=LINE_ITEM_FORMATS[fmt])
+    filename = f"{table}_{report.company_name}_{report.month}_{report.year}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required(login_url='core:login')
+@require_POST
+def line_items_batch(request, report_id):
+    """
+    Apply a JSON list of create/update/delete operations to the report's
+    line items in one transaction and answer with the recomputed totals.
+    """
+    report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
+    try:
+        operations = json.loads(request.body).get('operations')
+    except (ValueError, AttributeError):
+        operations = None
+    if not isinstance(operations, list) or not operations:
+        return JsonResponse({'error': 'Body harus berupa JSON {"operations": [...]}.'}, status=400)
+    max_operations = getattr(settings, 'LINE_ITEM_BATCH_MAX_OPERATIONS', 500)
+    if len(operations) > max_operations:
+        return JsonResponse({'error': f'Maksimal {max_operations} operasi per permintaan.'}, status=400)
+
+    try:
+        result = apply_line_item_batch(report, operations)
+    except LineItemBatchError as e:
+        return JsonResponse({
+            'error': str(e),
+            'errors': [{'index': index, 'error': error} for index, error in e.errors],
+        }, status=400)
+    return JsonResponse(line_item_batch_payload(report, result))
+
+
+@login_required(login_url='core:login')
+def export_bulk(request):
+    """
+    ZIP of the Excel (and with ?pdf=1 also PDF) exports of several reports,
+    picked by ?ids=1,2,3 and/or ?year=2025. Reports render in a process pool
+    and the archive is streamed as they finish.
+    """
+    reports = FinancialReport.objects.filter(user=request.user).order_by('year', 'month', 'id')
+    ids = [i for value in request.GET.getlist('ids') for i in value.split(',') if i.strip()]
+    year = request.GET.get('year', '').strip()
+    try:
+        if ids:
+            reports = reports.filter(id__in=[int(i) for i in ids])
+        if year:
+            reports = reports.filter(year=int(year))
+    except ValueError:
+        messages.error(request, "Pilihan laporan tidak valid.")
+        return redirect('core:report_list')
+
+    if not ids and not year:
+        messages.error(request, "Pilih laporan atau tahun yang akan diunduh.")
+        return redirect('core:report_list')
+
+    max_reports = getattr(settings, 'BULK_EXPORT_MAX_REPORTS', 100)
+    reports = list(reports[:max_reports + 1])
+    if not reports:
+        messages.error(request, "Tidak ada laporan yang cocok untuk diunduh.")
+        return redirect('core:report_list')
+    if len(reports) > max_reports:
+        messages.error(request, f"Maksimal {max_reports} laporan per unduhan ZIP.")
+        return redirect('core:report_list')
+
+    kinds = ['excel', 'pdf'] if request.GET.get('pdf') else ['excel']
+    response = StreamingHttpResponse(stream_bulk_export(reports, kinds), content_type='application/zip')
+    filename = f"Laporan_{year}.zip" if year else "Laporan.zip"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required(login_url='core:login')
+@require_POST
+def export_job_create(request, report_id):
+    report = get_object_or_404(FinancialReport, id=report_id, user=request.user)
+
+    kind = request.POST.get('kind')
+    if kind not in EXPORT_KINDS:
+        return JsonResponse({'error': 'Jenis export tidak dikenal.'}, status=400)
+
+    job = enqueue_export(report, request.user, kind)
+    return JsonResponse(export_job_payload(job), status=202)
+
+
+@login_required(login_url='core:login')
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user)
+    return JsonResponse(export_job_payload(job))
+
+
+@login_required(login_url='core:login')
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user, status=ExportJob.STATUS_DONE)
+    if not job.file:
+        raise Http404("File export sudah tidak tersedia.")
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename)
+
+
+@staff_member_required(login_url='core:login')
+def pdf_metrics(request):
+    """Queue depth and render latency of this process's PDF render pool."""
+    return JsonResponse(get_pdf_pool().metrics())
\ No newline at end of file